@@ -1,31 +1,39 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import sys
 import os
 import logging
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import cv2
 import numpy as np
-import base64
 import threading
 import queue
 from werkzeug.utils import secure_filename
-from utils.detection_handler import DetectionHandler
+from utils.detection_handler import DetectionHandler, unpack_track
 from utils.module_status import ModuleStatus
+from utils.viewer_registry import ViewerRegistry
+from utils.event_bus import EventBus
+from utils.frame_delivery import (
+    FrameDelivery, TRANSPORT_BASE64, TRANSPORT_BINARY, OVERLAY_SERVER, OVERLAY_CLIENT
+)
 from pathlib import Path
 from collections import defaultdict
 import tempfile
 import shutil
-from utils.import_helper import get_model_config
+from utils.import_helper import get_model_config, get_storage_config, get_memory_config
+from utils.logging_config import LOGGING_CONFIG, setup_logging
+from utils.maintenance import MaintenanceService
+from utils.metrics import METRICS
+from utils.tracing import TRACER
+from utils.profiler import StackSampler, ProfilerBusyError
+from utils.memory import MemoryAccountant, evict_oldest
+from utils.feedback_export import stream_csv, stream_jsonl, stream_log_jsonl, stream_yolo_zip
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: queue handler, background listener, rotating file
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Add the root directory to Python path
@@ -37,15 +45,22 @@ import numpy as np
 import cv2
 
 class VideoProcessor:
-    def __init__(self, socketio_instance):
+    def __init__(self, socketio_instance, detection_handler=None, capture_factory=None):
         self.socketio = socketio_instance
         self.streams = {}
         self.frame_queues = {}
         self.processing_threads = {}
         self.stop_events = {}
         
-        # Initialize detection handler with full workflow
-        self.detection_handler = DetectionHandler()
+        # Clients currently watching each stream and the thread that feeds them
+        self.viewers = ViewerRegistry()
+        self.frame_delivery = FrameDelivery(socketio_instance, self.viewers)
+        
+        # Initialize detection handler with full workflow (injectable for benchmarks)
+        self.detection_handler = detection_handler or DetectionHandler()
+        
+        # capture_factory(source_id, source_type) -> VideoCapture-like; lets load tests feed simulated cameras
+        self.capture_factory = capture_factory
         
         # Statistics tracking
         self.statistics = {
@@ -57,14 +72,27 @@ class VideoProcessor:
             'closed_boxes_in_zone': 0
         }
         
-        # Mock GUI handler for socket communication
-        self.gui_handler = SocketGUIHandler(socketio_instance)
+        # Batched, rate-limited emission of logs, counts and statistics
+        self.event_bus = EventBus(socketio_instance)
+        
+        # Per-stream GUI handlers that talk to the frontend through the event bus
+        self.gui_handlers = {}
+        
+        # Queue depths and drop counts are read only when /api/metrics is scraped
+        METRICS.add_collector(self._metric_samples)
+        
+        # Caps on state that grows over a long shift, enforced from the processing threads
+        self.memory = MemoryAccountant(get_memory_config())
+        self._register_memory_structures()
+        METRICS.add_collector(self.memory.metric_samples)
         
         logger.info("VideoProcessor initialized with full tracking system")
 
     def start_stream(self, source_id, source_type='camera'):
         """Start video stream processing with full tracking workflow"""
         try:
+            # A source whose video ended may be started again
+            self._prune_finished_streams()
             if source_id in self.streams:
                 logger.warning(f"Stream {source_id} is already running")
                 return False
@@ -112,12 +140,17 @@ class VideoProcessor:
                 
             if source_id in self.frame_queues:
                 del self.frame_queues[source_id]
+            
+            self.frame_delivery.discard(source_id)
                 
             if source_id in self.processing_threads:
                 del self.processing_threads[source_id]
                 
             if source_id in self.stop_events:
                 del self.stop_events[source_id]
+            
+            self.gui_handlers.pop(source_id, None)
+            METRICS.stream_stopped(source_id)
                 
             logger.info(f"Stopped stream {source_id}")
             self.socketio.emit('processing_status', {
@@ -135,11 +168,7 @@ class VideoProcessor:
     def _process_stream(self, source_id, source_type):
         """Process video stream with full tracking workflow"""
         try:
-            if source_type == 'camera':
-                cap = cv2.VideoCapture(0)  # Use default camera
-            else:
-                # For uploaded videos, source_id should be the file path
-                cap = cv2.VideoCapture(source_id)
+            cap = self._open_capture(source_id, source_type)
                 
             if not cap.isOpened():
                 logger.error(f"Could not open video source: {source_id}")
@@ -162,31 +191,27 @@ class VideoProcessor:
             })
             
             while cap.isOpened() and not self.stop_events[source_id].is_set():
-                ret, frame = cap.read()
+                with METRICS.time('capture', source_id):
+                    ret, frame = cap.read()
                 if not ret:
                     logger.info(f"End of video stream: {source_id}")
                     break
                     
-                # Process frame with full tracking workflow
-                processed_frame = self._process_frame_with_tracking(frame, source_id, frame_count)
-                
-                # Send frame to frontend
-                if processed_frame is not None:
-                    # Convert frame to base64 for transmission
-                    _, buffer = cv2.imencode('.jpg', processed_frame)
-                    frame_base64 = base64.b64encode(buffer).decode('utf-8')
+                with TRACER.span('frame', source=source_id, frame=frame_count):
+                    # Process frame with full tracking workflow
+                    processed_frame = self._process_frame_with_tracking(frame, source_id, frame_count)
                     
-                    self.socketio.emit('video_frame', {
-                        'source': source_id,
-                        'frame': frame_base64,
-                        'frame_count': frame_count
-                    }, room=f'video_{source_id}')
+                    # Draw, encode and send only when someone is watching this stream
+                    if processed_frame is not None and self.viewers.has_viewers(source_id):
+                        self._publish_frame(processed_frame, source_id, frame_count)
                 
                 frame_count += 1
+                METRICS.frame_processed(source_id)
                 
                 # Update statistics periodically
                 if time.time() - last_stats_update > 1.0:  # Every second
                     self._update_statistics()
+                    self.memory.maybe_enforce()
                     last_stats_update = time.time()
                     
             # Cleanup
@@ -205,17 +230,28 @@ class VideoProcessor:
                 'message': f'Processing error: {str(e)}'
             })
 
+    def _open_capture(self, source_id, source_type):
+        """Open the frame source of a stream"""
+        if self.capture_factory is not None:
+            return self.capture_factory(source_id, source_type)
+        if source_type == 'camera':
+            return cv2.VideoCapture(0)  # Use default camera
+        # For uploaded videos, source_id should be the file path
+        return cv2.VideoCapture(source_id)
+
     def _process_frame_with_tracking(self, frame, source_id, frame_count):
         """Process frame with full tracking, counting, and feedback system"""
         try:
             # Get detections from YOLO model
-            results = self.detection_handler.model(frame)[0]
+            with METRICS.time('inference', source_id):
+                results = self.detection_handler.model(frame)[0]
             
             # Extract detection data for SFSORT tracking
             boxes = []
             class_ids = []
             scores = []
             
+            extract_start = time.perf_counter()
             for det in results.boxes:
                 box = det.xyxy[0].cpu().numpy()
                 cls_id = int(det.cls.cpu().numpy()[0])
@@ -226,16 +262,17 @@ class VideoProcessor:
                     boxes.append(box)
                     class_ids.append(cls_id)
                     scores.append(score)
+            METRICS.observe_since('extract', extract_start, source_id)
             
             # Use SFSORT tracking (same as local GUI)
             tracked_data = []
             if boxes:
+                sfsort_start = time.perf_counter()
                 try:
                     tracks = self.detection_handler.sfsort_tracker.update(np.array(boxes), np.array(scores))
                     # Match tracks to detections by IoU
                     for track in tracks:
-                        track_bbox = np.array(track[:4]).astype(float).flatten()
-                        track_id = int(track[4]) if len(track) >= 5 else None
+                        track_bbox, track_id = unpack_track(track)
                         # Find best matching detection
                         best_iou = 0
                         best_idx = -1
@@ -261,44 +298,82 @@ class VideoProcessor:
                         'class_id': cls_id,
                         'confidence': score
                     } for i, (box, cls_id, score) in enumerate(zip(boxes, class_ids, scores))]
+                METRICS.observe_since('sfsort', sfsort_start, source_id)
             
             # Update tracking with full workflow
             if tracked_data:
-                self.detection_handler.box_tracker.update_tracking(
-                    tracked_data, 
-                    self.detection_handler.dispatch_zone, 
-                    frame, 
-                    self.gui_handler, 
-                    frame_count
-                )
-            
-            # Draw tracking information on frame
-            self.detection_handler.box_tracker.draw_tracking_info_on_frame(frame)
-            self.detection_handler.box_tracker.draw_statistics_on_frame(frame)
-            
-            # Draw dispatch zone
-            self.detection_handler.dispatch_zone.draw_zone(frame)
+                with METRICS.time('box_tracker', source_id):
+                    self.detection_handler.box_tracker.update_tracking(
+                        tracked_data, 
+                        self.detection_handler.dispatch_zone, 
+                        frame, 
+                        self._gui_handler(source_id), 
+                        frame_count
+                    )
             
             # Check for feedback periodically (every 30 frames)
             if frame_count % 30 == 0:
-                self.detection_handler.feedback_collector.check_detection(
-                    frame, 
-                    results.boxes, 
-                    self.detection_handler.box_tracker.tracked_boxes
-                )
-                
-                # Store feedback data
-                feedback_data = self.detection_handler.feedback_collector.get_feedback_data()
-                if feedback_data:
-                    logger.info(f"Storing {len(feedback_data)} feedback entries")
-                    self.detection_handler.feedback_storage.store_feedback(feedback_data)
+                with METRICS.time('feedback', source_id):
+                    self.detection_handler.feedback_collector.check_detection(
+                        frame, 
+                        results.boxes, 
+                        self.detection_handler.box_tracker.tracked_boxes
+                    )
             
             return frame
             
         except Exception as e:
             logger.error(f"Error in frame processing: {str(e)}")
+            METRICS.inc('frames_failed_total', source=source_id)
             return frame
 
+    def _gui_handler(self, source_id):
+        """GUI handler whose logs and counts only reach clients watching the stream"""
+        handler = self.gui_handlers.get(source_id)
+        if handler is None:
+            handler = self.gui_handlers[source_id] = SocketGUIHandler(self.event_bus, room=f'video_{source_id}')
+        return handler
+
+    def _publish_frame(self, frame, source_id, frame_count):
+        """Prepare the frame variants the current viewers need and hand them to delivery"""
+        overlay_modes = self.viewers.overlay_modes(source_id)
+        raw_frame = None
+        metadata = None
+        
+        if OVERLAY_CLIENT in overlay_modes:
+            # Browsers drawing their own overlays get the clean frame plus metadata
+            metadata = self._build_frame_metadata(frame)
+            raw_frame = frame.copy() if OVERLAY_SERVER in overlay_modes else frame
+        
+        rendered_frame = None
+        if OVERLAY_SERVER in overlay_modes:
+            with METRICS.time('draw', source_id):
+                rendered_frame = self._render_overlays(frame)
+        self.frame_delivery.publish(source_id, rendered_frame, frame_count,
+                                    raw_frame=raw_frame, metadata=metadata)
+
+    def _build_frame_metadata(self, frame):
+        """Tracks, zone and counts for client-side overlay drawing"""
+        metadata = self.detection_handler.box_tracker.get_tracking_metadata()
+        zone = self.detection_handler.dispatch_zone
+        metadata['zone'] = {
+            'name': zone.name,
+            'coordinates': zone.coordinates.tolist()
+        }
+        metadata['width'] = int(frame.shape[1])
+        metadata['height'] = int(frame.shape[0])
+        return metadata
+
+    def _render_overlays(self, frame):
+        """Draw tracking info, statistics and the dispatch zone onto the frame"""
+        try:
+            self.detection_handler.box_tracker.draw_tracking_info_on_frame(frame)
+            self.detection_handler.box_tracker.draw_statistics_on_frame(frame)
+            self.detection_handler.dispatch_zone.draw_zone(frame)
+        except Exception as e:
+            logger.error(f"Error drawing overlays: {str(e)}")
+        return frame
+
     def _compute_iou(self, boxA, boxB):
         """Compute IoU between two bounding boxes"""
         import numpy as np
@@ -325,12 +400,12 @@ class VideoProcessor:
             self.statistics['pending_boxes'] = len(self.detection_handler.box_tracker.pending_boxes)
             
             # Count boxes in zone
-            current_open_boxes = sum(1 for box_info in self.detection_handler.box_tracker.tracked_boxes.values() 
+            current_open_boxes = sum(1 for box_info in list(self.detection_handler.box_tracker.tracked_boxes.values()) 
                                    if box_info.get("in_dispatch_zone") and 
                                       box_info.get("status_history") and 
                                       box_info["status_history"][-1] == self.detection_handler.box_tracker.STATUS_OPEN)
             
-            current_close_boxes = sum(1 for box_info in self.detection_handler.box_tracker.tracked_boxes.values() 
+            current_close_boxes = sum(1 for box_info in list(self.detection_handler.box_tracker.tracked_boxes.values()) 
                                     if box_info.get("in_dispatch_zone") and 
                                        box_info.get("status_history") and 
                                        box_info["status_history"][-1] == self.detection_handler.box_tracker.STATUS_CLOSE)
@@ -338,12 +413,72 @@ class VideoProcessor:
             self.statistics['open_boxes_in_zone'] = current_open_boxes
             self.statistics['closed_boxes_in_zone'] = current_close_boxes
             
-            # Emit statistics to frontend
-            self.socketio.emit('statistics_update', self.statistics)
+            # Emit statistics to frontend (coalesced, latest value wins)
+            self.event_bus.publish_latest('statistics_update', self.statistics)
             
         except Exception as e:
             logger.error(f"Error updating statistics: {str(e)}")
 
+    def _register_memory_structures(self):
+        """Structures that can grow without bound, with how to shrink each one"""
+        handler = self.detection_handler
+        self.memory.register('tracked_boxes', lambda: handler.box_tracker.tracked_boxes,
+                             handler.box_tracker.evict_tracks)
+        self.memory.register('sfsort_active_tracks', lambda: handler.sfsort_tracker.active_tracks,
+                             lambda count: evict_oldest(handler.sfsort_tracker.active_tracks, count,
+                                                        key=lambda track: track.last_frame))
+        self.memory.register('sfsort_lost_tracks', lambda: handler.sfsort_tracker.lost_tracks,
+                             lambda count: evict_oldest(handler.sfsort_tracker.lost_tracks, count,
+                                                        key=lambda track: track.last_frame))
+        self.memory.register('feedback_writer_queue', lambda: handler.feedback_writer.queue.queue)
+        self.memory.register('image_store_queue', lambda: handler.feedback_collector.image_store.queue.queue)
+        self.memory.register('streams', lambda: self.processing_threads, lambda count: self._prune_finished_streams())
+        self.memory.register('gui_handlers', lambda: self.gui_handlers)
+
+    def _prune_finished_streams(self):
+        """Forget streams whose processing thread ended on its own (end of file, read error)"""
+        finished = [source_id for source_id, thread in list(self.processing_threads.items())
+                    if not thread.is_alive()]
+        for source_id in finished:
+            for registry in (self.streams, self.frame_queues, self.processing_threads,
+                             self.stop_events, self.gui_handlers):
+                registry.pop(source_id, None)
+            self.frame_delivery.discard(source_id)
+            METRICS.stream_stopped(source_id)
+        return len(finished)
+
+    def _metric_samples(self):
+        """Queue depths and drop counters of the background workers and viewers"""
+        collector = self.detection_handler.feedback_collector
+        writer = self.detection_handler.feedback_writer
+        syncer = self.detection_handler.feedback_storage.mongo_syncer
+        depth_help = 'Items waiting in a background queue'
+        dropped_help = 'Items dropped because a queue or delivery slot was full'
+        samples = [
+            ('queue_depth', 'gauge', depth_help, {'queue': 'feedback_writer'}, writer.queue.qsize()),
+            ('queue_depth', 'gauge', depth_help, {'queue': 'image_store'}, collector.image_store.queue.qsize()),
+            ('queue_depth', 'gauge', depth_help, {'queue': 'review'}, collector.review_queue.pending_count()),
+            ('dropped_total', 'counter', dropped_help, {'queue': 'feedback_writer'}, writer.entries_dropped),
+            ('dropped_total', 'counter', dropped_help, {'queue': 'image_store'}, collector.image_store.jobs_dropped),
+            ('dropped_total', 'counter', dropped_help, {'queue': 'review'}, collector.review_queue.dropped),
+            ('dropped_total', 'counter', dropped_help, {'queue': 'delivery_slot'},
+             self.frame_delivery.frames_replaced)
+        ]
+        if syncer is not None:
+            samples.append(('queue_depth', 'gauge', depth_help, {'queue': 'mongo_outbox'},
+                            self.detection_handler.feedback_storage.count_unsynced()))
+        for source_id, count in self.viewers.to_dict().items():
+            skipped = sum(client.frames_skipped for client in self.viewers.clients(source_id))
+            samples.append(('viewer_frames_skipped_total', 'counter', 'Frames a slow viewer never received',
+                            {'source': source_id}, skipped))
+            samples.append(('viewers', 'gauge', 'Clients watching a stream', {'source': source_id}, count))
+        return samples
+
+    def is_streaming(self, source_id):
+        """Whether a processing thread is still running for the source"""
+        thread = self.processing_threads.get(source_id)
+        return thread is not None and thread.is_alive()
+
     def get_frame(self, source_id):
         """Get processed frame from queue"""
         if source_id in self.frame_queues and not self.frame_queues[source_id].empty():
@@ -379,40 +514,45 @@ class VideoProcessor:
 
 
 class SocketGUIHandler:
-    """Mock GUI handler that uses Socket.IO for communication"""
-    def __init__(self, socketio_instance):
-        self.socketio = socketio_instance
+    """Mock GUI handler that sends updates to the frontend through the event bus"""
+    def __init__(self, event_bus, room=None):
+        self.event_bus = event_bus
+        self.room = room
         
     def log_message(self, message):
-        """Send log message to frontend"""
-        self.socketio.emit('log_message', {
-            'message': message,
-            'timestamp': datetime.now().isoformat()
-        })
+        """Queue log message for the next log_batch"""
+        self.event_bus.log(message, room=self.room)
         
     def update_video_frame(self, frame):
         """Update video frame (handled by VideoProcessor)"""
         pass
         
     def update_counts(self, pending_count, sold_count):
-        """Update counts and emit to frontend"""
-        self.socketio.emit('counts_update', {
+        """Publish the latest counts; only the newest value is emitted"""
+        self.event_bus.publish_latest('counts_update', {
             'pending_boxes': pending_count,
-            'boxes_sold': sold_count,
-            'timestamp': datetime.now().isoformat()
-        })
+            'boxes_sold': sold_count
+        }, room=self.room)
         
     def reset_gui_state(self):
         """Reset GUI state"""
-        self.socketio.emit('gui_reset', {
+        self.event_bus.socketio.emit('gui_reset', {
             'message': 'Processing completed',
             'timestamp': datetime.now().isoformat()
-        })
+        }, room=self.room)
+
+def create_app(detection_handler=None, async_mode=None):
+    """Create and configure the Flask application.
 
-def create_app():
-    """Create and configure the Flask application"""
+    `detection_handler` lets a launcher pass one built around a preloaded model;
+    `async_mode` pins the Socket.IO mode instead of auto-detecting it. The app
+    answers API requests once `app.ready` is set.
+    """
     app = Flask(__name__)
     
+    # Set by the launcher once the model is loaded and warmed up
+    app.ready = threading.Event()
+    
     # Configure CORS
     CORS(app, resources={r"/*": {"origins": "*"}})
     
@@ -420,13 +560,31 @@ def create_app():
     app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024 * 1024  # 2GB
     
     # Initialize SocketIO
-    socketio = SocketIO(app, cors_allowed_origins="*", max_http_buffer_size=2 * 1024 * 1024 * 1024)
+    socketio = SocketIO(app, cors_allowed_origins="*", max_http_buffer_size=2 * 1024 * 1024 * 1024,
+                        async_mode=async_mode)
     
     # Initialize video processor with socketio instance
-    video_processor = VideoProcessor(socketio)
+    video_processor = VideoProcessor(socketio, detection_handler=detection_handler)
+    
+    # Keep db/, logs/ and uploads/ within the disk budget in the background
+    maintenance = MaintenanceService(
+        get_storage_config(),
+        feedback_storage=video_processor.detection_handler.feedback_storage,
+        image_root=video_processor.detection_handler.feedback_collector.image_store.root,
+        log_dir=LOGGING_CONFIG['log_dir'],
+        upload_dir='uploads',
+        is_idle=lambda: not any(video_processor.is_streaming(source_id)
+                                for source_id in list(video_processor.processing_threads))
+    )
     
-    # Initialize detection handler
-    detection_handler = DetectionHandler()
+    # Tell dashboards when review items are added or labeled (coalesced)
+    review_queue = video_processor.detection_handler.feedback_collector.review_queue
+    review_queue.add_listener(
+        lambda pending: video_processor.event_bus.publish_latest('review_queue_update', {'pending': pending}))
+    
+    # Sampling profiler for diagnosing a live server; ADMIN_TOKEN guards it when set
+    profiler = StackSampler()
+    admin_token = os.environ.get('ADMIN_TOKEN')
     
     # Initialize module status
     module_status = {
@@ -447,21 +605,41 @@ def create_app():
     def allowed_file(filename):
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+    # Probes that must answer while the server is still starting
+    READINESS_EXEMPT = {'/api/ready', '/api/health', '/api/metrics'}
+
+    @app.before_request
+    def require_ready():
+        if not app.ready.is_set() and request.path not in READINESS_EXEMPT:
+            return jsonify({"status": "error", "message": "Server is starting"}), 503
+
     @socketio.on('connect')
     def handle_connect():
+        if not app.ready.is_set():
+            return False
         logger.info('Client connected')
 
     @socketio.on('disconnect')
     def handle_disconnect():
-        logger.info('Client disconnected')
+        left = video_processor.viewers.leave_all(request.sid)
+        logger.info(f'Client disconnected (left streams: {left})')
 
     @socketio.on('join_video')
     def handle_join_video(data):
         source_id = data.get('source')
         if source_id:
+            # Binary-capable clients opt in; everyone else keeps the base64 event.
+            # Clients that acknowledge frames get adaptive rate and quality, and
+            # clients that draw their own overlays receive frame_metadata.
+            transport = TRANSPORT_BINARY if data.get('binary') else TRANSPORT_BASE64
+            overlay = OVERLAY_CLIENT if data.get('overlay') == OVERLAY_CLIENT else OVERLAY_SERVER
+            frame_fps = data.get('frame_fps')
+            frame_fps = float(frame_fps) if isinstance(frame_fps, (int, float)) and frame_fps > 0 else None
             room = f'video_{source_id}'
             join_room(room)
-            logger.info(f'Client joined room: {room}')
+            count = video_processor.viewers.join(source_id, request.sid, transport, bool(data.get('ack')),
+                                                 overlay, frame_fps)
+            logger.info(f'Client joined room: {room} ({count} viewers, {transport}, {overlay} overlays)')
 
     @socketio.on('leave_video')
     def handle_leave_video(data):
@@ -469,7 +647,78 @@ def create_app():
         if source_id:
             room = f'video_{source_id}'
             leave_room(room)
-            logger.info(f'Client left room: {room}')
+            count = video_processor.viewers.leave(source_id, request.sid)
+            logger.info(f'Client left room: {room} ({count} viewers)')
+
+    @app.route('/api/viewers', methods=['GET'])
+    def get_viewers():
+        """Get the number of clients watching each stream"""
+        try:
+            return jsonify({
+                "status": "success",
+                "viewers": video_processor.viewers.to_dict(),
+                "delivery": video_processor.frame_delivery.to_dict()
+            })
+        except Exception as e:
+            logger.error(f"Error getting viewers: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/stream/<path:source>.mjpeg', methods=['GET'])
+    def stream_mjpeg(source):
+        """Stream a processed source as multipart MJPEG"""
+        if not video_processor.is_streaming(source):
+            return jsonify({"status": "error", "message": f"Stream not running: {source}"}), 404
+
+        def generate():
+            # Registering as a viewer makes the pipeline render and encode frames;
+            # every HTTP client then shares the same encoded bytes
+            video_processor.viewers.add_http_viewer(source)
+            try:
+                last_frame_count = None
+                while video_processor.is_streaming(source):
+                    latest = video_processor.frame_delivery.wait_for_jpeg(source, last_frame_count)
+                    if latest is None or latest[0] == last_frame_count:
+                        continue
+                    last_frame_count, _, jpeg = latest
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n'
+                           b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' +
+                           jpeg + b'\r\n')
+            finally:
+                video_processor.viewers.remove_http_viewer(source)
+
+        return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame',
+                        headers={'Cache-Control': 'no-cache, no-store'})
+
+    @app.route('/api/snapshot/<path:source>.jpg', methods=['GET'])
+    def snapshot(source):
+        """Return the latest processed frame of a source as a JPEG"""
+        try:
+            latest = video_processor.frame_delivery.latest_jpeg(source)
+            if latest is None or time.time() - latest[1] > 1.0:
+                if not video_processor.is_streaming(source):
+                    if latest is None:
+                        return jsonify({"status": "error", "message": f"No frame available for: {source}"}), 404
+                else:
+                    # Nobody is watching over HTTP, so ask the pipeline for one fresh frame
+                    video_processor.viewers.add_http_viewer(source)
+                    try:
+                        latest = video_processor.frame_delivery.wait_for_jpeg(
+                            source, latest[0] if latest else None, timeout=2.0)
+                    finally:
+                        video_processor.viewers.remove_http_viewer(source)
+            if latest is None:
+                return jsonify({"status": "error", "message": f"No frame available for: {source}"}), 503
+
+            frame_count, timestamp, jpeg = latest
+            return Response(jpeg, mimetype='image/jpeg', headers={
+                'Cache-Control': 'no-cache, no-store',
+                'X-Frame-Count': str(frame_count),
+                'X-Frame-Timestamp': f"{timestamp:.3f}"
+            })
+        except Exception as e:
+            logger.error(f"Error getting snapshot: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
 
     @app.route('/api/video-sources', methods=['GET'])
     def get_video_sources():
@@ -540,6 +789,319 @@ def create_app():
             logger.error(f"Error getting statistics: {str(e)}")
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    @app.route('/api/feedback', methods=['GET'])
+    def get_feedback():
+        """Get a page of stored feedback, newest first"""
+        try:
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+            page = video_processor.detection_handler.feedback_storage.get_feedback_page(
+                limit=limit,
+                cursor=request.args.get('cursor'),
+                track_id=request.args.get('track_id'),
+                class_id=request.args.get('class_id', type=int)
+            )
+            if page is None:
+                return jsonify({"status": "error", "message": "Failed to read feedback"}), 500
+            return jsonify({"status": "success", **page})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error getting feedback: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/feedback/stats', methods=['GET'])
+    def get_feedback_stats():
+        """Get overall and per day / per class feedback statistics"""
+        try:
+            feedback_storage = video_processor.detection_handler.feedback_storage
+            days = request.args.get('days', 30, type=int)
+            since = (datetime.now() - timedelta(days=max(days, 1) - 1)).strftime('%Y-%m-%d')
+            return jsonify({
+                "status": "success",
+                "summary": feedback_storage.get_feedback_stats(),
+                "daily": feedback_storage.get_daily_stats(
+                    since=since, class_id=request.args.get('class_id', type=int))
+            })
+        except Exception as e:
+            logger.error(f"Error getting feedback stats: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/feedback/track/<track_id>', methods=['GET'])
+    def get_track_feedback(track_id):
+        """Get a page of feedback for one track"""
+        try:
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+            page = video_processor.detection_handler.feedback_storage.get_feedback_page(
+                limit=limit, cursor=request.args.get('cursor'), track_id=track_id)
+            if page is None:
+                return jsonify({"status": "error", "message": "Failed to read feedback"}), 500
+            return jsonify({"status": "success", "track_id": track_id, **page})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error getting track feedback: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    def _export_response(chunks, filename, mimetype):
+        return Response(chunks, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'Cache-Control': 'no-cache'
+        })
+
+    @app.route('/api/export/feedback.<fmt>', methods=['GET'])
+    def export_feedback(fmt):
+        """Stream the feedback history as JSONL or CSV (optional ?since=&until=).
+
+        ?source=log streams the raw entries of the JSON Lines log instead of SQLite (JSONL only).
+        """
+        writers = {
+            'jsonl': (stream_jsonl, 'application/x-ndjson'),
+            'csv': (stream_csv, 'text/csv')
+        }
+        if fmt not in writers:
+            return jsonify({'error': 'Invalid format. Must be "jsonl" or "csv"'}), 400
+        source = request.args.get('source', 'db')
+        if source not in ('db', 'log') or (source == 'log' and fmt != 'jsonl'):
+            return jsonify({'error': 'Invalid source. Must be "db", or "log" with jsonl'}), 400
+        try:
+            writer, mimetype = writers[fmt]
+            feedback_storage = video_processor.detection_handler.feedback_storage
+            since, until = request.args.get('since'), request.args.get('until')
+            if source == 'log':
+                chunks = stream_log_jsonl(feedback_storage.feedback_log, since=since, until=until)
+            else:
+                chunks = writer(feedback_storage.db_path, since=since, until=until)
+            filename = f'feedback_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{fmt}'
+            return _export_response(chunks, filename, mimetype)
+        except Exception as e:
+            logger.error(f"Error exporting feedback: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/export/dataset.zip', methods=['GET'])
+    def export_dataset():
+        """Stream labeled frames as a zipped YOLO dataset (optional ?since=&until= days)"""
+        try:
+            since = request.args.get('since', '').replace('-', '') or None
+            until = request.args.get('until', '').replace('-', '') or None
+            chunks = stream_yolo_zip('db', class_names=video_processor.detection_handler.class_names,
+                                     since=since, until=until)
+            filename = f'dataset_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+            return _export_response(chunks, filename, 'application/zip')
+        except Exception as e:
+            logger.error(f"Error exporting dataset: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/storage/usage', methods=['GET'])
+    def get_storage_usage():
+        """Get disk usage per data class and the maintenance state"""
+        try:
+            refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+            return jsonify({
+                "status": "success",
+                "usage": maintenance.usage(refresh=refresh),
+                "maintenance": maintenance.to_dict()
+            })
+        except Exception as e:
+            logger.error(f"Error getting storage usage: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/storage/maintenance', methods=['POST'])
+    def run_storage_maintenance():
+        """Start a maintenance cycle in the background"""
+        maintenance.trigger()
+        return jsonify({"status": "success", "message": "Maintenance cycle scheduled"})
+
+    @app.route('/api/memory', methods=['GET'])
+    def get_memory():
+        """Items, estimated bytes, caps and evictions per in-memory structure (?bytes=0 skips sizing)"""
+        try:
+            report = video_processor.memory.report(include_bytes=request.args.get('bytes') != '0')
+            return jsonify({"status": "success", **report})
+        except Exception as e:
+            logger.error(f"Error reporting memory: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/memory/tracemalloc/start', methods=['POST'])
+    def start_tracemalloc():
+        """Start tracemalloc and take the baseline snapshot (JSON: frames)"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        frames = (request.get_json(silent=True) or {}).get('frames')
+        if frames is not None and (not isinstance(frames, int) or not 1 <= frames <= 50):
+            return jsonify({'error': 'frames must be an integer between 1 and 50'}), 400
+        video_processor.memory.start_tracemalloc(frames)
+        return jsonify({"status": "success", "message": "tracemalloc baseline taken"})
+
+    @app.route('/api/memory/tracemalloc/diff', methods=['GET'])
+    def get_tracemalloc_diff():
+        """Allocation growth since the baseline (?top=&group_by=lineno|filename|traceback)"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        group_by = request.args.get('group_by', 'lineno')
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            return jsonify({'error': f'Unsupported group_by: {group_by}'}), 400
+        try:
+            top = min(int(request.args.get('top', 25)), 200)
+            return jsonify({"status": "success",
+                            "diff": video_processor.memory.tracemalloc_diff(top=top, group_by=group_by)})
+        except ValueError:
+            return jsonify({'error': 'top must be an integer'}), 400
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+
+    @app.route('/api/memory/tracemalloc/stop', methods=['POST'])
+    def stop_tracemalloc():
+        denied = admin_denied()
+        if denied:
+            return denied
+        video_processor.memory.stop_tracemalloc()
+        return jsonify({"status": "success", "message": "tracemalloc stopped"})
+
+    @app.route('/api/trace/start', methods=['POST'])
+    def start_trace():
+        """Start recording per-frame spans (JSON: capacity, duration in seconds)"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        try:
+            data = request.get_json(silent=True) or {}
+            capacity = int(data.get('capacity', TRACER.capacity))
+            duration = data.get('duration')
+            duration = float(duration) if duration is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'capacity and duration must be numbers'}), 400
+        if not 1000 <= capacity <= 1000000 or (duration is not None and not 0 < duration <= 3600):
+            return jsonify({'error': 'capacity must be 1000-1000000 and duration 0-3600 seconds'}), 400
+        TRACER.start(capacity=capacity, duration=duration)
+        return jsonify({"status": "success", "tracing": TRACER.to_dict()})
+
+    @app.route('/api/trace/stop', methods=['POST'])
+    def stop_trace():
+        """Stop recording; the recorded spans stay available for download"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        TRACER.stop()
+        return jsonify({"status": "success", "tracing": TRACER.to_dict()})
+
+    @app.route('/api/trace', methods=['GET'])
+    def dump_trace():
+        """Download the recorded spans as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        try:
+            filename = f"frame_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            return _export_response(json.dumps(TRACER.to_chrome_trace()), filename, 'application/json')
+        except Exception as e:
+            logger.error(f"Error dumping trace: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    def admin_denied():
+        """Error response when ADMIN_TOKEN is set and the request does not carry it"""
+        if admin_token and request.headers.get('X-Admin-Token') != admin_token:
+            return jsonify({'error': 'Invalid admin token'}), 403
+        return None
+
+    @app.route('/api/admin/profile', methods=['POST'])
+    def run_profile():
+        """Sample every thread's stack for a while (?duration=&hz=&format=collapsed|json&idle=1)"""
+        denied = admin_denied()
+        if denied:
+            return denied
+        try:
+            duration = float(request.args.get('duration', 10))
+            hz = int(request.args.get('hz', 100))
+        except ValueError:
+            return jsonify({'error': 'duration and hz must be numbers'}), 400
+        output_format = request.args.get('format', 'collapsed')
+        if output_format not in ('collapsed', 'json'):
+            return jsonify({'error': f'Unsupported format: {output_format}'}), 400
+        
+        try:
+            # Blocks this request only; duration and rate are capped by the sampler
+            result = profiler.profile(duration=duration, hz=hz, include_idle=request.args.get('idle') == '1')
+        except ProfilerBusyError as e:
+            return jsonify({'error': str(e)}), 409
+        except Exception as e:
+            logger.error(f"Error profiling: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+        
+        if output_format == 'json':
+            return jsonify({"status": "success", "profile": profiler.summary(result)})
+        filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.collapsed"
+        return _export_response(StackSampler.to_collapsed(result), filename, 'text/plain')
+
+    @app.route('/api/review/pending', methods=['GET'])
+    def get_review_pending():
+        """Get detections waiting for review, oldest first (?limit=&after=<id>)"""
+        try:
+            limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+            items = review_queue.pending(limit=limit, after_id=request.args.get('after', type=int))
+            return jsonify({
+                "status": "success",
+                "items": items,
+                "next_after": items[-1]['id'] if len(items) == limit else None,
+                "pending": review_queue.pending_count()
+            })
+        except Exception as e:
+            logger.error(f"Error getting review queue: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/review/stats', methods=['GET'])
+    def get_review_stats():
+        """Get review queue counts"""
+        try:
+            return jsonify({
+                "status": "success",
+                **review_queue.to_dict(),
+                "sampler": video_processor.detection_handler.feedback_collector.sampler.to_dict()
+            })
+        except Exception as e:
+            logger.error(f"Error getting review stats: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/review/<int:item_id>/<kind>.jpg', methods=['GET'])
+    def get_review_image(item_id, kind):
+        """Serve the crop or context frame of a review item"""
+        if kind not in ('crop', 'frame'):
+            return jsonify({'error': 'Invalid image kind. Must be "crop" or "frame"'}), 400
+        item = review_queue.get(item_id)
+        path = item and item[f'{kind}_path']
+        if not path or not os.path.exists(path):
+            return jsonify({"status": "error", "message": "Image not available"}), 404
+        return send_file(os.path.abspath(path), mimetype='image/jpeg', max_age=3600)
+
+    @app.route('/api/review/labels', methods=['POST'])
+    def submit_review_labels():
+        """Label a batch of review items: {"labels": [{"id", "is_correct", "class_id"?, "issues"?}]}"""
+        try:
+            data = request.get_json()
+            if not data or not isinstance(data.get('labels'), list):
+                return jsonify({'error': 'Missing labels'}), 400
+            feedback_data, errors = review_queue.label(
+                data['labels'], class_names=video_processor.detection_handler.class_names)
+            if feedback_data:
+                video_processor.detection_handler.feedback_writer.submit(feedback_data)
+            return jsonify({"status": "success", "labeled": len(feedback_data), "errors": errors})
+        except Exception as e:
+            logger.error(f"Error submitting review labels: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @app.route('/api/review/skip', methods=['POST'])
+    def skip_review_items():
+        """Dismiss review items without feedback: {"ids": [...]}"""
+        try:
+            data = request.get_json()
+            if not data or not isinstance(data.get('ids'), list):
+                return jsonify({'error': 'Missing ids'}), 400
+            return jsonify({"status": "success", "skipped": review_queue.skip(data['ids'])})
+        except Exception as e:
+            logger.error(f"Error skipping review items: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
     @app.route('/', methods=['GET'])
     def root():
         """Root endpoint that returns API information and module status"""
@@ -558,7 +1120,21 @@ def create_app():
                     "video_sources": "/api/video-sources",
                     "zones": "/api/zones",
                     "statistics": "/api/statistics",
-                    "zone_info": "/api/zone-info"
+                    "zone_info": "/api/zone-info",
+                    "viewers": "/api/viewers",
+                    "stream": "/api/stream/<source>.mjpeg",
+                    "snapshot": "/api/snapshot/<source>.jpg",
+                    "feedback": "/api/feedback",
+                    "feedback_stats": "/api/feedback/stats",
+                    "track_feedback": "/api/feedback/track/<track_id>",
+                    "export_feedback": "/api/export/feedback.<jsonl|csv>",
+                    "export_dataset": "/api/export/dataset.zip",
+                    "storage_usage": "/api/storage/usage",
+                    "review": "/api/review/pending",
+                    "metrics": "/api/metrics",
+                    "trace": "/api/trace",
+                    "profile": "/api/admin/profile",
+                    "memory": "/api/memory"
                 }
             })
         except Exception as e:
@@ -566,13 +1142,29 @@ def create_app():
             module_status["api"].update(success=False, error=e)
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        """Pipeline stage latencies, frame rates, queue depths and drops for Prometheus"""
+        try:
+            return Response(METRICS.render_prometheus(), mimetype='text/plain; version=0.0.4')
+        except Exception as e:
+            logger.error(f"Error rendering metrics: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
     @app.route('/api/status', methods=['GET'])
     def get_status():
         """Get detailed status of all modules"""
         try:
+            feedback_storage = video_processor.detection_handler.feedback_storage
             return jsonify({
                 "status": "success",
                 "modules": {name: status.to_dict() for name, status in module_status.items()},
+                "feedback_writer": video_processor.detection_handler.feedback_writer.to_dict(),
+                "mongo_sync": feedback_storage.mongo_syncer.to_dict() if feedback_storage.mongo_syncer else None,
+                "image_store": video_processor.detection_handler.feedback_collector.image_store.to_dict(),
+                "review_queue": review_queue.to_dict(),
+                "tracing": TRACER.to_dict(),
+                "profiler": profiler.to_dict(),
                 "server_uptime": time.time() - app.start_time if hasattr(app, 'start_time') else 0
             })
         except Exception as e:
@@ -595,6 +1187,13 @@ def create_app():
             module_status["api"].update(success=False, error=e)
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    @app.route('/api/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness probe: 503 until the model is loaded and warmed up"""
+        if not app.ready.is_set():
+            return jsonify({"status": "starting", "message": "Model is warming up"}), 503
+        return jsonify({"status": "ready"})
+
     @app.route('/api/initialize', methods=['POST'])
     def initialize_tracker():
         """Initialize the detection handler"""
@@ -812,6 +1411,8 @@ def main():
     try:
         app, socketio = create_app()
         app.start_time = time.time()  # Record server start time
+        # Development server; production runs through server.py
+        app.ready.set()
         socketio.run(app, host='0.0.0.0', port=5000, debug=True)
     except Exception as e:
         logger.error(f"Error starting server: {str(e)}")
@@ -0,0 +1,3 @@
+"""
+CPU-only benchmarks and load tests driven by synthetic scenes and a scripted detector
+"""
@@ -0,0 +1,263 @@
+"""
+Multi-stream load test: how many simulated cameras one process sustains within its SLOs
+
+Every stream runs through `VideoProcessor.start_stream` exactly as a camera
+would, sharing one DetectionHandler with the scripted detector. The harness
+steps through increasing stream counts, measures each level for a fixed
+duration and reports the knee: the first level that breaks the SLOs. From backend/
+(or run the file directly, e.g. python backend/benchmarks/load_test.py):
+    python -m benchmarks.load_test --streams 1,2,4,8 --duration 30
+    python -m benchmarks.load_test --video uploads/sample.mp4 --inference-ms 25 --gpu
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Absolute, so the file also runs as a script
+from app import VideoProcessor  # noqa: E402
+from benchmarks.pipeline_benchmark import NullSocketIO, _shutdown, _working_directory  # noqa: E402
+from benchmarks.synthetic import FakeDetector, SyntheticCapture, SyntheticScene  # noqa: E402
+from utils.detection_handler import DetectionHandler  # noqa: E402
+from utils.metrics import METRICS, resident_memory_bytes  # noqa: E402
+
+
+class ResourceSampler:
+    """Samples process CPU, RSS and the total frame rate on a background thread"""
+
+    def __init__(self, captures, interval=1.0):
+        self.captures = captures
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='ResourceSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        started = last_wall = time.perf_counter()
+        last_cpu = time.process_time()
+        last_frames = self._frames()
+        while not self._stop.wait(self.interval):
+            wall, cpu, frames = time.perf_counter(), time.process_time(), self._frames()
+            elapsed = wall - last_wall
+            self.samples.append({
+                't': round(wall - started, 2),
+                # 100% is one fully busy core
+                'cpu_percent': round((cpu - last_cpu) / elapsed * 100, 1),
+                'rss_bytes': resident_memory_bytes(),
+                'fps': round((frames - last_frames) / elapsed, 1)
+            })
+            last_wall, last_cpu, last_frames = wall, cpu, frames
+
+    def _frames(self):
+        return sum(capture.frames_read for capture in list(self.captures.values()))
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        cpu = [sample['cpu_percent'] for sample in self.samples]
+        rss = [sample['rss_bytes'] for sample in self.samples if sample['rss_bytes']]
+        return {
+            'cpu_percent_mean': round(float(np.mean(cpu)), 1),
+            'cpu_percent_max': round(float(np.max(cpu)), 1),
+            'rss_bytes_max': max(rss) if rss else None
+        }
+
+
+def _percentiles(values_seconds):
+    if not values_seconds:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    values = np.array(values_seconds) * 1000
+    return {
+        'p50': round(float(np.percentile(values, 50)), 2),
+        'p95': round(float(np.percentile(values, 95)), 2),
+        'p99': round(float(np.percentile(values, 99)), 2),
+        'max': round(float(values.max()), 2)
+    }
+
+
+def run_level(processor, detector, streams, args, level_index):
+    """Run `streams` simulated cameras for the configured duration and measure them"""
+    captures = {}
+
+    def open_capture(source_id, source_type):
+        scene = SyntheticScene(processor.detection_handler.dispatch_zone, boxes=args.boxes,
+                               width=args.width, height=args.height, seed=args.seed + len(captures))
+        capture = captures[source_id] = SyntheticCapture(scene, detector, fps=args.fps, video_path=args.video)
+        return capture
+
+    processor.capture_factory = open_capture
+    source_ids = [f'load-{level_index}-{i}' for i in range(streams)]
+    for source_id in source_ids:
+        if args.viewers:
+            # A server-overlay viewer makes each frame go through draw, encode and emit
+            processor.viewers.join(source_id, sid=f'{source_id}-viewer')
+        processor.start_stream(source_id, 'synthetic')
+
+    sampler = ResourceSampler(captures, interval=args.sample_interval)
+    try:
+        time.sleep(args.warmup)
+        for capture in list(captures.values()):
+            capture.reset_stats()
+        failed_before = {source_id: METRICS.counter('frames_failed_total', source_id) for source_id in source_ids}
+        sampler.start()
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        # Copy before stopping: release() ends the capture while its thread may still read
+        measured = {source_id: (capture.frames_read, capture.dropped, list(capture.latencies))
+                    for source_id, capture in captures.items()}
+    finally:
+        sampler.stop()
+        for source_id in source_ids:
+            processor.stop_stream(source_id)
+            processor.viewers.leave(source_id, f'{source_id}-viewer')
+
+    per_stream = {}
+    all_latencies = []
+    total_frames = total_dropped = 0
+    for source_id in source_ids:
+        frames, dropped, latencies = measured.get(source_id, (0, 0, []))
+        all_latencies.extend(latencies)
+        total_frames += frames
+        total_dropped += dropped
+        offered = frames + dropped
+        per_stream[source_id] = {
+            'fps': round(frames / elapsed, 2),
+            'dropped': dropped,
+            'drop_ratio': round(dropped / offered, 4) if offered else None,
+            'frames_failed': METRICS.counter('frames_failed_total', source_id) - failed_before[source_id],
+            'latency_ms': _percentiles(latencies)
+        }
+
+    fps = [stream['fps'] for stream in per_stream.values()]
+    worst_p95 = max((stream['latency_ms']['p95'] or 0.0) for stream in per_stream.values())
+    min_fps_ratio = min(fps) / args.fps if fps else 0.0
+    level = {
+        'streams': streams,
+        'duration_seconds': round(elapsed, 2),
+        'target_fps': args.fps,
+        'total_fps': round(sum(fps), 2),
+        'min_stream_fps': min(fps) if fps else 0.0,
+        'latency_ms': _percentiles(all_latencies),
+        'worst_stream_p95_ms': worst_p95,
+        'drop_ratio': round(total_dropped / max(1, total_frames + total_dropped), 4),
+        'frames_failed': sum(stream['frames_failed'] for stream in per_stream.values()),
+        'resources': sampler.summary(),
+        'timeline': sampler.samples,
+        'per_stream': per_stream
+    }
+    level['slo_violations'] = _slo_violations(level, min_fps_ratio, args)
+    return level
+
+
+def _slo_violations(level, min_fps_ratio, args):
+    violations = []
+    if level['worst_stream_p95_ms'] > args.slo_p95_ms:
+        violations.append(f"p95 latency {level['worst_stream_p95_ms']}ms > {args.slo_p95_ms}ms")
+    if min_fps_ratio < args.slo_fps_ratio:
+        violations.append(f"slowest stream at {level['min_stream_fps']} fps < "
+                          f"{args.slo_fps_ratio:.0%} of {args.fps} fps")
+    if level['frames_failed']:
+        violations.append(f"{level['frames_failed']} frames failed")
+    return violations
+
+
+def capacity_report(levels):
+    """Largest stream count within the SLOs, the knee after it, and per-level scaling"""
+    capacity, knee = 0, None
+    for level in levels:
+        if level['slo_violations']:
+            knee = level['streams']
+            break
+        capacity = level['streams']
+    single = levels[0]['total_fps'] / levels[0]['streams'] if levels and levels[0]['total_fps'] else None
+    return {
+        'capacity_streams': capacity,
+        'knee_streams': knee,
+        'knee_reasons': next((level['slo_violations'] for level in levels if level['streams'] == knee), []),
+        # Throughput relative to perfect scaling of the first level
+        'scaling_efficiency': {level['streams']: round(level['total_fps'] / (single * level['streams']), 3)
+                               for level in levels} if single else {}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find how many simulated cameras the pipeline sustains")
+    parser.add_argument('--streams', default='1,2,4,8', help="Comma-separated stream counts to step through")
+    parser.add_argument('--duration', type=float, default=20.0, help="Measured seconds per level")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Unmeasured seconds before each level")
+    parser.add_argument('--fps', type=float, default=25.0, help="Frame rate of every simulated camera")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--boxes', type=int, default=4, help="Boxes moving through each scene")
+    parser.add_argument('--video', help="Loop this file as the background of every stream")
+    parser.add_argument('--inference-ms', type=float, default=0.0, help="Simulated model time per frame")
+    parser.add_argument('--gpu', action='store_true', help="Simulated inference releases the GIL (sleep)")
+    parser.add_argument('--viewers', action='store_true', help="Attach one viewer per stream")
+    parser.add_argument('--slo-p95-ms', type=float, default=200.0)
+    parser.add_argument('--slo-fps-ratio', type=float, default=0.9,
+                        help="Every stream must reach this fraction of --fps")
+    parser.add_argument('--stop-at-knee', action='store_true', help="Skip the levels after the first violation")
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the full report to this JSON file")
+    args = parser.parse_args(argv)
+    stream_counts = sorted({int(count) for count in args.streams.split(',') if count.strip()})
+
+    levels = []
+    with tempfile.TemporaryDirectory(prefix='load-test-') as scratch, _working_directory(scratch):
+        detector = FakeDetector(latency=args.inference_ms / 1000.0, busy=not args.gpu)
+        processor = VideoProcessor(NullSocketIO(), detection_handler=DetectionHandler(model=detector))
+        try:
+            for index, streams in enumerate(stream_counts):
+                level = run_level(processor, detector, streams, args, index)
+                levels.append(level)
+                print(f"{streams:>4} streams: {level['total_fps']:8.1f} fps total  "
+                      f"min {level['min_stream_fps']:6.1f} fps  p95 {level['latency_ms']['p95']} ms  "
+                      f"drops {level['drop_ratio']:.1%}  cpu {level['resources'].get('cpu_percent_mean')}%"
+                      f"  {'; '.join(level['slo_violations']) or 'ok'}")
+                if args.stop_at_knee and level['slo_violations']:
+                    break
+        finally:
+            _shutdown(processor)
+
+    report = capacity_report(levels)
+    print(f"Capacity: {report['capacity_streams']} streams within SLO"
+          + (f"; knee at {report['knee_streams']} ({'; '.join(report['knee_reasons'])})"
+             if report['knee_streams'] else "; no knee within the tested levels"))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': vars(args),
+                'capacity': report,
+                'levels': levels
+            }, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+End-to-end pipeline benchmark: scripted detector -> SFSORT -> BoxTracker -> draw -> encode
+
+Runs on a CPU-only machine without model weights. From backend/ (or run the
+file directly, e.g. python backend/benchmarks/pipeline_benchmark.py):
+    python -m benchmarks.pipeline_benchmark --scenario all
+    python -m benchmarks.pipeline_benchmark --save-baseline      # record this machine's numbers
+    python -m benchmarks.pipeline_benchmark --baseline benchmarks/baseline.json
+The exit status is 1 when a result regresses past the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app import VideoProcessor  # noqa: E402
+from utils.detection_handler import DetectionHandler  # noqa: E402
+from utils.frame_delivery import QUALITY_TIERS  # noqa: E402
+from utils.metrics import METRICS, resident_memory_bytes  # noqa: E402
+
+# Absolute, so the file also runs as a script
+from benchmarks.synthetic import FakeDetector, SyntheticScene  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+SCENARIOS = {
+    'light': {'boxes': 2, 'frames': 600},
+    'busy': {'boxes': 8, 'frames': 600},
+    'crowded': {'boxes': 20, 'frames': 300}
+}
+
+# Stage means below this many milliseconds are too noisy to flag
+NOISE_FLOOR_MS = 0.05
+
+
+class NullSocketIO:
+    """Socket.IO stand-in; the benchmark has no clients"""
+
+    def emit(self, *args, **kwargs):
+        pass
+
+
+@contextmanager
+def _working_directory(path):
+    # Feedback databases and images land in a scratch directory, not the real db/
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _shutdown(processor):
+    handler = processor.detection_handler
+    handler.feedback_writer.close()
+    handler.feedback_collector.image_store.close()
+    if handler.feedback_storage.mongo_syncer is not None:
+        handler.feedback_storage.mongo_syncer.stop()
+    processor.event_bus.stop()
+    processor.frame_delivery.stop()
+
+
+def run_scenario(name, frames=None, inference_ms=0.0, seed=0, width=1920, height=1080):
+    """Push one synthetic scene through the real per-frame pipeline and measure it"""
+    config = SCENARIOS[name]
+    frames = frames or config['frames']
+    source_id = f'bench-{name}'
+    jpeg_quality = QUALITY_TIERS[0]['jpeg_quality']
+
+    with tempfile.TemporaryDirectory(prefix='pipeline-bench-') as scratch, _working_directory(scratch):
+        detector = FakeDetector(latency=inference_ms / 1000.0)
+        processor = VideoProcessor(NullSocketIO(), detection_handler=DetectionHandler(model=detector))
+        scene = SyntheticScene(processor.detection_handler.dispatch_zone, boxes=config['boxes'],
+                               width=width, height=height, seed=seed)
+        try:
+            frame_times = []
+            rss_start = resident_memory_bytes()
+            started = time.perf_counter()
+            for frame_count in range(frames):
+                with METRICS.time('scene', source_id):
+                    detections = scene.step()
+                    frame = scene.render(detections)
+                    detector.register(frame, detections)
+
+                frame_start = time.perf_counter()
+                processed = processor._process_frame_with_tracking(frame, source_id, frame_count)
+                with METRICS.time('draw', source_id):
+                    processor._render_overlays(processed)
+                with METRICS.time('encode', source_id):
+                    cv2.imencode('.jpg', processed, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+                frame_times.append(time.perf_counter() - frame_start)
+                METRICS.frame_processed(source_id)
+            elapsed = time.perf_counter() - started
+
+            processor.detection_handler.feedback_writer.flush(timeout=30)
+            rss_end = resident_memory_bytes()
+            tracker = processor.detection_handler.box_tracker
+            memory = processor.memory.report()
+        finally:
+            _shutdown(processor)
+
+    latencies = np.array(frame_times) * 1000
+    return {
+        'scenario': name,
+        'frames': frames,
+        'boxes': config['boxes'],
+        'inference_ms': inference_ms,
+        'elapsed_seconds': round(elapsed, 3),
+        'fps': round(frames / sum(frame_times), 2),
+        'frames_failed': METRICS.counter('frames_failed_total', source_id),
+        'frame_latency_ms': {
+            'mean': round(float(latencies.mean()), 3),
+            'p50': round(float(np.percentile(latencies, 50)), 3),
+            'p95': round(float(np.percentile(latencies, 95)), 3),
+            'p99': round(float(np.percentile(latencies, 99)), 3),
+            'max': round(float(latencies.max()), 3)
+        },
+        'stages': {stage: summary['mean_ms'] for stage, summary in METRICS.stage_summary(source_id).items()},
+        'memory': {
+            'rss_start_bytes': rss_start,
+            'rss_end_bytes': rss_end,
+            'rss_growth_bytes': rss_end - rss_start if rss_start and rss_end else None,
+            'structures': {name: entry.get('items') for name, entry in memory['structures'].items()}
+        },
+        'tracking': {
+            'boxes_completed': scene.boxes_completed,
+            'boxes_sold': tracker.box_sold_count,
+            'tracked_boxes': len(tracker.tracked_boxes)
+        }
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Regressions of a result against its baseline, as human-readable strings"""
+    regressions = []
+    if result['fps'] < baseline['fps'] * (1 - tolerance):
+        regressions.append(f"fps {result['fps']} < baseline {baseline['fps']}")
+    p95, base_p95 = result['frame_latency_ms']['p95'], baseline['frame_latency_ms']['p95']
+    if p95 > base_p95 * (1 + tolerance) and p95 - base_p95 > NOISE_FLOOR_MS:
+        regressions.append(f"frame p95 {p95}ms > baseline {base_p95}ms")
+    for stage, mean_ms in result['stages'].items():
+        base_ms = baseline['stages'].get(stage)
+        if base_ms is None or stage == 'scene':
+            continue
+        if mean_ms > base_ms * (1 + tolerance) and mean_ms - base_ms > NOISE_FLOOR_MS:
+            regressions.append(f"stage {stage} {mean_ms}ms > baseline {base_ms}ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline with a scripted detector")
+    parser.add_argument('--scenario', default='all', choices=['all'] + list(SCENARIOS))
+    parser.add_argument('--frames', type=int, default=None, help="Override the scenario's frame count")
+    parser.add_argument('--inference-ms', type=float, default=0.0, help="Simulated model time per frame")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed relative slowdown")
+    parser.add_argument('--output', help="Also write the full results to this JSON file")
+    args = parser.parse_args(argv)
+
+    names = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    results = {}
+    for name in names:
+        results[name] = run_scenario(name, frames=args.frames, inference_ms=args.inference_ms, seed=args.seed)
+        print(f"{name:>8}: {results[name]['fps']:8.1f} fps  "
+              f"p95 {results[name]['frame_latency_ms']['p95']:7.2f} ms  "
+              f"stages {results[name]['stages']}")
+
+    report = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor(), 'cpus': os.cpu_count()},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault('results', {}).update(results)
+        baseline['machine'] = report['machine']
+        baseline['created_at'] = report['created_at']
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('machine', {}).get('platform') != report['machine']['platform']:
+        print("Warning: the baseline was recorded on a different machine")
+
+    failed = False
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None or base.get('inference_ms') != result['inference_ms']:
+            print(f"{name}: no comparable baseline")
+            continue
+        regressions = compare(result, base, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {name}: {regression}")
+        failed = failed or bool(regressions)
+    if not failed:
+        print("No regressions")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
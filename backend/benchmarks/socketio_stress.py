@@ -0,0 +1,268 @@
+"""
+Socket.IO fan-out stress test: many headless viewers on one running stream
+
+Connects simulated dashboards to a live server, joins them to a stream's
+`join_video` room and steps through increasing viewer counts. Per level it
+reports frame delivery latency, per-viewer and total throughput, server CPU
+per viewer and the server's processing frame rate, scraped from /api/metrics,
+so the point where viewers start slowing processing down is visible.
+
+The server must already be processing the source. This client only needs
+python-socketio with its client extras (pip install "python-socketio[client]"),
+so it can run from another machine. Latency uses the server's frame
+timestamp and assumes the two clocks agree, as on one host or with NTP.
+Viewers share one Python process; when `client_cpu_cores` nears 1.0 the
+client is the bottleneck, so split the viewers across several processes:
+    python -m benchmarks.socketio_stress --url http://localhost:5000 --source uploads/a.mp4 \\
+        --viewers 0,10,50,100,200 --mode both
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+METRIC_PREFIX = 'pizza_tracker'
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class Viewer:
+    """One headless dashboard watching a stream"""
+
+    def __init__(self, url, source, binary, ack, overlay, max_latencies=20000):
+        import socketio
+
+        self.source = source
+        self.binary = binary
+        self.ack = ack
+        self.overlay = overlay
+        self.max_latencies = max_latencies
+        # websocket-client validates UTF-8 in pure Python unless told not to, which
+        # would make the client, not the server, the bottleneck for base64 frames
+        self.client = socketio.Client(reconnection=False,
+                                      websocket_extra_options={'skip_utf8_validation': True})
+        self.url = url
+        self.disconnects = 0
+        self.reset_stats()
+
+        event = 'video_frame_binary' if binary else 'video_frame'
+        self.client.on(event, self._on_frame)
+        self.client.on('disconnect', self._on_disconnect)
+
+    def reset_stats(self):
+        self.frames = 0
+        self.bytes = 0
+        self.latencies = []
+
+    def connect(self, transports):
+        self.client.connect(self.url, transports=transports, wait_timeout=10)
+        self.client.emit('join_video', {'source': self.source, 'binary': self.binary,
+                                        'ack': self.ack, 'overlay': self.overlay})
+
+    def close(self):
+        try:
+            # Stop the frames first: the websocket close handshake waits behind them
+            self.client.emit('leave_video', {'source': self.source})
+            self.client.disconnect()
+        except Exception:
+            pass
+
+    def _on_frame(self, message):
+        received = time.time()
+        self.frames += 1
+        self.bytes += len(message.get('frame') or b'')
+        if len(self.latencies) < self.max_latencies:
+            self.latencies.append(received - message.get('timestamp', received))
+        # A return value is sent back as the acknowledgement when the server asked for one
+        return True
+
+    def _on_disconnect(self, *args):
+        self.disconnects += 1
+
+
+def scrape_metrics(url, timeout=5.0):
+    """Samples of the server's /api/metrics as {(name, frozenset(labels)): value}"""
+    with urllib.request.urlopen(f'{url}/api/metrics', timeout=timeout) as response:
+        text = response.read().decode('utf-8')
+    samples = {}
+    for line in text.splitlines():
+        match = SAMPLE_RE.match(line)
+        if line.startswith('#') or match is None:
+            continue
+        name, labels, value = match.groups()
+        samples[(name, frozenset(LABEL_RE.findall(labels or '')))] = float(value)
+    return samples
+
+
+def _value(samples, name, **labels):
+    return samples.get((name, frozenset(labels.items())), 0.0)
+
+
+def _stage_mean_ms(before, after, stage, source):
+    name = f'{METRIC_PREFIX}_stage_duration_seconds'
+    count = _value(after, f'{name}_count', stage=stage, source=source) - \
+        _value(before, f'{name}_count', stage=stage, source=source)
+    total = _value(after, f'{name}_sum', stage=stage, source=source) - \
+        _value(before, f'{name}_sum', stage=stage, source=source)
+    return round(total / count * 1000, 3) if count else None
+
+
+def _percentiles(values_seconds):
+    if not values_seconds:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    values = np.array(values_seconds) * 1000
+    return {
+        'p50': round(float(np.percentile(values, 50)), 2),
+        'p95': round(float(np.percentile(values, 95)), 2),
+        'p99': round(float(np.percentile(values, 99)), 2),
+        'max': round(float(values.max()), 2)
+    }
+
+
+def measure_level(viewers, args, mode):
+    """Measure the connected viewers and the server for one window"""
+    time.sleep(args.settle)
+    for viewer in viewers:
+        viewer.reset_stats()
+    before = scrape_metrics(args.url)
+    client_cpu = time.process_time()
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    elapsed = time.perf_counter() - started
+    client_cpu = time.process_time() - client_cpu
+    after = scrape_metrics(args.url)
+
+    processed = _value(after, f'{METRIC_PREFIX}_frames_processed_total', source=args.source) - \
+        _value(before, f'{METRIC_PREFIX}_frames_processed_total', source=args.source)
+    server_cpu = (_value(after, 'process_cpu_seconds_total') - _value(before, 'process_cpu_seconds_total')) / elapsed
+    viewer_fps = [viewer.frames / elapsed for viewer in viewers]
+    latencies = [latency for viewer in viewers for latency in viewer.latencies]
+    total_bytes = sum(viewer.bytes for viewer in viewers)
+    return {
+        'mode': mode,
+        'viewers': len(viewers),
+        'connected': sum(1 for viewer in viewers if viewer.client.connected),
+        'duration_seconds': round(elapsed, 2),
+        'processing_fps': round(processed / elapsed, 2),
+        'server_cpu_cores': round(server_cpu, 3),
+        'client_cpu_cores': round(client_cpu / elapsed, 3),
+        'viewer_fps': {
+            'median': round(float(np.median(viewer_fps)), 2) if viewer_fps else None,
+            'min': round(min(viewer_fps), 2) if viewer_fps else None
+        },
+        'delivered_fps': round(sum(viewer_fps), 2),
+        'throughput_mbps': round(total_bytes * 8 / elapsed / 1e6, 2),
+        'latency_ms': _percentiles(latencies),
+        'emit_mean_ms': _stage_mean_ms(before, after, 'emit', args.source),
+        'encode_mean_ms': _stage_mean_ms(before, after, 'encode', args.source),
+        'disconnects': sum(viewer.disconnects for viewer in viewers)
+    }
+
+
+def _connect_viewers(viewers, count, args, binary):
+    transports = ['websocket'] if args.transport == 'websocket' else ['polling']
+    new = [Viewer(args.url, args.source, binary, args.ack, args.overlay) for _ in range(count - len(viewers))]
+
+    def connect(viewer):
+        try:
+            viewer.connect(transports)
+            return viewer
+        except Exception as e:
+            print(f"Viewer failed to connect: {e}", file=sys.stderr)
+            return None
+
+    with ThreadPoolExecutor(max_workers=args.connect_concurrency) as pool:
+        viewers.extend(viewer for viewer in pool.map(connect, new) if viewer is not None)
+
+
+def run_mode(mode, counts, args):
+    """Step one transport mode through the viewer counts; connections are kept between levels"""
+    viewers = []
+    levels = []
+    try:
+        for count in counts:
+            _connect_viewers(viewers, count, args, binary=(mode == 'binary'))
+            level = measure_level(viewers, args, mode)
+            levels.append(level)
+            print(f"{mode:>6} {level['viewers']:>5} viewers: processing {level['processing_fps']:6.1f} fps  "
+                  f"viewer fps {level['viewer_fps']['median']}  p95 {level['latency_ms']['p95']} ms  "
+                  f"{level['throughput_mbps']} Mbit/s  server cpu {level['server_cpu_cores']} cores  "
+                  f"client cpu {level['client_cpu_cores']} cores")
+    finally:
+        with ThreadPoolExecutor(max_workers=args.connect_concurrency) as pool:
+            list(pool.map(Viewer.close, viewers))
+    return levels
+
+
+def fanout_report(levels, tolerance, slo_p95_ms):
+    """Server CPU per viewer and the first viewer count that slows processing or breaks the latency SLO"""
+    baseline = levels[0]
+    report = {'baseline_processing_fps': baseline['processing_fps'], 'knee_viewers': None, 'knee_reasons': []}
+    for level in levels[1:]:
+        if baseline['viewers'] == 0 and level['viewers']:
+            level['server_cpu_ms_per_viewer_second'] = round(
+                (level['server_cpu_cores'] - baseline['server_cpu_cores']) / level['viewers'] * 1000, 3)
+        reasons = []
+        if level['processing_fps'] < baseline['processing_fps'] * (1 - tolerance):
+            reasons.append(f"processing fell to {level['processing_fps']} fps from {baseline['processing_fps']}")
+        p95 = level['latency_ms']['p95']
+        if p95 is not None and p95 > slo_p95_ms:
+            reasons.append(f"delivery p95 {p95}ms > {slo_p95_ms}ms")
+        if reasons and report['knee_viewers'] is None:
+            report['knee_viewers'] = level['viewers']
+            report['knee_reasons'] = reasons
+    report['max_viewers_within_budget'] = max(
+        (level['viewers'] for level in levels
+         if report['knee_viewers'] is None or level['viewers'] < report['knee_viewers']), default=0)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress Socket.IO frame fan-out with headless viewers")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--source', required=True, help="Source id of a stream the server is processing")
+    parser.add_argument('--viewers', default='0,10,50,100', help="Comma-separated viewer counts to step through")
+    parser.add_argument('--mode', default='base64', choices=['base64', 'binary', 'both'])
+    parser.add_argument('--ack', action='store_true', help="Acknowledge frames (adaptive quality and rate)")
+    parser.add_argument('--overlay', default='server', choices=['server', 'client'])
+    parser.add_argument('--transport', default='websocket', choices=['websocket', 'polling'])
+    parser.add_argument('--duration', type=float, default=15.0, help="Measured seconds per level")
+    parser.add_argument('--settle', type=float, default=3.0, help="Seconds to wait after connecting viewers")
+    parser.add_argument('--connect-concurrency', type=int, default=20)
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed drop in processing fps")
+    parser.add_argument('--slo-p95-ms', type=float, default=250.0)
+    parser.add_argument('--output', help="Write the full report to this JSON file")
+    args = parser.parse_args(argv)
+    args.url = args.url.rstrip('/')
+    counts = sorted({int(count) for count in args.viewers.split(',') if count.strip()})
+
+    try:
+        import socketio  # noqa: F401
+    except ImportError:
+        parser.error('python-socketio is required: pip install "python-socketio[client]"')
+
+    modes = ['base64', 'binary'] if args.mode == 'both' else [args.mode]
+    results = {}
+    for mode in modes:
+        levels = run_mode(mode, counts, args)
+        results[mode] = {'levels': levels, 'report': fanout_report(levels, args.tolerance, args.slo_p95_ms)}
+        report = results[mode]['report']
+        print(f"{mode}: up to {report['max_viewers_within_budget']} viewers within budget"
+              + (f"; knee at {report['knee_viewers']} ({'; '.join(report['knee_reasons'])})"
+                 if report['knee_viewers'] else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'config': vars(args),
+                       'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
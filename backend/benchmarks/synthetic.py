@@ -0,0 +1,310 @@
+"""
+Synthetic pizza-box scenes and a scripted stand-in for the YOLO model
+"""
+
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+CLASS_PIZZA = 0
+CLASS_BOX_OPEN = 1
+CLASS_BOX_CLOSE = 2
+
+# BGR fill colour of each class when a scene is rendered
+CLASS_COLORS = {
+    CLASS_PIZZA: (40, 120, 220),
+    CLASS_BOX_OPEN: (60, 200, 60),
+    CLASS_BOX_CLOSE: (40, 60, 200)
+}
+
+
+class _Tensor:
+    """Just enough of a torch tensor for `.cpu().numpy()`"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = np.asarray(value)
+
+    def __getitem__(self, index):
+        return _Tensor(self.value[index])
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.value
+
+
+class FakeBox:
+    """One detection in the shape ultralytics returns (`xyxy`, `cls`, `conf`)"""
+
+    __slots__ = ('xyxy', 'cls', 'conf')
+
+    def __init__(self, bbox, class_id, confidence):
+        self.xyxy = _Tensor([np.asarray(bbox, dtype=np.float32)])
+        self.cls = _Tensor([float(class_id)])
+        self.conf = _Tensor([float(confidence)])
+
+
+class FakeResults:
+    __slots__ = ('boxes',)
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class FakeDetector:
+    """Replaces the YOLO model with the detections scripted for each frame.
+
+    Frame producers call `register(frame, detections)`; calling the detector
+    with that frame returns them as ultralytics-style results. Frames are
+    matched by identity, so one detector can serve several streams at once.
+    `latency` seconds per call simulates the cost of a real model: CPU work
+    that holds the GIL when `busy` is set, like CPU inference, or a sleep that
+    releases it, like a GPU or native runtime.
+    """
+
+    def __init__(self, latency=0.0, busy=True):
+        self.latency = latency
+        self.busy = busy
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def register(self, frame, detections):
+        with self._lock:
+            self._pending[id(frame)] = detections
+
+    def __call__(self, frame, *args, **kwargs):
+        with self._lock:
+            detections = self._pending.pop(id(frame), [])
+        if self.latency and not self.busy:
+            time.sleep(self.latency)
+        elif self.latency:
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+        self.calls += 1
+        return [FakeResults([FakeBox(bbox, class_id, confidence) for bbox, class_id, confidence in detections])]
+
+
+class _ScriptedBox:
+    __slots__ = ('x', 'y', 'phase', 'phase_frames', 'open_frames', 'close_frames', 'speed', 'exit_x')
+
+    def __init__(self, x, y, open_frames, close_frames, speed, exit_x):
+        self.x = x
+        self.y = y
+        self.phase = 'enter'
+        self.phase_frames = 0
+        self.open_frames = open_frames
+        self.close_frames = close_frames
+        self.speed = speed
+        self.exit_x = exit_x
+
+
+class SyntheticScene:
+    """Boxes that walk into a dispatch zone, open, close and leave the frame.
+
+    Each box enters from the left or right edge, heads for the zone centre,
+    stays open and then closed for a random number of frames, and exits
+    through the bottom edge; a new box replaces it. Detections get positional
+    jitter, varying confidence and occasional misses, and open boxes show a
+    pizza detection, so the tracker and feedback paths see realistic input.
+    """
+
+    def __init__(self, zone, boxes=4, width=1920, height=1080, box_size=(180, 140),
+                 miss_rate=0.03, jitter=2.0, seed=0):
+        self.zone = zone
+        self.boxes = boxes
+        self.width = width
+        self.height = height
+        self.box_size = box_size
+        self.miss_rate = miss_rate
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.frame_index = 0
+        self.boxes_completed = 0
+        self._active = []
+        self._spawn_at = [i * 15 for i in range(boxes)]
+        self._target = np.asarray(zone.center, dtype=float)
+        self._background = self._make_background(seed)
+
+    def _make_background(self, seed):
+        noise = np.random.default_rng(seed).integers(60, 120, (self.height // 8, self.width // 8, 3), dtype=np.uint8)
+        return cv2.resize(noise, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+
+    def _spawn(self):
+        from_left = self.random.random() < 0.5
+        x = -self.box_size[0] / 2 if from_left else self.width + self.box_size[0] / 2
+        y = self._target[1] + self.random.uniform(-20, 20)
+        self._active.append(_ScriptedBox(
+            x, y,
+            open_frames=self.random.randint(20, 60),
+            close_frames=self.random.randint(20, 60),
+            speed=self.random.uniform(8, 20),
+            exit_x=self._target[0] + self.random.uniform(-200, 200)
+        ))
+
+    def _move_towards(self, box, tx, ty):
+        dx, dy = tx - box.x, ty - box.y
+        distance = (dx * dx + dy * dy) ** 0.5
+        if distance <= box.speed:
+            box.x, box.y = tx, ty
+            return True
+        box.x += dx / distance * box.speed
+        box.y += dy / distance * box.speed
+        return False
+
+    def step(self):
+        """Advance one frame; returns the frame's (bbox, class_id, confidence) detections"""
+        while self._spawn_at and self._spawn_at[0] <= self.frame_index:
+            self._spawn_at.pop(0)
+            self._spawn()
+
+        detections = []
+        for box in list(self._active):
+            box.phase_frames += 1
+            if box.phase == 'enter':
+                if self._move_towards(box, *self._target):
+                    box.phase, box.phase_frames = 'open', 0
+            elif box.phase == 'open' and box.phase_frames >= box.open_frames:
+                box.phase, box.phase_frames = 'close', 0
+            elif box.phase == 'close' and box.phase_frames >= box.close_frames:
+                box.phase, box.phase_frames = 'exit', 0
+            elif box.phase == 'exit' and self._move_towards(box, box.exit_x, self.height + self.box_size[1]):
+                self._active.remove(box)
+                self.boxes_completed += 1
+                self._spawn_at.append(self.frame_index + self.random.randint(5, 30))
+                continue
+
+            if self.random.random() < self.miss_rate:
+                continue
+            class_id = CLASS_BOX_OPEN if box.phase in ('enter', 'open') else CLASS_BOX_CLOSE
+            bbox = self._bbox(box.x, box.y, *self.box_size)
+            if bbox is None:
+                continue
+            detections.append((bbox, class_id, self.random.uniform(0.45, 0.97)))
+            if box.phase == 'open':
+                pizza = self._bbox(box.x, box.y, self.box_size[0] * 0.6, self.box_size[1] * 0.6)
+                if pizza is not None:
+                    detections.append((pizza, CLASS_PIZZA, self.random.uniform(0.6, 0.99)))
+
+        self.frame_index += 1
+        return detections
+
+    def _bbox(self, cx, cy, w, h):
+        jitter = self.random.gauss
+        x1 = max(0.0, cx - w / 2 + jitter(0, self.jitter))
+        y1 = max(0.0, cy - h / 2 + jitter(0, self.jitter))
+        x2 = min(float(self.width), cx + w / 2 + jitter(0, self.jitter))
+        y2 = min(float(self.height), cy + h / 2 + jitter(0, self.jitter))
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return None
+        return np.array([x1, y1, x2, y2], dtype=np.float32)
+
+    def render(self, detections, background=None):
+        """A frame showing the detections as filled rectangles on a textured background"""
+        frame = self._background.copy() if background is None else background
+        for bbox, class_id, _ in detections:
+            x1, y1, x2, y2 = (int(value) for value in bbox)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), CLASS_COLORS[class_id], -1)
+        return frame
+
+
+class SyntheticCapture:
+    """A live camera for `VideoProcessor`, with the `cv2.VideoCapture` methods it uses.
+
+    Frames are produced on a fixed `fps` schedule from a SyntheticScene whose
+    detections are registered with the FakeDetector. Pixels are the scene's
+    own rendering, or frames of `video_path` played in a loop with the
+    detections drawn on top. Like a real camera the source does not wait:
+    frames that come due while the reader is still busy are overwritten and
+    counted in `dropped`. The latency of a frame runs from its capture time to
+    the next `read()`, which the processing loop only calls once the previous
+    frame has been tracked and published.
+    """
+
+    def __init__(self, scene, detector, fps=25.0, video_path=None, max_latencies=100000):
+        self.scene = scene
+        self.detector = detector
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.max_latencies = max_latencies
+        self._video = None
+        if video_path is not None:
+            self._video = cv2.VideoCapture(video_path)
+            if not self._video.isOpened():
+                raise ValueError(f"Could not open video file: {video_path}")
+        self._opened = True
+        self._next_due = None
+        self._pending = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Start a new measurement window"""
+        self.frames_read = 0
+        self.dropped = 0
+        self.latencies = []
+
+    def isOpened(self):
+        return self._opened
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.scene.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.scene.height
+        return 0.0
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        now = time.perf_counter()
+        if self._pending is not None and len(self.latencies) < self.max_latencies:
+            self.latencies.append(now - self._pending)
+
+        if self._next_due is None:
+            self._next_due = now
+        if now < self._next_due:
+            time.sleep(self._next_due - now)
+        else:
+            missed = int((now - self._next_due) / self.interval)
+            if missed:
+                # The scene keeps moving while the reader is busy
+                self.dropped += missed
+                self._next_due += missed * self.interval
+                for _ in range(min(missed, 100)):
+                    self.scene.step()
+        self._pending = self._next_due
+        self._next_due += self.interval
+
+        detections = self.scene.step()
+        frame = self.scene.render(detections, self._next_background())
+        self.detector.register(frame, detections)
+        self.frames_read += 1
+        return True, frame
+
+    def _next_background(self):
+        if self._video is None:
+            return None
+        ok, frame = self._video.read()
+        if not ok:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._video.read()
+            if not ok:
+                return None
+        if frame.shape[1] != self.scene.width or frame.shape[0] != self.scene.height:
+            frame = cv2.resize(frame, (self.scene.width, self.scene.height))
+        return frame
+
+    def release(self):
+        self._opened = False
+        self._pending = None
+        if self._video is not None:
+            self._video.release()
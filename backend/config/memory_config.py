@@ -0,0 +1,20 @@
+# Memory caps for long-running in-process state
+MEMORY_CONFIG = {
+    # How often (seconds) the processing thread checks the caps
+    'check_interval': 10,
+    # Hard caps on the number of items per structure; the oldest or stalest go first
+    'caps': {
+        'tracked_boxes': 500,
+        'sfsort_active_tracks': 500,
+        'sfsort_lost_tracks': 1000,
+        'streams': 32
+    },
+    # Warn once a structure passes this fraction of its cap
+    'warn_ratio': 0.8,
+    # Warn when the process resident size passes this many bytes (None disables)
+    'rss_warning_bytes': 4 * 1024 * 1024 * 1024,
+    # Items sampled per container when estimating its size in bytes
+    'sample_items': 100,
+    # Stack depth recorded by tracemalloc when it is started through the API
+    'tracemalloc_frames': 10
+}
@@ -8,6 +8,14 @@ MONGODB_CONFIG = {
     'collections': {
         'feedback': 'detection_feedback',
         'metrics': 'model_metrics'
+    },
+    # Background outbox sync (SQLite -> MongoDB)
+    'sync': {
+        'enabled': True,
+        'batch_size': 500,
+        'interval': 5.0,
+        'max_backoff': 300.0,
+        'timeout_ms': 2000
     }
 }
 
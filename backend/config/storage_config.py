@@ -0,0 +1,26 @@
+# Disk usage limits and retention for locally stored data
+STORAGE_CONFIG = {
+    # Total budget for everything the maintenance service manages
+    'quota_bytes': 20 * 1024 * 1024 * 1024,
+    # Once over quota, delete oldest data until usage drops below this fraction
+    'quota_low_watermark': 0.9,
+    'check_interval': 600,
+    # Days to keep each data class; None keeps it until the quota needs the space
+    'retention_days': {
+        'images': 60,
+        'crops': 30,
+        'feedback_log': 180,
+        'feedback_rows': 365,
+        'logs': 30,
+        'uploads': 14
+    },
+    # Older feedback frames are re-encoded smaller once, labels stay valid
+    'recompress_after_days': 7,
+    'recompress_quality': 70,
+    'recompress_max_side': 640,
+    # VACUUM SQLite only while no stream is processing and enough pages are free
+    'vacuum_interval_hours': 24,
+    'vacuum_min_free_ratio': 0.2,
+    # Pause between file operations so maintenance never saturates the disk
+    'io_pause': 0.005
+}
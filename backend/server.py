@@ -0,0 +1,199 @@
+"""
+Production entry point for the backend
+
+`app.py` runs the Werkzeug development server: debugger on, and the reloader
+starts a second process that loads the model again. This launcher serves the
+app with gunicorn instead:
+
+- the YOLO weights are loaded once, before any worker is forked, and the
+  heap is frozen so forked workers share the weight buffers copy-on-write;
+- each worker warms the model up in the background and reports ready on
+  /api/ready (503 until then; other API requests and Socket.IO connections
+  are refused while it warms up);
+- gunicorn runs the threaded `gthread` worker and Socket.IO runs in threading
+  mode. The pipeline is OS threads blocked in OpenCV and PyTorch calls, which
+  would stall an eventlet or gevent hub, and Flask-SocketIO would pick either
+  one automatically when installed. simple-websocket gives threading mode
+  real WebSocket transport; every open WebSocket holds one of `--threads`.
+
+Usage, from the repository root:
+    python backend/server.py --host 0.0.0.0 --port 5000
+    python backend/server.py --workers 3      # workers on ports 5000, 5001 and 5002
+
+Workers are independent servers, one gunicorn arbiter with a single worker
+per port. Streams, viewers and counts live in the process that runs them,
+and Socket.IO events do not cross processes (that would need a message
+queue such as Redis), which is also why a port never gets more than one
+worker. So a camera and every dashboard watching it must use the same
+worker: route each camera to one port at the proxy. Workers share db/ and
+uploads/, and each writes its own log file.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from gunicorn.app.base import BaseApplication  # noqa: E402
+from gunicorn.arbiter import Arbiter  # noqa: E402
+from gunicorn.errors import HaltServer  # noqa: E402
+
+from utils.detection_handler import DetectionHandler, load_model  # noqa: E402
+
+logger = logging.getLogger('server')
+
+
+def _warm_up(app, handler, runs):
+    try:
+        handler.warmup(runs)
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}")
+        # A model that cannot run must not receive traffic. This exit code makes
+        # gunicorn stop instead of restarting the worker; the supervisor decides
+        logging.shutdown()
+        os._exit(Arbiter.WORKER_BOOT_ERROR)
+    app.ready.set()
+    logger.info("Server is ready")
+
+
+class GunicornServer(BaseApplication):
+    """gunicorn serving the app around an already loaded model.
+
+    The app is built in `load()`, which runs in the forked gunicorn worker:
+    the pipeline, storage and warm-up threads must start in the process that
+    serves requests, since threads do not survive a fork.
+    """
+
+    def __init__(self, model, host, port, threads, warmup_runs, worker=None):
+        self.model = model
+        self.warmup_runs = warmup_runs
+        self.worker = worker
+        self.options = {
+            'bind': f'{host}:{port}',
+            'workers': 1,
+            'worker_class': 'gthread',
+            'threads': threads,
+            # Socket.IO connections are long-lived; the worker heartbeat is separate
+            'timeout': 120,
+            'graceful_timeout': 30,
+            'proc_name': f'pizza-tracker-{port}'
+        }
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from utils.logging_config import setup_logging
+        setup_logging(log_file=f'backend-worker{self.worker}.log' if self.worker is not None else None)
+        from app import create_app
+
+        try:
+            import simple_websocket  # noqa: F401
+        except ImportError:
+            logger.warning("simple-websocket is not installed; Socket.IO clients will fall back to long-polling")
+
+        handler = DetectionHandler(model=self.model)
+        app, _ = create_app(detection_handler=handler, async_mode='threading')
+        app.start_time = time.time()
+        threading.Thread(target=_warm_up, args=(app, handler, self.warmup_runs),
+                         name='ModelWarmup', daemon=True).start()
+        logger.info(f"Serving on {self.options['bind']}"
+                    + (f" (worker {self.worker}, pid {os.getpid()})" if self.worker is not None else ""))
+        return app
+
+
+def serve(model, host, port, threads, warmup_runs, worker=None):
+    """Run one gunicorn server around an already loaded model; returns when it stops"""
+    GunicornServer(model, host, port, threads, warmup_runs, worker).run()
+
+
+def _fork_workers(model, args):
+    """Fork one server per port and exit when any of them does"""
+    children = {}
+    for worker in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                serve(model, args.host, args.port + worker, args.threads, args.warmup_runs, worker=worker)
+            except SystemExit as e:
+                # gunicorn exits through sys.exit when it stops
+                code = e.code or 0
+            except HaltServer as e:
+                code = e.exit_status
+            except BaseException as e:
+                # Nothing may unwind into the parent's code in the forked child
+                logger.error(f"Worker {worker} failed: {str(e)}")
+                code = 1
+            logging.shutdown()
+            os._exit(code)
+        children[pid] = worker
+
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    pid, status = os.wait()
+    code = os.waitstatus_to_exitcode(status)
+    logger.warning(f"Worker {children.pop(pid)} (pid {pid}) exited with {code}; stopping the others")
+    requested = bool(stopping)
+    stop(None, None)
+    for pid in children:
+        os.waitpid(pid, 0)
+    # A worker ending on its own is a failure even with a clean exit code
+    return code if requested else code or 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the backend for production")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', 1)),
+                        help="Forked server processes on consecutive ports, sharing the loaded model")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', 100)),
+                        help="Request threads per worker; each open WebSocket holds one")
+    parser.add_argument('--warmup-runs', type=int, default=2, help="Blank frames run through the model")
+    args = parser.parse_args(argv)
+
+    # The workers install the queued logging of the app; the parent only needs stderr
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    started = time.perf_counter()
+    try:
+        model = load_model()
+    except Exception as e:
+        logger.error(f"Error loading model: {str(e)}")
+        return 1
+    logger.info(f"Model loaded in {time.perf_counter() - started:.1f}s")
+
+    # Objects allocated so far (the model above all) move to a permanent
+    # generation, so collections in the forked workers never write to their pages
+    gc.freeze()
+    if args.workers <= 1:
+        serve(model, args.host, args.port, args.threads, args.warmup_runs)
+        return 0
+    return _fork_workers(model, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
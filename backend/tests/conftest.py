@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the backend modules the way app.py does (`from utils.x import ...`)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
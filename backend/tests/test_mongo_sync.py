@@ -0,0 +1,215 @@
+"""
+MongoSyncer against an in-process MongoDB stand-in passed as `client_factory`
+"""
+
+import json
+import time
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from utils.mongo_sync import MongoSyncer
+
+MONGODB_CONFIG = {'database': 'pizza', 'collections': {'feedback': 'feedback', 'metrics': 'metrics'}}
+
+
+class FakeCollection:
+    """Applies UpdateOne upserts the way MongoDB does and can fail on demand"""
+
+    def __init__(self):
+        self.documents = {}
+        self.bulk_calls = []
+        # Queued failures, one per bulk_write call: an exception, or a set of
+        # operation indexes to reject with a BulkWriteError
+        self.failures = []
+
+    def create_index(self, keys):
+        pass
+
+    def bulk_write(self, operations, ordered=True):
+        self.bulk_calls.append({'operations': operations, 'ordered': ordered})
+        failure = self.failures.pop(0) if self.failures else None
+        if isinstance(failure, Exception):
+            raise failure
+        rejected = failure or set()
+
+        for index, operation in enumerate(operations):
+            if index in rejected:
+                continue
+            assert operation._upsert
+            _id = operation._filter['_id']
+            if _id not in self.documents:
+                self.documents[_id] = {'_id': _id, **operation._doc.get('$setOnInsert', {})}
+            self.documents[_id].update(operation._doc.get('$set', {}))
+
+        if rejected:
+            raise BulkWriteError({'writeErrors': [{'index': index, 'code': 11000, 'errmsg': 'rejected'}
+                                                  for index in sorted(rejected)]})
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+
+class FakeAdmin:
+    def __init__(self, client):
+        self.client = client
+
+    def command(self, name):
+        if not self.client.reachable:
+            raise AutoReconnect('connection refused')
+        return {'ok': 1}
+
+
+class FakeClient:
+    def __init__(self, databases, reachable=True):
+        self.databases = databases
+        self.reachable = reachable
+        self.admin = FakeAdmin(self)
+        self.closed = False
+
+    def __getitem__(self, name):
+        return self.databases.setdefault(name, FakeDatabase())
+
+    def close(self):
+        self.closed = True
+
+
+class FakeServer:
+    """Client factory whose databases outlive the clients, like a real server"""
+
+    def __init__(self):
+        self.databases = {}
+        self.reachable = True
+        self.clients = []
+
+    def __call__(self, uri):
+        client = FakeClient(self.databases, self.reachable)
+        self.clients.append(client)
+        return client
+
+    @property
+    def feedback(self):
+        return self.databases.setdefault('pizza', FakeDatabase())['feedback']
+
+
+class FakeOutbox:
+    """The part of FeedbackStorage the syncer uses"""
+
+    def __init__(self, count):
+        self.rows = [{
+            'id': row_id,
+            'uid': f'uid-{row_id}',
+            'timestamp': f'2024-05-01T12:00:{row_id:02d}',
+            'track_id': str(row_id),
+            'class_id': row_id % 2,
+            'confidence': 0.9,
+            'is_correct': 1,
+            'bbox': json.dumps([0, 0, 10, 10]),
+            'issues': '[]',
+            'tracking_info': None,
+            'user_feedback': 1
+        } for row_id in range(1, count + 1)]
+        self.synced = set()
+
+    def fetch_unsynced(self, limit=500):
+        return [dict(row) for row in self.rows if row['id'] not in self.synced][:limit]
+
+    def mark_synced(self, ids):
+        self.synced.update(ids)
+
+    def count_unsynced(self):
+        return len(self.rows) - len(self.synced)
+
+
+def _syncer(outbox, server, **kwargs):
+    return MongoSyncer(outbox, 'mongodb://fake', MONGODB_CONFIG, client_factory=server, **kwargs)
+
+
+def test_rows_are_upserted_by_uid_with_set_on_insert():
+    outbox, server = FakeOutbox(3), FakeServer()
+    syncer = _syncer(outbox, server, start=False)
+
+    assert syncer.sync_once() == 3
+
+    call, = server.feedback.bulk_calls
+    assert call['ordered'] is False
+    for operation, row in zip(call['operations'], outbox.rows):
+        assert operation._filter == {'_id': row['uid']}
+        assert list(operation._doc) == ['$setOnInsert']
+        assert operation._upsert
+    assert set(server.feedback.documents) == {'uid-1', 'uid-2', 'uid-3'}
+    document = server.feedback.documents['uid-2']
+    assert document['sqlite_id'] == 2
+    assert document['detection']['bbox'] == [0, 0, 10, 10]
+    assert outbox.synced == {1, 2, 3}
+    assert syncer.sync_once() == 0
+
+
+def test_resending_a_row_does_not_overwrite_the_stored_document():
+    outbox, server = FakeOutbox(2), FakeServer()
+    syncer = _syncer(outbox, server, start=False)
+    syncer.sync_once()
+    # A consumer has processed the document since it was synced
+    server.feedback.documents['uid-1']['processed'] = True
+
+    # The outbox lost the synced mark (e.g. a crash before mark_synced committed)
+    outbox.synced.clear()
+    assert syncer.sync_once() == 2
+
+    assert len(server.feedback.documents) == 2
+    assert server.feedback.documents['uid-1']['processed'] is True
+
+
+def test_rows_rejected_by_a_bulk_write_are_retried():
+    outbox, server = FakeOutbox(4), FakeServer()
+    syncer = _syncer(outbox, server, start=False)
+    server.feedback.failures.append({1, 3})
+
+    assert syncer.sync_once() == 2
+    assert outbox.synced == {1, 3}
+    assert set(server.feedback.documents) == {'uid-1', 'uid-3'}
+
+    assert syncer.sync_once() == 2
+    retried = server.feedback.bulk_calls[-1]['operations']
+    assert [operation._filter['_id'] for operation in retried] == ['uid-2', 'uid-4']
+    assert outbox.synced == {1, 2, 3, 4}
+    assert set(server.feedback.documents) == {'uid-1', 'uid-2', 'uid-3', 'uid-4'}
+
+
+def test_failed_bulk_write_marks_nothing_and_raises():
+    outbox, server = FakeOutbox(2), FakeServer()
+    syncer = _syncer(outbox, server, start=False)
+    server.feedback.failures.append(AutoReconnect('connection reset'))
+
+    with pytest.raises(AutoReconnect):
+        syncer.sync_once()
+    assert outbox.synced == set()
+
+
+def test_background_thread_retries_until_mongo_is_reachable():
+    outbox, server = FakeOutbox(3), FakeServer()
+    server.reachable = False
+    syncer = _syncer(outbox, server, interval=0.01, max_backoff=0.05)
+    try:
+        deadline = time.monotonic() + 5
+        while syncer.failed_attempts < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert syncer.failed_attempts >= 2
+        assert not syncer.connected
+        assert outbox.synced == set()
+
+        server.reachable = True
+        server.feedback.failures.append(AutoReconnect('connection reset'))
+        while outbox.count_unsynced() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert outbox.synced == {1, 2, 3}
+        assert syncer.to_dict()['pending'] == 0
+        # Every failed attempt closed its client before reconnecting
+        assert all(client.closed for client in server.clients[:-1])
+    finally:
+        syncer.stop()
@@ -0,0 +1,49 @@
+"""
+Parsing of SFSORT output rows into (bbox, track_id)
+"""
+
+import numpy as np
+
+from utils.detection_handler import SFSORT, unpack_track
+
+TRACKER_ARGS = {'high_th': 0.6, 'low_th': 0.1, 'new_track_th': 0.7, 'frame_width': 1024, 'frame_height': 768}
+
+
+def _track(boxes, scores, tracker=None):
+    tracker = tracker or SFSORT(dict(TRACKER_ARGS))
+    return tracker, tracker.update(np.array(boxes, dtype=float), np.array(scores, dtype=float))
+
+
+def test_real_sfsort_rows_give_the_box_and_id():
+    boxes = [[100, 100, 200, 200], [400, 300, 520, 420]]
+    _, tracks = _track(boxes, [0.9, 0.8])
+
+    assert len(tracks) == 2
+    parsed = [unpack_track(track) for track in tracks]
+    for (bbox, track_id), box in zip(parsed, boxes):
+        assert bbox.shape == (4,)
+        assert bbox.dtype == float
+        np.testing.assert_allclose(bbox, box)
+        assert isinstance(track_id, int)
+    assert len({track_id for _, track_id in parsed}) == 2
+
+
+def test_ids_stay_stable_across_frames():
+    tracker, first = _track([[100, 100, 200, 200]], [0.9])
+    _, moved = _track([[104, 102, 204, 202]], [0.9], tracker)
+
+    (_, first_id), = [unpack_track(track) for track in first]
+    (bbox, moved_id), = [unpack_track(track) for track in moved]
+    assert moved_id == first_id
+    # The Kalman filter smooths the box, so it only follows the detection roughly
+    np.testing.assert_allclose(bbox, [104, 102, 204, 202], atol=10)
+
+
+def test_flat_rows_are_still_accepted():
+    bbox, track_id = unpack_track([10, 20, 30, 40, 7])
+    np.testing.assert_allclose(bbox, [10, 20, 30, 40])
+    assert track_id == 7
+
+    bbox, track_id = unpack_track(np.array([10.5, 20, 30, 40]))
+    np.testing.assert_allclose(bbox, [10.5, 20, 30, 40])
+    assert track_id is None
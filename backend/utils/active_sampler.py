@@ -0,0 +1,112 @@
+"""
+Budgeted active-learning selection of detections for human review
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from .image_store import RecentHashes, dhash
+
+
+class ActiveLearningSampler:
+    """Chooses which low-confidence detections are worth a reviewer's time.
+
+    Candidates are plain dicts with 'bbox', 'class' and 'confidence'; no pixels
+    are copied to score them. Each candidate's score is its uncertainty (how
+    close its confidence is to `decision_threshold`) weighted by how rarely its
+    class has been sampled. The best candidates are taken until either the
+    per-hour budget or `max_per_check` is used up. A candidate is skipped when
+    its crop's perceptual hash is within `diversity_distance` bits of a recently
+    sampled crop of the same class; only those crops are hashed, straight from
+    the frame.
+    """
+
+    def __init__(self, budget_per_hour=60, max_per_check=5, confidence_threshold=0.9,
+                 decision_threshold=0.5, diversity_distance=6, recent_hashes=256):
+        self.budget_per_hour = budget_per_hour
+        self.max_per_check = max_per_check
+        self.confidence_threshold = confidence_threshold
+        self.decision_threshold = decision_threshold
+        self.diversity_distance = diversity_distance
+        self.recent_hashes = recent_hashes
+
+        self._lock = threading.Lock()
+        self._sampled_times = deque()
+        self._recent = {}
+        self.class_counts = {}
+
+        self.considered = 0
+        self.selected = 0
+        self.skipped_budget = 0
+        self.skipped_duplicate = 0
+
+        self.logger = logging.getLogger('ActiveLearningSampler')
+
+    def is_candidate(self, confidence):
+        """Cheap pre-filter applied before building candidate dicts"""
+        return confidence < self.confidence_threshold
+
+    def budget_remaining(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._sampled_times and now - self._sampled_times[0] >= 3600:
+                self._sampled_times.popleft()
+            return max(0, self.budget_per_hour - len(self._sampled_times))
+
+    def uncertainty(self, confidence):
+        """1.0 at the decision threshold, falling to 0.0 at confidence 0 or 1"""
+        span = max(self.decision_threshold, 1.0 - self.decision_threshold)
+        return max(0.0, 1.0 - abs(float(confidence) - self.decision_threshold) / span)
+
+    def class_weight(self, class_id):
+        """Rarely sampled classes get priority so labels stay balanced"""
+        return 1.0 / math.sqrt(1 + self.class_counts.get(class_id, 0))
+
+    def score(self, candidate):
+        return self.uncertainty(candidate['confidence']) * self.class_weight(candidate['class'])
+
+    def select(self, frame, candidates):
+        """Return the candidates to store and review, best first"""
+        self.considered += len(candidates)
+        budget = min(self.budget_remaining(), self.max_per_check)
+        if budget <= 0:
+            self.skipped_budget += len(candidates)
+            return []
+
+        selected = []
+        for candidate in sorted(candidates, key=self.score, reverse=True):
+            if len(selected) >= budget:
+                self.skipped_budget += 1
+                continue
+            x1, y1, x2, y2 = candidate['bbox']
+            # A view into the frame; hashing it copies only a tiny thumbnail
+            phash = dhash(frame[y1:y2, x1:x2])
+            recent = self._recent.setdefault(candidate['class'], RecentHashes(self.recent_hashes))
+            if recent.find(phash, self.diversity_distance) is not None:
+                self.skipped_duplicate += 1
+                continue
+            recent.add(phash, candidate['bbox'])
+            candidate['score'] = round(self.score(candidate), 4)
+            selected.append(candidate)
+
+        now = time.monotonic()
+        with self._lock:
+            for candidate in selected:
+                self._sampled_times.append(now)
+                self.class_counts[candidate['class']] = self.class_counts.get(candidate['class'], 0) + 1
+        self.selected += len(selected)
+        return selected
+
+    def to_dict(self):
+        return {
+            'budget_per_hour': self.budget_per_hour,
+            'budget_remaining': self.budget_remaining(),
+            'considered': self.considered,
+            'selected': self.selected,
+            'skipped_budget': self.skipped_budget,
+            'skipped_duplicate': self.skipped_duplicate,
+            'class_counts': dict(self.class_counts)
+        }
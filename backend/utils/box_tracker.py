@@ -3,25 +3,14 @@ from collections import defaultdict
 import cv2
 from datetime import datetime
 import logging
-import os
-
-# Configure logging with file handler
-log_dir = 'logs'
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, 'box_tracker.log')
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
+from .logging_config import LogThrottle
 
+# Handlers are installed once by logging_config.setup_logging()
 logger = logging.getLogger('BoxTracker')
 
+# Per-frame messages are rate limited so they cannot flood the log
+hot_path_log = LogThrottle(interval=5.0)
+
 class BoxTracker:
     def __init__(self):
         self.tracked_boxes = {}  
@@ -47,7 +36,8 @@ class BoxTracker:
         logger.info(f"Sustained Close Frames: {self.SUSTAINED_CLOSE_FRAMES}")
         
     def update_tracking(self, tracked_data, dispatch_zone, frame, gui, frame_count):
-        logger.info(f"Processing frame {frame_count} with {len(tracked_data)} tracked items")
+        hot_path_log.log(logger, logging.DEBUG, 'frame',
+                         "Processing frame %d with %d tracked items", frame_count, len(tracked_data))
         gui.log_message(f"Frame {frame_count}: {len(tracked_data)} tracked items")
         current_frame_tracked_ids = set()
         
@@ -71,9 +61,10 @@ class BoxTracker:
                     'confidence': conf,
                     'track_id': track_id
                 })
-                logger.debug(f"Processed track {track_id}: class={cls}, conf={conf:.2f}")
+                logger.debug("Processed track %s: class=%s, conf=%.2f", track_id, cls, conf)
             except Exception as e:
-                logger.warning(f"Error processing tracked item: {str(e)}")
+                hot_path_log.log(logger, logging.WARNING, 'item_error',
+                                 "Error processing tracked item: %s", e)
                 gui.log_message(f"Error processing tracked item: {str(e)}")
                 continue
         
@@ -93,7 +84,7 @@ class BoxTracker:
             is_in_zone = dispatch_zone.is_point_in_zone((center_x, center_y))
             
             if track_id not in self.tracked_boxes:
-                logger.info(f"New track detected: {track_id}")
+                logger.info("New track detected: %s", track_id)
                 gui.log_message(f"New track detected: {track_id}")
                 self.tracked_boxes[track_id] = {
                     'status_history': [],
@@ -119,12 +110,13 @@ class BoxTracker:
             
             if is_in_zone and current_status == self.STATUS_OPEN:
                 self.pending_boxes.add(track_id)
-                logger.info(f"Track {track_id} added to pending boxes")
+                hot_path_log.log(logger, logging.DEBUG, ('pending', track_id),
+                                 "Track %s added to pending boxes", track_id)
                 gui.log_message(f"Track {track_id} added to pending boxes")
             
             if self._validate_box_sold(track_id, box_info, is_in_zone):
                 self.box_sold_count += 1
-                logger.info(f"Track {track_id}: BOX SOLD! Total sold: {self.box_sold_count}")
+                logger.info("Track %s: BOX SOLD! Total sold: %d", track_id, self.box_sold_count)
                 gui.log_message(f"Track {track_id}: BOX SOLD! Total sold: {self.box_sold_count}")
                 gui.log_message(f"BOX SOLD! Track ID: {track_id}")
                 del self.tracked_boxes[track_id]
@@ -135,7 +127,7 @@ class BoxTracker:
         current_pending_count = len(self.pending_boxes)
         if current_pending_count != self.last_pending_count:
             self.last_pending_count = current_pending_count
-            logger.info(f"Pending boxes count updated: {current_pending_count}")
+            logger.info("Pending boxes count updated: %d", current_pending_count)
             gui.log_message(f"Pending boxes count updated: {current_pending_count}")
         gui.update_counts(current_pending_count, self.box_sold_count)
 
@@ -191,11 +183,8 @@ class BoxTracker:
             last_status_valid = last_status == self.STATUS_CLOSE
         
         if pattern_matched and spatial_valid and temporal_valid and last_status_valid:
-            logger.info(f"Track {track_id} sale validated:")
-            logger.info(f"- Pattern matched: {pattern_matched}")
-            logger.info(f"- Spatial valid: {spatial_valid}")
-            logger.info(f"- Temporal valid: {temporal_valid}")
-            logger.info(f"- Last status valid: {last_status_valid}")
+            logger.info("Track %s sale validated: pattern=%s, spatial=%s, temporal=%s, last_status=%s",
+                        track_id, pattern_matched, spatial_valid, temporal_valid, last_status_valid)
             return True
         return False
 
@@ -211,8 +200,19 @@ class BoxTracker:
                 box_info["last_seen_frame"] = 0
 
         for track_id in boxes_to_remove:
-            logger.info(f"Track {track_id}: Removed due to inactivity.")
+            logger.debug("Track %s: Removed due to inactivity.", track_id)
+            del self.tracked_boxes[track_id]
+
+    def evict_tracks(self, count):
+        """Drop the `count` stalest tracks (longest unseen, then oldest) to respect a memory cap"""
+        stalest = sorted(self.tracked_boxes.items(),
+                         key=lambda item: (-item[1]["last_seen_frame"], item[1]["first_seen_time"]))[:count]
+        for track_id, _ in stalest:
             del self.tracked_boxes[track_id]
+            self.pending_boxes.discard(track_id)
+        if stalest:
+            logger.warning("Evicted %d tracks to stay under the tracked box cap", len(stalest))
+        return len(stalest)
 
     def _map_class_to_status(self, class_id):
         if class_id == 1:  # box_open
@@ -251,7 +251,7 @@ class BoxTracker:
         return False
 
     def draw_tracking_info_on_frame(self, frame):
-        for track_id, box_info in self.tracked_boxes.items():
+        for track_id, box_info in list(self.tracked_boxes.items()):
             if 'last_bbox' not in box_info:
                 continue
                 
@@ -277,21 +277,59 @@ class BoxTracker:
             cv2.putText(frame, label, (x1, y1 - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
 
-    def draw_statistics_on_frame(self, frame):
-        stats_text = [
-            f"Boxes Sold: {self.box_sold_count}",
-            f"Pending Boxes: {len(self.pending_boxes)}"
-        ]
-        
-        
-        current_open_boxes = sum(1 for box_info in self.tracked_boxes.values() 
+    def count_boxes_in_zone(self):
+        """Count open and closed boxes currently in the dispatch zone"""
+        current_open_boxes = sum(1 for box_info in list(self.tracked_boxes.values()) 
                                  if box_info["in_dispatch_zone"] and 
                                     box_info["status_history"] and 
                                     box_info["status_history"][-1] == self.STATUS_OPEN)
-        current_close_boxes = sum(1 for box_info in self.tracked_boxes.values() 
+        current_close_boxes = sum(1 for box_info in list(self.tracked_boxes.values()) 
                                   if box_info["in_dispatch_zone"] and 
                                      box_info["status_history"] and 
                                      box_info["status_history"][-1] == self.STATUS_CLOSE)
+        return current_open_boxes, current_close_boxes
+
+    def get_tracking_metadata(self):
+        """Compact, JSON-ready description of the tracks for client-side overlays"""
+        tracks = []
+        for track_id, box_info in list(self.tracked_boxes.items()):
+            if 'last_bbox' not in box_info:
+                continue
+            
+            status = "unknown"
+            if box_info["status_history"]:
+                last_status = box_info["status_history"][-1]
+                if last_status == self.STATUS_OPEN:
+                    status = "open"
+                elif last_status == self.STATUS_CLOSE:
+                    status = "close"
+            
+            tracks.append({
+                'id': track_id if isinstance(track_id, (int, str)) else str(track_id),
+                'bbox': [round(float(coord), 1) for coord in box_info['last_bbox']],
+                'status': status,
+                'in_zone': bool(box_info["in_dispatch_zone"]),
+                'pattern_matched': bool(box_info["potential_sale_pattern_matched"])
+            })
+        
+        current_open_boxes, current_close_boxes = self.count_boxes_in_zone()
+        return {
+            'tracks': tracks,
+            'stats': {
+                'boxes_sold': self.box_sold_count,
+                'pending_boxes': len(self.pending_boxes),
+                'open_boxes_in_zone': current_open_boxes,
+                'closed_boxes_in_zone': current_close_boxes
+            }
+        }
+
+    def draw_statistics_on_frame(self, frame):
+        stats_text = [
+            f"Boxes Sold: {self.box_sold_count}",
+            f"Pending Boxes: {len(self.pending_boxes)}"
+        ]
+        
+        current_open_boxes, current_close_boxes = self.count_boxes_in_zone()
 
         stats_text.append(f"Open in Zone: {current_open_boxes}")
         stats_text.append(f"Closed in Zone: {current_close_boxes}")
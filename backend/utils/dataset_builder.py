@@ -0,0 +1,280 @@
+"""
+Incremental builder that compiles feedback frames and labels into a YOLO dataset
+
+Usage (from backend/):
+    python -m utils.dataset_builder --source db --output datasets/feedback
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import cv2
+
+from .feedback_export import iter_labeled_frames
+from .import_helper import get_model_config_dict
+
+SPLITS = ('train', 'val', 'test')
+CONTENT_ID_PATTERN = re.compile(r'^frame_([0-9a-f]{16,})$')
+MANIFEST_NAME = 'manifest.json'
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def assign_split(image_hash, val_ratio=0.1, test_ratio=0.1):
+    """Deterministic split from the image hash; never changes between builds"""
+    bucket = int(hashlib.sha1(image_hash.encode()).hexdigest()[:8], 16) / 0x100000000
+    if bucket < test_ratio:
+        return 'test'
+    if bucket < test_ratio + val_ratio:
+        return 'val'
+    return 'train'
+
+
+def _resize_image(source_path, target_path, imgsz, jpeg_quality):
+    """Worker process: downscale so the long side is at most `imgsz` and write a JPEG.
+
+    Aspect ratio is kept, so normalized YOLO labels stay valid unchanged.
+    """
+    image = cv2.imread(source_path)
+    if image is None:
+        raise ValueError(f"Unreadable image: {source_path}")
+    h, w = image.shape[:2]
+    scale = imgsz / max(h, w)
+    if scale < 1.0:
+        image = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    if not ok:
+        raise ValueError(f"JPEG encoding failed: {source_path}")
+    with open(target_path + '.tmp', 'wb') as f:
+        f.write(encoded.tobytes())
+    os.replace(target_path + '.tmp', target_path)
+    return image.shape[1], image.shape[0]
+
+
+def clean_label_lines(path, num_classes):
+    """Valid, de-duplicated YOLO label lines and the number of lines dropped"""
+    lines, dropped, seen = [], 0, set()
+    with open(path, 'r') as f:
+        for raw in f:
+            parts = raw.split()
+            if not parts:
+                continue
+            try:
+                class_id = int(parts[0])
+                coords = [float(value) for value in parts[1:]]
+            except ValueError:
+                dropped += 1
+                continue
+            if (len(coords) != 4 or not 0 <= class_id < num_classes
+                    or not all(0.0 <= value <= 1.0 for value in coords)):
+                dropped += 1
+                continue
+            line = f"{class_id} " + ' '.join(f'{value:.6f}' for value in coords)
+            if line in seen:
+                continue
+            seen.add(line)
+            lines.append(line)
+    return lines, dropped
+
+
+class DatasetBuilder:
+    """Compiles `db/YYYYMMDD` feedback frames and labels into a versioned YOLO dataset.
+
+    Outputs images/{train,val,test}, labels/{train,val,test}, data.yaml and a
+    manifest recording each source's fingerprint, hash and split. A rebuild
+    resizes only new or changed images (in worker processes) and re-copies only
+    changed labels. Splits are derived from the image hash, so an image never
+    moves between train and val across builds. Each build that changes anything
+    bumps the dataset version.
+    """
+
+    def __init__(self, source_root='db', output_dir='datasets/feedback', imgsz=640, jpeg_quality=95,
+                 val_ratio=0.1, test_ratio=0.1, workers=None, class_names=None):
+        self.source_root = source_root
+        self.output_dir = output_dir
+        self.imgsz = imgsz
+        self.jpeg_quality = jpeg_quality
+        self.val_ratio = val_ratio
+        self.test_ratio = test_ratio
+        self.workers = workers
+        self.class_names = class_names or get_model_config_dict()['classes']
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        self.logger = logging.getLogger('DatasetBuilder')
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        return {'version': 0, 'imgsz': self.imgsz, 'entries': {}, 'history': []}
+
+    def _write_json(self, path, data):
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def _image_hash(self, image_path):
+        # Frames from the ImageStore are already named by their content hash
+        match = CONTENT_ID_PATTERN.match(os.path.splitext(os.path.basename(image_path))[0])
+        return match.group(1) if match else _file_sha1(image_path)
+
+    def _paths(self, split, name):
+        return (os.path.join(self.output_dir, 'images', split, name + '.jpg'),
+                os.path.join(self.output_dir, 'labels', split, name + '.txt'))
+
+    def build(self, prune=False):
+        """Bring the dataset up to date with the source frames; returns a summary"""
+        manifest = self.load_manifest()
+        if manifest.get('imgsz') != self.imgsz:
+            # A different target size invalidates every cached image
+            self.logger.info("Image size changed from %s to %s, re-processing all images",
+                             manifest.get('imgsz'), self.imgsz)
+            for entry in manifest['entries'].values():
+                entry['image_fingerprint'] = None
+            manifest['imgsz'] = self.imgsz
+
+        entries = manifest['entries']
+        summary = {'added': 0, 'updated_images': 0, 'updated_labels': 0, 'unchanged': 0,
+                   'removed': 0, 'failed': 0, 'dropped_label_lines': 0}
+        resize_jobs = {}
+        seen = set()
+
+        for day, image_path, label_path in iter_labeled_frames(self.source_root):
+            key = os.path.relpath(image_path, self.source_root).replace(os.sep, '/')
+            seen.add(key)
+            entry = entries.get(key)
+            image_fingerprint = _fingerprint(image_path)
+            label_fingerprint = _fingerprint(label_path)
+
+            if entry is None:
+                image_hash = self._image_hash(image_path)
+                entry = entries[key] = {
+                    'name': f"{day}_{os.path.splitext(os.path.basename(image_path))[0]}",
+                    'hash': image_hash,
+                    'split': assign_split(image_hash, self.val_ratio, self.test_ratio),
+                    'image_fingerprint': None,
+                    'label_fingerprint': None,
+                    'added_at': datetime.now().isoformat()
+                }
+                summary['added'] += 1
+
+            target_image, target_label = self._paths(entry['split'], entry['name'])
+            image_current = entry['image_fingerprint'] == image_fingerprint and os.path.exists(target_image)
+            label_current = entry['label_fingerprint'] == label_fingerprint and os.path.exists(target_label)
+
+            if not image_current:
+                resize_jobs[key] = (image_path, target_image, image_fingerprint)
+                if entry['image_fingerprint'] is not None:
+                    summary['updated_images'] += 1
+            if not label_current:
+                lines, dropped = clean_label_lines(label_path, len(self.class_names))
+                summary['dropped_label_lines'] += dropped
+                os.makedirs(os.path.dirname(target_label), exist_ok=True)
+                with open(target_label, 'w') as f:
+                    f.write(''.join(line + '\n' for line in lines))
+                entry['label_fingerprint'] = label_fingerprint
+                entry['boxes'] = len(lines)
+                if entry['image_fingerprint'] is not None:
+                    summary['updated_labels'] += 1
+            if image_current and label_current:
+                summary['unchanged'] += 1
+
+        self._run_resize_jobs(resize_jobs, entries, summary)
+
+        for key in [key for key in entries if key not in seen]:
+            # Sources removed by retention stay in the dataset unless pruning
+            if not prune:
+                continue
+            entry = entries.pop(key)
+            for path in self._paths(entry['split'], entry['name']):
+                if os.path.exists(path):
+                    os.remove(path)
+            summary['removed'] += 1
+
+        changed = any(summary[field] for field in ('added', 'updated_images', 'updated_labels', 'removed'))
+        if changed:
+            manifest['version'] += 1
+        counts = {split: sum(1 for entry in entries.values() if entry['split'] == split) for split in SPLITS}
+        manifest['built_at'] = datetime.now().isoformat()
+        manifest['counts'] = counts
+        if changed:
+            manifest['history'].append({'version': manifest['version'], 'built_at': manifest['built_at'],
+                                        'counts': counts, **summary})
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._write_json(self.manifest_path, manifest)
+        self._write_data_yaml()
+
+        summary.update(version=manifest['version'], counts=counts, output_dir=self.output_dir)
+        self.logger.info("Dataset v%d: %s", manifest['version'], summary)
+        return summary
+
+    def _run_resize_jobs(self, jobs, entries, summary):
+        if not jobs:
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(_resize_image, source, target, self.imgsz, self.jpeg_quality): key
+                       for key, (source, target, _) in jobs.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    width, height = future.result()
+                except Exception as e:
+                    # Left without a fingerprint so the next build retries it
+                    self.logger.error("Failed to process %s: %s", jobs[key][0], e)
+                    summary['failed'] += 1
+                    continue
+                entries[key]['image_fingerprint'] = jobs[key][2]
+                entries[key]['size'] = [width, height]
+
+    def _write_data_yaml(self):
+        """data.yaml for ultralytics, with the model's class ids and names"""
+        lines = [
+            f'path: {os.path.abspath(self.output_dir)}',
+            'train: images/train',
+            'val: images/val',
+            'test: images/test',
+            f'nc: {len(self.class_names)}',
+            'names:'
+        ]
+        lines += [f'  {class_id}: {name}' for class_id, name in sorted(self.class_names.items())]
+        with open(os.path.join(self.output_dir, 'data.yaml'), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or update the YOLO dataset from feedback frames")
+    parser.add_argument('--source', default='db', help="Feedback image root with YYYYMMDD folders")
+    parser.add_argument('--output', default='datasets/feedback', help="Dataset output directory")
+    parser.add_argument('--imgsz', type=int, default=640, help="Longest image side in the dataset")
+    parser.add_argument('--val-ratio', type=float, default=0.1)
+    parser.add_argument('--test-ratio', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=None, help="Resize worker processes")
+    parser.add_argument('--prune', action='store_true', help="Remove images whose source was deleted")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    builder = DatasetBuilder(args.source, args.output, imgsz=args.imgsz, val_ratio=args.val_ratio,
+                             test_ratio=args.test_ratio, workers=args.workers)
+    summary = builder.build(prune=args.prune)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,15 @@
 import cv2
-import torch
-from ultralytics import YOLO
 from datetime import datetime
 from .dispatch_zone import DispatchZone
 from .box_tracker import BoxTracker
 from .feedback_collector import FeedbackCollector
 from .feedback_storage import FeedbackStorage
+from .feedback_writer import FeedbackWriter
+from .review_queue import ReviewQueue
 from .import_helper import get_model_path, get_model_config_dict, get_full_model_config
 import sys
 import os
+import time
 
 # Add the root directory to Python path
 root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -35,18 +36,39 @@ def compute_iou(boxA, boxB):
     iou = interArea / float(boxAArea + boxBArea - interArea + 1e-6)
     return float(iou)
 
+def unpack_track(track):
+    """(bbox, track_id) of an SFSORT output row.
+
+    SFSORT returns `[bbox, track_id]` rows; a flat `[x1, y1, x2, y2, id]` row is
+    accepted too. track_id is None when the row carries no id.
+    """
+    if len(track) == 2 and np.size(track[0]) == 4:
+        return np.asarray(track[0], dtype=float).flatten(), int(track[1])
+    track_bbox = np.array(track[:4]).astype(float).flatten()
+    return track_bbox, int(track[4]) if len(track) >= 5 else None
+
+def load_model(model_config=None):
+    """Load the YOLO weights named by the model configuration"""
+    model_config = model_config or get_full_model_config()
+    model_path = get_model_path()
+    if not model_config['model_exists']:
+        raise FileNotFoundError(f"Model file not found at: {model_path}")
+    
+    # Imported here so an injected model needs no deep learning stack
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
 class DetectionHandler:
-    def __init__(self):
+    def __init__(self, model=None):
+        """`model` is a model loaded in advance (the server preloads it before forking
+        workers) or any callable returning ultralytics-style results (benchmarks and
+        load tests use a scripted detector); by default the configured weights are loaded"""
         # Get model configuration using flexible import
         self.model_config = get_full_model_config()
         self.model_path = get_model_path()
         
-        # Validate model path
-        if not self.model_config['model_exists']:
-            raise FileNotFoundError(f"Model file not found at: {self.model_path}")
-        
         # Initialize model with flexible path
-        self.model = YOLO(self.model_path)
+        self.model = model if model is not None else load_model(self.model_config)
         self.conf_threshold = self.model_config['confidence_threshold']
         
         # Get class names from configuration
@@ -103,8 +125,10 @@ class DetectionHandler:
         self.box_tracker = BoxTracker()
         
         # Initialize feedback system
-        self.feedback_collector = FeedbackCollector()
         self.feedback_storage = FeedbackStorage()
+        self.feedback_collector = FeedbackCollector(review_queue=ReviewQueue(self.feedback_storage.db_path))
+        # Storage writes happen in the background so frames never wait on them
+        self.feedback_writer = FeedbackWriter(self.feedback_storage)
         
         # Initialize SFSORT tracker for box tracking
         self.sfsort_tracker = SFSORT({
@@ -115,22 +139,21 @@ class DetectionHandler:
             'frame_height': 768,  # Adjust as needed
         })
         
-        # Configure logging
-        log_dir = 'logs'
-        os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, 'detection_handler.log')
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
+        # Handlers are installed once by logging_config.setup_logging()
         self.logger = logging.getLogger('DetectionHandler')
         self.logger.info("DetectionHandler initialized")
-        
+
+    def warmup(self, runs=2, width=1920, height=1080):
+        """Run the model on blank frames so the first real frame does not pay for
+        lazy initialisation (layer fusing, kernel selection, memory pools)"""
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        started = time.perf_counter()
+        for _ in range(runs):
+            self.model(frame)
+        elapsed = time.perf_counter() - started
+        self.logger.info(f"Model warmed up with {runs} runs in {elapsed:.2f}s")
+        return elapsed
+
     def set_active_zone(self, zone_id):
         """Set the active dispatch zone"""
         if zone_id in self.dispatch_zones:
@@ -197,15 +220,13 @@ class DetectionHandler:
                     # Match tracks to detections by IoU
                     tracked_data = []
                     for track in tracks:
-                        track_bbox = np.array(track[:4]).astype(float).flatten()
-                        track_id = int(track[4]) if len(track) >= 5 else None
+                        track_bbox, track_id = unpack_track(track)
                         # Find best matching detection
                         best_iou = 0
                         best_idx = -1
                         for i, det_bbox in enumerate(boxes):
                             det_bbox = np.array(det_bbox).astype(float).flatten()
                             iou = compute_iou(track_bbox, det_bbox)
-                            print(f"track_bbox: {track_bbox}, det_bbox: {det_bbox}, iou: {iou}, type(iou): {type(iou)}")
                             if iou > best_iou:
                                 best_iou = iou
                                 best_idx = i
@@ -237,20 +258,11 @@ class DetectionHandler:
                 out.write(frame)
                 gui.update_video_frame(frame)
                 frame_count += 1
-                if frame_count % 30 == 0:
-                    feedback_data = self.feedback_collector.get_feedback_data()
-                    if feedback_data:
-                        self.logger.info(f"Storing {len(feedback_data)} feedback entries")
-                        gui.log_message(f"Storing {len(feedback_data)} feedback entries")
-                        self.feedback_storage.store_feedback(feedback_data)
-            feedback_data = self.feedback_collector.get_feedback_data()
-            if feedback_data:
-                self.logger.info(f"Storing final {len(feedback_data)} feedback entries")
-                gui.log_message(f"Storing final {len(feedback_data)} feedback entries")
-                self.feedback_storage.store_feedback(feedback_data)
             cap.release()
             out.release()
-            self.feedback_storage.close()
+            # Make sure this video's feedback is on disk before reporting completion
+            self.feedback_writer.flush(timeout=30)
+            self.feedback_collector.image_store.flush(timeout=30)
             gui.reset_gui_state()
             self.logger.info("Video processing completed")
             gui.log_message("Video processing completed")
@@ -0,0 +1,107 @@
+"""
+Coalescing outbound event bus for Socket.IO emissions
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger('EventBus')
+
+
+class EventBus:
+    """Batches log lines and coalesces state updates onto one emitter thread.
+
+    Producers on the processing threads only append to in-memory buffers.
+    Log lines are flushed as periodic `log_batch` events. State events such as
+    counts and statistics keep only their latest value, and that value is
+    emitted at most once per `state_interval`, and only when it has changed.
+    Emission volume depends on the flush rates, not on frame rate or track count.
+    """
+
+    def __init__(self, socketio_instance, log_interval=0.5, state_interval=0.5, max_pending_logs=500):
+        self.socketio = socketio_instance
+        self.log_interval = log_interval
+        self.state_interval = state_interval
+        self.max_pending_logs = max_pending_logs
+
+        self._lock = threading.Lock()
+        self._logs = {}
+        self._dropped_logs = {}
+        self._latest = {}
+        self._last_emitted = {}
+        self._stop_event = threading.Event()
+        self.events_emitted = 0
+
+        self._thread = threading.Thread(target=self._run, name='EventBus', daemon=True)
+        self._thread.start()
+
+    def log(self, message, room=None):
+        """Queue a log line for the next `log_batch` of a room"""
+        entry = {'message': message, 'timestamp': datetime.now().isoformat()}
+        with self._lock:
+            pending = self._logs.get(room)
+            if pending is None:
+                pending = self._logs[room] = deque(maxlen=self.max_pending_logs)
+            if len(pending) == pending.maxlen:
+                # Oldest lines fall off; the client is told how many it missed
+                self._dropped_logs[room] = self._dropped_logs.get(room, 0) + 1
+            pending.append(entry)
+
+    def publish_latest(self, event, payload, room=None):
+        """Replace the pending value of a state event; older values are never sent"""
+        with self._lock:
+            self._latest[(event, room)] = dict(payload)
+
+    def stop(self):
+        """Flush everything still pending and stop the emitter thread"""
+        self._stop_event.set()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        next_logs = next_state = time.monotonic()
+        while True:
+            stopping = self._stop_event.wait(timeout=min(self.log_interval, self.state_interval))
+            now = time.monotonic()
+            try:
+                if stopping or now >= next_logs:
+                    self._flush_logs()
+                    next_logs = now + self.log_interval
+                if stopping or now >= next_state:
+                    self._flush_state()
+                    next_state = now + self.state_interval
+            except Exception as e:
+                logger.error(f"Error flushing events: {str(e)}")
+            if stopping:
+                return
+
+    def _flush_logs(self):
+        with self._lock:
+            if not self._logs:
+                return
+            logs, self._logs = self._logs, {}
+            dropped, self._dropped_logs = self._dropped_logs, {}
+
+        for room, entries in logs.items():
+            if not entries:
+                continue
+            self.socketio.emit('log_batch', {
+                'messages': list(entries),
+                'dropped': dropped.get(room, 0)
+            }, room=room)
+            self.events_emitted += 1
+
+    def _flush_state(self):
+        with self._lock:
+            if not self._latest:
+                return
+            latest, self._latest = self._latest, {}
+
+        for (event, room), payload in latest.items():
+            if self._last_emitted.get((event, room)) == payload:
+                continue
+            self._last_emitted[(event, room)] = payload
+            self.socketio.emit(event, dict(payload, timestamp=datetime.now().isoformat()), room=room)
+            self.events_emitted += 1
@@ -0,0 +1,191 @@
+"""
+Streaming exports of the feedback history and labeled training frames
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import zipfile
+
+logger = logging.getLogger('FeedbackExport')
+
+CSV_COLUMNS = ['timestamp', 'track_id', 'class_id', 'confidence',
+               'is_correct', 'bbox', 'issues', 'tracking_info']
+JSON_COLUMNS = ('bbox', 'issues', 'tracking_info')
+DAY_DIR_PATTERN = re.compile(r'^\d{8}$')
+
+
+def iter_feedback_chunks(db_path, since=None, until=None, chunk_size=1000):
+    """Yield lists of feedback rows (dicts), oldest first, `chunk_size` at a time.
+
+    Uses its own connection so an abandoned download never holds a cursor open
+    on a connection shared with the writer or the API.
+    """
+    conditions, params = [], []
+    if since:
+        conditions.append('timestamp >= ?')
+        params.append(since)
+    if until:
+        conditions.append('timestamp < ?')
+        params.append(until)
+    query = 'SELECT * FROM feedback'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY timestamp, id'
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(query, params)
+        columns = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [dict(zip(columns, row)) for row in rows]
+    finally:
+        conn.close()
+
+
+def decode_row(row):
+    """Parse the JSON columns of a feedback row in place; unparsable values stay as stored"""
+    for key in JSON_COLUMNS:
+        if row.get(key):
+            try:
+                row[key] = json.loads(row[key])
+            except (TypeError, ValueError):
+                pass
+    return row
+
+
+def stream_jsonl(db_path, since=None, until=None, chunk_size=1000):
+    """Feedback history as JSON Lines, one encoded chunk per database fetch"""
+    for rows in iter_feedback_chunks(db_path, since, until, chunk_size):
+        yield ''.join(json.dumps(decode_row(row), default=str) + '\n' for row in rows).encode('utf-8')
+
+
+def stream_log_jsonl(feedback_log, since=None, until=None, chunk_size=1000):
+    """Raw feedback log entries as JSON Lines, streamed from the log segments.
+
+    Includes history that predates the SQLite store (the legacy JSON file).
+    """
+    lines = []
+    for entry in feedback_log.iter_records(since, until):
+        lines.append(json.dumps(entry, default=str) + '\n')
+        if len(lines) >= chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+def stream_json_array(db_path, since=None, until=None, chunk_size=1000):
+    """Feedback history as a single JSON array, written incrementally"""
+    yield b'['
+    first = True
+    for rows in iter_feedback_chunks(db_path, since, until, chunk_size):
+        parts = []
+        for row in rows:
+            parts.append(('' if first else ',') + json.dumps(decode_row(row), default=str))
+            first = False
+        yield ''.join(parts).encode('utf-8')
+    yield b']'
+
+
+def stream_csv(db_path, since=None, until=None, chunk_size=1000):
+    """Feedback history as CSV, one encoded chunk per database fetch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for rows in iter_feedback_chunks(db_path, since, until, chunk_size):
+        writer.writerows([row[column] for column in CSV_COLUMNS] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_labeled_frames(image_root='db', since=None, until=None):
+    """Yield (day, image_path, label_path) for every frame that has a YOLO label.
+
+    `since` / `until` are YYYYMMDD day directory names (until is exclusive).
+    """
+    if not os.path.isdir(image_root):
+        return
+    for day in sorted(os.listdir(image_root)):
+        day_dir = os.path.join(image_root, day)
+        if not DAY_DIR_PATTERN.match(day) or not os.path.isdir(day_dir):
+            continue
+        if (since and day < since) or (until and day >= until):
+            continue
+        for name in sorted(os.listdir(day_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in ('.jpg', '.jpeg', '.png'):
+                continue
+            label_path = os.path.join(day_dir, stem + '.txt')
+            if os.path.exists(label_path):
+                yield day, os.path.join(day_dir, name), label_path
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, non-seekable sink that ZipFile writes into while we drain it"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        # ZipFile records member offsets from tell(); seeking stays unsupported
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _data_yaml(class_names):
+    lines = ['path: .', 'train: images', 'val: images', f'nc: {len(class_names)}', 'names:']
+    lines += [f'  {class_id}: {name}' for class_id, name in sorted(class_names.items())]
+    return '\n'.join(lines) + '\n'
+
+
+def stream_yolo_zip(image_root='db', class_names=None, since=None, until=None):
+    """Labeled frames as a zipped YOLO dataset (images/, labels/, data.yaml).
+
+    Members are written one at a time to a non-seekable sink and yielded as soon
+    as they are compressed, so memory use is bounded by the largest single file.
+    JPEG images are stored; labels and metadata are deflated.
+    """
+    sink = _StreamSink()
+    frames = 0
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for day, image_path, label_path in iter_labeled_frames(image_root, since, until):
+            stem, ext = os.path.splitext(os.path.basename(image_path))
+            name = f'{day}_{stem}'
+            try:
+                archive.write(image_path, f'images/{name}{ext}', compress_type=zipfile.ZIP_STORED)
+                archive.write(label_path, f'labels/{name}.txt')
+            except OSError as e:
+                # Files may be removed by retention while the export runs
+                logger.warning("Skipping %s in dataset export: %s", image_path, e)
+                continue
+            frames += 1
+            yield sink.drain()
+
+        if class_names:
+            archive.writestr('data.yaml', _data_yaml(class_names))
+    logger.info("Exported YOLO dataset with %d labeled frames", frames)
+    yield sink.drain()
@@ -0,0 +1,224 @@
+"""
+Append-only JSON Lines log of feedback entries with rotation
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+
+SEGMENT_PATTERN = re.compile(r'^feedback-(\d{8})-(\d{4})\.jsonl(\.gz)?$')
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class FeedbackLog:
+    """Append-only feedback history split into daily / size-bounded segments.
+
+    Each append writes one line per entry to the active segment, so the cost
+    does not grow with history. A segment is closed when the day changes or it
+    exceeds `max_bytes`, and closed segments are gzip-compressed if `compress`
+    is set; segments left open by an earlier run are compressed at start-up.
+    `iter_records` streams the history, oldest first, including the legacy
+    single-file JSON array.
+    """
+
+    def __init__(self, log_dir='backend/db/feedback_log', max_bytes=50 * 1024 * 1024,
+                 compress=True, legacy_json_path=None):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.legacy_json_path = legacy_json_path
+        self.logger = logging.getLogger('FeedbackLog')
+        self._lock = threading.Lock()
+        self._file = None
+        self._day = None
+        self._sequence = 0
+        os.makedirs(self.log_dir, exist_ok=True)
+        if self.compress:
+            self._compress_stale_segments()
+
+    def append(self, entries):
+        """Append entries as JSON lines to the active segment"""
+        lines = ''.join(json.dumps(entry, default=_json_default) + '\n' for entry in entries)
+        if not lines:
+            return
+        with self._lock:
+            self._ensure_segment(len(lines))
+            self._file.write(lines)
+            self._file.flush()
+
+    def _segment_path(self, day, sequence):
+        return os.path.join(self.log_dir, f'feedback-{day}-{sequence:04d}.jsonl')
+
+    def _ensure_segment(self, incoming_bytes):
+        day = datetime.now().strftime('%Y%m%d')
+        if self._file is not None:
+            if day == self._day and self._file.tell() + incoming_bytes <= self.max_bytes:
+                return
+            self._close_segment()
+            self._sequence = self._sequence + 1 if day == self._day else 0
+
+        if self._file is None and self._day is None:
+            # First write since start-up: continue today's newest open segment
+            self._sequence = self._latest_sequence(day)
+        self._day = day
+
+        path = self._segment_path(day, self._sequence)
+        while os.path.exists(path + '.gz') or (
+                os.path.exists(path) and os.path.getsize(path) + incoming_bytes > self.max_bytes):
+            self._sequence += 1
+            path = self._segment_path(day, self._sequence)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _latest_sequence(self, day):
+        sequences = [int(match.group(2)) for match in map(SEGMENT_PATTERN.match, os.listdir(self.log_dir))
+                     if match and match.group(1) == day]
+        return max(sequences, default=0)
+
+    def _close_segment(self):
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        if self.compress:
+            self._compress(path)
+
+    def _compress(self, path):
+        try:
+            with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except Exception as e:
+            self.logger.error("Error compressing feedback segment %s: %s", path, e)
+
+    def _compress_stale_segments(self):
+        """Compress plain segments an earlier run never closed.
+
+        Only today's newest segment can still be appended to; every other
+        uncompressed segment was left open by a restart or a crash.
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        latest = self._latest_sequence(today)
+        for path in self.segments():
+            match = SEGMENT_PATTERN.match(os.path.basename(path))
+            if match.group(3) or (match.group(1) == today and int(match.group(2)) == latest):
+                continue
+            self.logger.info("Compressing stale feedback segment %s", path)
+            self._compress(path)
+
+    def segments(self):
+        """Paths of all segments, oldest first"""
+        paths = []
+        for name in os.listdir(self.log_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                paths.append(((match.group(1), int(match.group(2))), os.path.join(self.log_dir, name)))
+        return [path for _, path in sorted(paths)]
+
+    def iter_records(self, since=None, until=None):
+        """Stream every stored entry without loading the history into memory.
+
+        `since` / `until` are ISO timestamps compared with each entry's
+        `timestamp` (until is exclusive), as in the SQLite exports.
+        """
+        for entry in self._iter_unfiltered():
+            if since or until:
+                timestamp = entry.get('timestamp') if isinstance(entry, dict) else None
+                if timestamp is None or (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+            yield entry
+
+    def _iter_unfiltered(self):
+        if self.legacy_json_path and os.path.exists(self.legacy_json_path):
+            try:
+                with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                    yield from _iter_json_array(f)
+            except json.JSONDecodeError:
+                self.logger.warning("Skipping unreadable legacy feedback file %s", self.legacy_json_path)
+
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        for path in self.segments():
+            opener = gzip.open if path.endswith('.gz') else open
+            try:
+                f = opener(path, 'rt', encoding='utf-8')
+            except FileNotFoundError:
+                # Compressed or removed by retention since the listing
+                continue
+            with f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-write can leave a partial last line
+                        self.logger.warning("Skipping corrupt line in %s", path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _iter_json_array(f, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array, reading `f` in chunks"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = f.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ',')):
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Unterminated array", buffer, position)
+            fill()
+            continue
+        if not started:
+            if buffer[position] != '[':
+                raise json.JSONDecodeError("Expected a JSON array", buffer, position)
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if end == len(buffer) and not eof:
+            # A scalar may continue in the next chunk
+            fill()
+            continue
+        position = end
+        yield value
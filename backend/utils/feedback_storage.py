@@ -1,51 +1,59 @@
-from pymongo import MongoClient
 from datetime import datetime
 import json
 import numpy as np
-from bson import ObjectId
 import cv2
 import base64
 import logging
 from .import_helper import get_mongodb_uri, get_mongodb_config_dict
+from .feedback_log import FeedbackLog
+from .feedback_export import decode_row, stream_csv, stream_json_array, stream_jsonl
+from .mongo_sync import MongoSyncer
+from .tracing import TRACER
 import numbers
 import os
 import sqlite3
 from pathlib import Path
 import threading
+import uuid
 
 class FeedbackStorage:
-    def __init__(self):
+    def __init__(self, mongo_client_factory=None):
         self.db_path = 'backend/db/feedback.db'
+        # Legacy full-history JSON file; new entries go to the JSONL log
         self.json_path = 'backend/db/feedback_data.json'
+        self.log_dir = 'backend/db/feedback_log'
         self._local = threading.local()
         self.initialize_storage()
         
-        
-        logging.basicConfig(level=logging.INFO)
+        # Handlers are installed once by logging_config.setup_logging()
         self.logger = logging.getLogger('FeedbackStorage')
         
        
         self.uri = get_mongodb_uri()
-        self.client = None
-        self.db = None
-        self.feedback_collection = None
-        self.model_metrics_collection = None
         
         # Get MongoDB config
         self.mongodb_config = get_mongodb_config_dict()
         
-       
-        self._connect()
+        # SQLite is the outbox; MongoDB is filled lazily in the background so a
+        # slow or missing server never blocks start-up or feedback writes
+        sync_config = self.mongodb_config.get('sync', {})
+        self.mongo_syncer = None
+        if sync_config.get('enabled', True):
+            self.mongo_syncer = MongoSyncer(
+                self, self.uri, self.mongodb_config,
+                client_factory=mongo_client_factory,
+                batch_size=sync_config.get('batch_size', 500),
+                interval=sync_config.get('interval', 5.0),
+                max_backoff=sync_config.get('max_backoff', 300.0),
+                timeout_ms=sync_config.get('timeout_ms', 2000)
+            )
         
     def initialize_storage(self):
-        """Initialize both SQLite and JSON storage"""
+        """Initialize both SQLite and JSON Lines storage"""
        
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-       
-        if not os.path.exists(self.json_path):
-            with open(self.json_path, 'w') as f:
-                json.dump([], f)
+        self.feedback_log = FeedbackLog(self.log_dir, legacy_json_path=self.json_path)
         
         
         with self._get_connection() as conn:
@@ -60,103 +68,123 @@ class FeedbackStorage:
                     is_correct BOOLEAN,
                     bbox TEXT,
                     issues TEXT,
-                    tracking_info TEXT
+                    tracking_info TEXT,
+                    uid TEXT,
+                    user_feedback BOOLEAN DEFAULT 1,
+                    synced_at TEXT
+                )
+            ''')
+            self._migrate_outbox_columns(cursor)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_feedback_unsynced
+                ON feedback (id) WHERE synced_at IS NULL
+            ''')
+            # (timestamp, id) matches the keyset pagination order
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_track ON feedback (track_id, timestamp, id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feedback_class ON feedback (class_id, timestamp, id)')
+            
+            # Aggregates maintained at insert time so stats never scan the feedback table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feedback_daily_stats (
+                    day TEXT NOT NULL,
+                    class_id INTEGER NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    correct INTEGER NOT NULL DEFAULT 0,
+                    confidence_sum REAL NOT NULL DEFAULT 0,
+                    confidence_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, class_id)
                 )
             ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feedback_tracks (
+                    track_id TEXT PRIMARY KEY,
+                    first_seen TEXT
+                )
+            ''')
+            if cursor.execute('SELECT 1 FROM feedback_daily_stats LIMIT 1').fetchone() is None:
+                self._rebuild_aggregates(cursor)
             conn.commit()
     
+    def _rebuild_aggregates(self, cursor):
+        """Recompute the aggregate tables from the feedback rows"""
+        cursor.execute('DELETE FROM feedback_daily_stats')
+        cursor.execute('DELETE FROM feedback_tracks')
+        cursor.execute('''
+            INSERT INTO feedback_daily_stats (day, class_id, total, correct, confidence_sum, confidence_count)
+            SELECT substr(timestamp, 1, 10), COALESCE(class_id, -1), COUNT(*),
+                   SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END),
+                   COALESCE(SUM(confidence), 0), COUNT(confidence)
+            FROM feedback
+            GROUP BY substr(timestamp, 1, 10), COALESCE(class_id, -1)
+        ''')
+        cursor.execute('''
+            INSERT INTO feedback_tracks (track_id, first_seen)
+            SELECT track_id, MIN(timestamp) FROM feedback
+            WHERE track_id IS NOT NULL
+            GROUP BY track_id
+        ''')
+    
+    def _migrate_outbox_columns(self, cursor):
+        """Add the outbox columns to databases created before MongoDB sync"""
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(feedback)')}
+        if 'synced_at' in columns:
+            return
+        cursor.execute('ALTER TABLE feedback ADD COLUMN uid TEXT')
+        cursor.execute('ALTER TABLE feedback ADD COLUMN user_feedback BOOLEAN DEFAULT 1')
+        cursor.execute('ALTER TABLE feedback ADD COLUMN synced_at TEXT')
+        # Older rows were written to MongoDB synchronously, so they are not re-sent
+        cursor.execute('''
+            UPDATE feedback SET uid = 'sqlite-' || id, synced_at = ?
+        ''', (datetime.now().isoformat(),))
+    
     def _get_connection(self):
         """Get a thread-local SQLite connection"""
         if not hasattr(self._local, 'conn'):
-            self._local.conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path)
+            # WAL lets readers (API, exports) run while the writer thread commits
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
         return self._local.conn
         
-    def _connect(self):
-        """Connect to MongoDB and initialize collections"""
-        try:
-            self.client = MongoClient(self.uri)
-           
-            self.client.admin.command('ping')
-            self.logger.info("Successfully connected to MongoDB")
-            
-            
-            self.db = self.client[self.mongodb_config['database']]
-            self.feedback_collection = self.db[self.mongodb_config['collections']['feedback']]
-            self.model_metrics_collection = self.db[self.mongodb_config['collections']['metrics']]
-            
-            
-            self.feedback_collection.create_index([('timestamp', 1)])
-            self.feedback_collection.create_index([('processed', 1)])
-            self.model_metrics_collection.create_index([('timestamp', 1)])
-            
-            self.logger.info("Database and collections initialized")
-            
-        except Exception as e:
-            self.logger.error(f"Failed to connect to MongoDB: {str(e)}")
-            raise
-        
     def store_feedback(self, feedback_data):
-        """Store feedback data in both SQLite and JSON formats"""
+        """Store feedback in SQLite (the MongoDB outbox) and the JSON Lines log"""
+        with TRACER.span('store_feedback', entries=len(feedback_data)):
+            self._store_feedback(feedback_data)
+    
+    def _store_feedback(self, feedback_data):
         try:
-           
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-                for feedback in feedback_data:
-                    cursor.execute('''
-                        INSERT INTO feedback (
-                            timestamp, track_id, class_id, confidence,
-                            is_correct, bbox, issues, tracking_info
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        feedback['timestamp'].isoformat(),
-                        feedback['detection'].get('track_id'),
-                        feedback['detection'].get('class'),
-                        feedback['detection'].get('confidence'),
-                        feedback['is_correct'],
-                        json.dumps(feedback['detection'].get('bbox')),
-                        json.dumps(feedback.get('issues', [])),
-                        json.dumps(feedback.get('tracking_info', {}))
-                    ))
-                conn.commit()
+            rows = [(
+                feedback['timestamp'].isoformat(),
+                to_python_type(feedback['detection'].get('track_id')),
+                to_python_type(feedback['detection'].get('class')),
+                to_python_type(feedback['detection'].get('confidence')),
+                bool(feedback['is_correct']),
+                json.dumps(to_python_type(feedback['detection'].get('bbox'))),
+                json.dumps(feedback.get('issues', [])),
+                json.dumps(to_python_type(feedback.get('tracking_info', {})), default=str),
+                uuid.uuid4().hex,
+                bool(feedback.get('user_feedback', True))
+            ) for feedback in feedback_data]
             
-            # Store in JSON
-            with open(self.json_path, 'r+') as f:
-                try:
-                    existing_data = json.load(f)
-                except json.JSONDecodeError:
-                    existing_data = []
-                
-                existing_data.extend(feedback_data)
-                
-                
-                f.seek(0)
-                json.dump(existing_data, f, indent=2, default=str)
-                f.truncate()
+            # One transaction per batch
+            with TRACER.span('sqlite_insert'), self._get_connection() as conn:
+                conn.executemany('''
+                    INSERT INTO feedback (
+                        timestamp, track_id, class_id, confidence,
+                        is_correct, bbox, issues, tracking_info,
+                        uid, user_feedback
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                self._update_aggregates(conn, rows)
             
-         
-            if self.feedback_collection is not None:
-
-                mongo_feedback = []
-                for feedback in feedback_data:
-                    mongo_feedback.append({
-                        'timestamp': feedback['timestamp'],
-                        'detection': {
-                            'bbox': feedback['detection']['bbox'],
-                            'class': feedback['detection']['class'],
-                            'confidence': float(feedback['detection']['confidence']),
-                            'track_id': feedback['detection'].get('track_id')
-                        },
-                        'is_correct': feedback['is_correct'],
-                        'issues': feedback.get('issues', []),
-                        'tracking_info': feedback.get('tracking_info'),
-                        'user_feedback': feedback.get('user_feedback', True),
-                        'processed': False
-                    })
-                
-                
-                if mongo_feedback:
-                    self.feedback_collection.insert_many(mongo_feedback)
-                    self.logger.info(f"Stored {len(mongo_feedback)} feedback entries in MongoDB")
+            # Append to the JSON Lines log; cost is independent of history size
+            with TRACER.span('feedback_log_append'):
+                self.feedback_log.append(feedback_data)
+            
+            if self.mongo_syncer is not None:
+                self.mongo_syncer.notify()
             
             self.logger.info(f"Stored {len(feedback_data)} feedback entries")
             
@@ -164,32 +192,170 @@ class FeedbackStorage:
             self.logger.error(f"Error storing feedback: {str(e)}")
             raise
     
+    def _update_aggregates(self, conn, rows):
+        """Fold a batch of inserted rows into the aggregate tables"""
+        daily = {}
+        for timestamp, track_id, class_id, confidence, is_correct, *_ in rows:
+            key = (timestamp[:10], class_id if class_id is not None else -1)
+            total, correct, confidence_sum, confidence_count = daily.get(key, (0, 0, 0.0, 0))
+            daily[key] = (
+                total + 1,
+                correct + (1 if is_correct else 0),
+                confidence_sum + (confidence or 0.0),
+                confidence_count + (confidence is not None)
+            )
+        
+        conn.executemany('''
+            INSERT INTO feedback_daily_stats (day, class_id, total, correct, confidence_sum, confidence_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, class_id) DO UPDATE SET
+                total = total + excluded.total,
+                correct = correct + excluded.correct,
+                confidence_sum = confidence_sum + excluded.confidence_sum,
+                confidence_count = confidence_count + excluded.confidence_count
+        ''', [key + value for key, value in daily.items()])
+        conn.executemany('INSERT OR IGNORE INTO feedback_tracks (track_id, first_seen) VALUES (?, ?)',
+                         [(row[1], row[0]) for row in rows if row[1] is not None])
+    
+    def fetch_unsynced(self, limit=500):
+        """Get the oldest feedback rows not yet copied to MongoDB"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, uid, timestamp, track_id, class_id, confidence,
+                       is_correct, bbox, issues, tracking_info, user_feedback
+                FROM feedback
+                WHERE synced_at IS NULL
+                ORDER BY id
+                LIMIT ?
+            ''', (limit,))
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for row in rows:
+            if row['uid'] is None:
+                row['uid'] = f"sqlite-{row['id']}"
+        return rows
+    
+    def mark_synced(self, ids):
+        """Mark outbox rows as copied to MongoDB"""
+        if not ids:
+            return
+        synced_at = datetime.now().isoformat()
+        with self._get_connection() as conn:
+            conn.executemany('UPDATE feedback SET synced_at = ? WHERE id = ?',
+                             [(synced_at, row_id) for row_id in ids])
+    
+    def count_unsynced(self):
+        """Number of feedback rows waiting for MongoDB"""
+        with self._get_connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM feedback WHERE synced_at IS NULL').fetchone()[0]
+    
     def get_feedback_stats(self):
-        """Get statistics about stored feedback"""
+        """Get statistics about stored feedback from the aggregate tables"""
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT 
-                        COUNT(*) as total,
-                        SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END) as correct,
-                        AVG(confidence) as avg_confidence,
-                        COUNT(DISTINCT track_id) as unique_tracks
-                    FROM feedback
+                    SELECT SUM(total), SUM(correct), SUM(confidence_sum), SUM(confidence_count)
+                    FROM feedback_daily_stats
                 ''')
-                
-                stats = cursor.fetchone()
+                total, correct, confidence_sum, confidence_count = cursor.fetchone()
+                unique_tracks = cursor.execute('SELECT COUNT(*) FROM feedback_tracks').fetchone()[0]
                 return {
-                    'total_feedback': stats[0],
-                    'correct_detections': stats[1],
-                    'average_confidence': stats[2],
-                    'unique_tracks': stats[3]
+                    'total_feedback': total or 0,
+                    'correct_detections': correct or 0,
+                    'average_confidence': confidence_sum / confidence_count if confidence_count else None,
+                    'unique_tracks': unique_tracks
                 }
             
         except Exception as e:
             self.logger.error(f"Error getting feedback stats: {str(e)}")
             return None
     
+    def get_daily_stats(self, since=None, class_id=None):
+        """Get per day / per class counts, correct rate and average confidence"""
+        try:
+            query = 'SELECT day, class_id, total, correct, confidence_sum, confidence_count FROM feedback_daily_stats'
+            conditions, params = [], []
+            if since is not None:
+                conditions.append('day >= ?')
+                params.append(since)
+            if class_id is not None:
+                conditions.append('class_id = ?')
+                params.append(class_id)
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += ' ORDER BY day DESC, class_id'
+            
+            with self._get_connection() as conn:
+                return [{
+                    'day': day,
+                    'class_id': None if row_class == -1 else row_class,
+                    'total': total,
+                    'correct': correct,
+                    'correct_rate': correct / total if total else None,
+                    'average_confidence': confidence_sum / confidence_count if confidence_count else None
+                } for day, row_class, total, correct, confidence_sum, confidence_count
+                    in conn.execute(query, params)]
+            
+        except Exception as e:
+            self.logger.error(f"Error getting daily feedback stats: {str(e)}")
+            return None
+    
+    def get_feedback_page(self, limit=100, cursor=None, track_id=None, class_id=None):
+        """Get one page of feedback, newest first, using keyset pagination.
+
+        `cursor` is the `next_cursor` of the previous page; each page is an
+        index range scan no matter how deep into the history it is. Raises
+        ValueError for a cursor that is not "timestamp|id".
+        """
+        position = self.parse_cursor(cursor) if cursor else None
+        try:
+            conditions, params = [], []
+            if track_id is not None:
+                conditions.append('track_id = ?')
+                params.append(track_id)
+            if class_id is not None:
+                conditions.append('class_id = ?')
+                params.append(class_id)
+            if position:
+                timestamp, row_id = position
+                conditions.append('(timestamp < ? OR (timestamp = ? AND id < ?))')
+                params.extend([timestamp, timestamp, row_id])
+            
+            query = 'SELECT * FROM feedback'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+            params.append(limit)
+            
+            with self._get_connection() as conn:
+                db_cursor = conn.execute(query, params)
+                columns = [description[0] for description in db_cursor.description]
+                items = [decode_row(dict(zip(columns, row))) for row in db_cursor.fetchall()]
+            
+            next_cursor = None
+            if len(items) == limit:
+                next_cursor = f"{items[-1]['timestamp']}|{items[-1]['id']}"
+            return {'items': items, 'next_cursor': next_cursor}
+            
+        except Exception as e:
+            self.logger.error(f"Error getting feedback page: {str(e)}")
+            return None
+    
+    @staticmethod
+    def parse_cursor(cursor):
+        """Split a "timestamp|id" page cursor, raising ValueError if it is malformed"""
+        timestamp, separator, row_id = cursor.rpartition('|')
+        try:
+            if not separator:
+                raise ValueError
+            datetime.fromisoformat(timestamp)
+            row_id = int(row_id)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from None
+        return timestamp, row_id
+    
     def get_track_feedback(self, track_id):
         """Get all feedback for a specific track"""
         try:
@@ -198,14 +364,14 @@ class FeedbackStorage:
                 cursor.execute('''
                     SELECT * FROM feedback
                     WHERE track_id = ?
-                    ORDER BY timestamp DESC
+                    ORDER BY timestamp DESC, id DESC
                 ''', (track_id,))
                 
                 columns = [description[0] for description in cursor.description]
                 feedback = []
                 
                 for row in cursor.fetchall():
-                    feedback.append(dict(zip(columns, row)))
+                    feedback.append(decode_row(dict(zip(columns, row))))
                 
                 return feedback
             
@@ -220,7 +386,7 @@ class FeedbackStorage:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM feedback
-                    ORDER BY timestamp DESC
+                    ORDER BY timestamp DESC, id DESC
                     LIMIT ?
                 ''', (limit,))
                 
@@ -237,38 +403,17 @@ class FeedbackStorage:
             return None
     
     def export_feedback(self, format='json', path=None):
-        """Export feedback data to a file"""
+        """Export the full feedback history to a file, streaming from SQLite"""
         try:
-            if format == 'json':
-                if path is None:
-                    path = f'feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-                
-                with open(path, 'w') as f:
-                    json.dump(self.get_recent_feedback(), f, indent=2, default=str)
-                    
-            elif format == 'csv':
-                if path is None:
-                    path = f'feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-                
-                import csv
-                with open(path, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    # Write header
-                    writer.writerow(['timestamp', 'track_id', 'class_id', 'confidence',
-                                   'is_correct', 'bbox', 'issues', 'tracking_info'])
-                    
-                    # Write data
-                    for feedback in self.get_recent_feedback():
-                        writer.writerow([
-                            feedback['timestamp'],
-                            feedback['track_id'],
-                            feedback['class_id'],
-                            feedback['confidence'],
-                            feedback['is_correct'],
-                            feedback['bbox'],
-                            feedback['issues'],
-                            feedback['tracking_info']
-                        ])
+            writers = {'json': stream_json_array, 'jsonl': stream_jsonl, 'csv': stream_csv}
+            if format not in writers:
+                raise ValueError(f"Unsupported export format: {format}")
+            if path is None:
+                path = f'feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{format}'
+            
+            with open(path, 'wb') as f:
+                for chunk in writers[format](self.db_path):
+                    f.write(chunk)
             
             self.logger.info(f"Exported feedback to {path}")
             return path
@@ -283,8 +428,9 @@ class FeedbackStorage:
             if hasattr(self._local, 'conn'):
                 self._local.conn.close()
                 del self._local.conn
-            if self.client:
-                self.client.close()
+            self.feedback_log.close()
+            if self.mongo_syncer is not None:
+                self.mongo_syncer.stop()
             self.logger.info("Database connections closed")
         except Exception as e:
             self.logger.error(f"Error closing database connections: {str(e)}")
@@ -292,6 +438,8 @@ class FeedbackStorage:
 def to_python_type(val):
     if isinstance(val, np.generic):
         return val.item()
+    if isinstance(val, np.ndarray):
+        return val.tolist()
     if isinstance(val, (list, tuple)):
         return [to_python_type(x) for x in val]
     if isinstance(val, dict):
@@ -0,0 +1,130 @@
+"""
+Write-behind feedback writer that keeps storage I/O off the processing threads
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from .logging_config import LogThrottle
+from .metrics import METRICS
+
+
+class FeedbackWriter:
+    """Buffers feedback entries and persists them in batches on a background thread.
+
+    `submit` never blocks: entries go into a bounded queue, and when the queue is
+    full new entries are dropped and counted. The writer thread flushes a batch
+    once it reaches `batch_size` entries or `flush_interval` seconds after its
+    first entry. Pending entries are flushed on `close()`, which also runs at
+    interpreter exit.
+    """
+
+    def __init__(self, storage, batch_size=100, flush_interval=2.0, max_pending=10000):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_pending)
+
+        self.entries_written = 0
+        self.entries_dropped = 0
+        self.batches_written = 0
+        self.failed_batches = 0
+        self.last_flush_seconds = 0.0
+
+        self.logger = logging.getLogger('FeedbackWriter')
+        self._throttle = LogThrottle(interval=10.0)
+        self._closed = False
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name='FeedbackWriter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, feedback_data):
+        """Queue feedback entries for storage without waiting on any I/O"""
+        accepted = 0
+        for entry in feedback_data:
+            try:
+                self.queue.put_nowait(entry)
+                accepted += 1
+            except queue.Full:
+                self.entries_dropped += 1
+                self._throttle.log(self.logger, logging.WARNING, 'full',
+                                   "Feedback queue full, dropping entries (%d dropped so far)",
+                                   self.entries_dropped)
+        return accepted
+
+    def flush(self, timeout=None):
+        """Block until every entry submitted so far has been written"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=10.0):
+        """Flush pending entries and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(self._stop)
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            self.logger.error("Feedback writer did not finish flushing within %.1fs", timeout)
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._stop:
+                self._write(batch)
+                self.queue.task_done()
+                return
+
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+                deadline = None
+
+    def _write(self, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            self.storage.store_feedback(batch)
+            self.entries_written += len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            self.failed_batches += 1
+            self.logger.error("Error writing %d feedback entries: %s", len(batch), e)
+        finally:
+            self.last_flush_seconds = time.perf_counter() - start
+            METRICS.observe('storage', self.last_flush_seconds)
+            for _ in batch:
+                self.queue.task_done()
+
+    def to_dict(self):
+        return {
+            'pending': self.queue.qsize(),
+            'entries_written': self.entries_written,
+            'entries_dropped': self.entries_dropped,
+            'batches_written': self.batches_written,
+            'failed_batches': self.failed_batches,
+            'last_flush_seconds': round(self.last_flush_seconds, 4)
+        }
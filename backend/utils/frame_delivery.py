@@ -0,0 +1,341 @@
+"""
+Per-client adaptive delivery of processed video frames over Socket.IO
+"""
+
+import base64
+import logging
+import threading
+import time
+
+import cv2
+
+from .metrics import METRICS
+
+logger = logging.getLogger('FrameDelivery')
+
+# Frame transports a viewer can ask for when joining a stream
+TRANSPORT_BASE64 = 'base64'
+TRANSPORT_BINARY = 'binary'
+
+# Where a viewer wants tracking overlays drawn: burned into the pixels by the
+# server, or drawn by the browser from per-frame metadata
+OVERLAY_SERVER = 'server'
+OVERLAY_CLIENT = 'client'
+
+# Quality tiers from best to cheapest; clients move along this list as their
+# acknowledgement latency rises or falls
+QUALITY_TIERS = [
+    {'name': 'high', 'scale': 1.0, 'jpeg_quality': 85, 'max_fps': 30},
+    {'name': 'medium', 'scale': 0.75, 'jpeg_quality': 70, 'max_fps': 15},
+    {'name': 'low', 'scale': 0.5, 'jpeg_quality': 55, 'max_fps': 8},
+    {'name': 'minimal', 'scale': 0.35, 'jpeg_quality': 40, 'max_fps': 3},
+]
+
+
+class ClientDeliveryState:
+    """Delivery state for one viewer of one stream"""
+
+    # Acknowledgement latency thresholds (seconds) used to adapt the tier
+    DEGRADE_LATENCY = 0.5
+    UPGRADE_LATENCY = 0.15
+    UPGRADE_AFTER_ACKS = 30
+    ACK_TIMEOUT = 2.0
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, sid, source_id, transport=TRANSPORT_BASE64, ack=False,
+                 overlay=OVERLAY_SERVER, frame_fps=None):
+        self.sid = sid
+        self.source_id = source_id
+        self.transport = transport
+        self.ack = ack
+        self.overlay = overlay
+        self.frame_fps = frame_fps
+        self.tier = 0
+        self.latency = None
+        self.in_flight = None
+        self.last_sent = 0.0
+        self.last_frame_count = None
+        self.last_metadata_count = None
+        self.frames_sent = 0
+        self.frames_acked = 0
+        self.frames_skipped = 0
+        self.ack_timeouts = 0
+        self._fast_acks = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tier_config(self):
+        return QUALITY_TIERS[self.tier]
+
+    @property
+    def max_fps(self):
+        """Frame rate cap of the current tier, lowered further if the client asked for it"""
+        if self.frame_fps:
+            return min(self.tier_config['max_fps'], self.frame_fps)
+        return self.tier_config['max_fps']
+
+    def ready(self, now):
+        """Whether a new frame may be sent to this client right now"""
+        with self._lock:
+            if self.in_flight is not None:
+                if now - self.in_flight[1] < self.ACK_TIMEOUT:
+                    return False
+                # The client never acknowledged; treat it as a slow link
+                self.ack_timeouts += 1
+                self.in_flight = None
+                self._change_tier(+1)
+            return now - self.last_sent >= 1.0 / self.max_fps
+
+    def mark_sent(self, frame_count, now):
+        with self._lock:
+            if self.last_frame_count is not None and frame_count > self.last_frame_count + 1:
+                self.frames_skipped += frame_count - self.last_frame_count - 1
+            self.last_sent = now
+            self.last_frame_count = frame_count
+            self.frames_sent += 1
+            if self.ack:
+                self.in_flight = (frame_count, now)
+
+    def on_ack(self, frame_count, now):
+        """Record an acknowledgement and adapt the quality tier"""
+        with self._lock:
+            if self.in_flight is None or self.in_flight[0] != frame_count:
+                return
+            latency = now - self.in_flight[1]
+            self.in_flight = None
+            self.frames_acked += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.LATENCY_SMOOTHING * (latency - self.latency)
+
+            if self.latency > self.DEGRADE_LATENCY:
+                self._change_tier(+1)
+            elif self.latency < self.UPGRADE_LATENCY:
+                self._fast_acks += 1
+                if self._fast_acks >= self.UPGRADE_AFTER_ACKS:
+                    self._change_tier(-1)
+            else:
+                self._fast_acks = 0
+
+    def _change_tier(self, step):
+        tier = min(max(self.tier + step, 0), len(QUALITY_TIERS) - 1)
+        if tier != self.tier:
+            logger.info(f"Client {self.sid} on {self.source_id}: tier "
+                        f"{QUALITY_TIERS[self.tier]['name']} -> {QUALITY_TIERS[tier]['name']}")
+            self.tier = tier
+            # Give the new tier a fresh latency estimate
+            self.latency = None
+        self._fast_acks = 0
+
+    def to_dict(self):
+        return {
+            'sid': self.sid,
+            'transport': self.transport,
+            'ack': self.ack,
+            'overlay': self.overlay,
+            'frame_fps': self.frame_fps,
+            'tier': self.tier_config['name'],
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'frames_sent': self.frames_sent,
+            'frames_acked': self.frames_acked,
+            'frames_skipped': self.frames_skipped,
+            'ack_timeouts': self.ack_timeouts
+        }
+
+
+class _FrameSlot:
+    """Latest frame of a stream plus the encodings already made from it"""
+
+    def __init__(self, source_id, frames, frame_count, timestamp, metadata=None):
+        self.source_id = source_id
+        # Frame variants keyed by overlay mode
+        self.frames = frames
+        self.frame_count = frame_count
+        self.timestamp = timestamp
+        self.metadata = metadata
+        self.encoded = {}
+
+
+class FrameDelivery:
+    """Sends the latest frame of each stream to every viewer from one background thread.
+
+    The processing thread only drops its rendered frame into a per-source slot.
+    A newer frame replaces an undelivered older one, so slow clients skip frames
+    instead of queueing them. Each tier is encoded at most once per frame and the
+    bytes are shared by every client on that tier.
+    """
+
+    POLL_INTERVAL = 0.05
+    # Tier used for the shared latest-JPEG slot served over HTTP
+    HTTP_TIER = 0
+
+    def __init__(self, socketio_instance, viewers):
+        self.socketio = socketio_instance
+        self.viewers = viewers
+        self._slots = {}
+        self._cond = threading.Condition()
+        self._pending = False
+        self._stop_event = threading.Event()
+        # Latest full-quality JPEG per source, shared by every HTTP consumer
+        self._latest_jpeg = {}
+        self._jpeg_cond = threading.Condition()
+        self.frames_published = 0
+        self.frames_replaced = 0
+        self._thread = threading.Thread(target=self._run, name='FrameDelivery', daemon=True)
+        self._thread.start()
+
+    def publish(self, source_id, frame, frame_count, raw_frame=None, metadata=None):
+        """Hand over a processed frame; never blocks on encoding or the network.
+
+        `frame` has overlays burned in, `raw_frame` is the clean frame sent with
+        `metadata` to clients that draw overlays themselves. Either may be None
+        when no viewer needs it.
+        """
+        frames = {}
+        if frame is not None:
+            frames[OVERLAY_SERVER] = frame
+        if raw_frame is not None:
+            frames[OVERLAY_CLIENT] = raw_frame
+        with self._cond:
+            previous = self._slots.get(source_id)
+            if previous is not None and not previous.encoded:
+                self.frames_replaced += 1
+            self._slots[source_id] = _FrameSlot(source_id, frames, frame_count, time.time(), metadata)
+            self.frames_published += 1
+            self._pending = True
+            self._cond.notify()
+
+    def discard(self, source_id):
+        """Forget the latest frame of a stopped stream"""
+        with self._cond:
+            self._slots.pop(source_id, None)
+        with self._jpeg_cond:
+            self._latest_jpeg.pop(source_id, None)
+            self._jpeg_cond.notify_all()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(timeout=2)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(timeout=self.POLL_INTERVAL)
+                self._pending = False
+                slots = list(self._slots.items())
+
+            now = time.monotonic()
+            for source_id, slot in slots:
+                try:
+                    self._deliver(source_id, slot, now)
+                    if self.viewers.http_viewer_count(source_id):
+                        self._update_latest_jpeg(source_id, slot)
+                except Exception as e:
+                    logger.error(f"Error delivering frame for {source_id}: {str(e)}")
+
+    def _deliver(self, source_id, slot, now):
+        for client in self.viewers.clients(source_id):
+            if client.overlay == OVERLAY_CLIENT and slot.metadata is not None \
+                    and client.last_metadata_count != slot.frame_count:
+                # Metadata is tiny, so client-drawn overlays stay at full rate
+                # even when the picture underneath is throttled
+                client.last_metadata_count = slot.frame_count
+                self.socketio.emit('frame_metadata', dict(slot.metadata, source=source_id,
+                                                          frame_count=slot.frame_count,
+                                                          timestamp=slot.timestamp), to=client.sid)
+
+            if client.last_frame_count == slot.frame_count:
+                continue
+            if client.overlay not in slot.frames:
+                continue
+            if not client.ready(now):
+                continue
+
+            payload = self._encode(slot, client.overlay, client.tier, client.transport)
+            if payload is None:
+                continue
+
+            message = {
+                'source': source_id,
+                'frame_count': slot.frame_count,
+                'timestamp': slot.timestamp,
+                'tier': client.tier_config['name'],
+                'frame': payload
+            }
+            event = 'video_frame_binary' if client.transport == TRANSPORT_BINARY else 'video_frame'
+            callback = self._ack_callback(client, slot.frame_count) if client.ack else None
+            client.mark_sent(slot.frame_count, now)
+            with METRICS.time('emit', source_id):
+                self.socketio.emit(event, message, to=client.sid, callback=callback)
+
+    def _encode(self, slot, overlay, tier, transport):
+        """Encode a slot for a tier once and reuse it for every client on that tier"""
+        key = (overlay, tier, transport)
+        if key in slot.encoded:
+            return slot.encoded[key]
+
+        jpeg = slot.encoded.get((overlay, tier, TRANSPORT_BINARY))
+        if jpeg is None:
+            encode_start = time.perf_counter()
+            config = QUALITY_TIERS[tier]
+            frame = slot.frames[overlay]
+            if config['scale'] < 1.0:
+                frame = cv2.resize(frame, None, fx=config['scale'], fy=config['scale'],
+                                   interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, config['jpeg_quality']])
+            if not ok:
+                logger.error(f"Failed to encode frame {slot.frame_count}")
+                return None
+            jpeg = buffer.tobytes()
+            slot.encoded[(overlay, tier, TRANSPORT_BINARY)] = jpeg
+            METRICS.observe_since('encode', encode_start, slot.source_id)
+
+        if transport == TRANSPORT_BASE64:
+            slot.encoded[key] = base64.b64encode(jpeg).decode('utf-8')
+        return slot.encoded[key]
+
+    def _update_latest_jpeg(self, source_id, slot):
+        """Encode the slot once for all HTTP consumers and wake them up"""
+        current = self._latest_jpeg.get(source_id)
+        if current is not None and current[0] == slot.frame_count:
+            return
+        if OVERLAY_SERVER not in slot.frames:
+            return
+        jpeg = self._encode(slot, OVERLAY_SERVER, self.HTTP_TIER, TRANSPORT_BINARY)
+        if jpeg is None:
+            return
+        with self._jpeg_cond:
+            self._latest_jpeg[source_id] = (slot.frame_count, slot.timestamp, jpeg)
+            self._jpeg_cond.notify_all()
+
+    def latest_jpeg(self, source_id):
+        """Most recent (frame_count, timestamp, jpeg_bytes) for a source, or None"""
+        return self._latest_jpeg.get(source_id)
+
+    def wait_for_jpeg(self, source_id, after_frame_count=None, timeout=5.0):
+        """Block until a JPEG newer than `after_frame_count` exists, or the timeout passes"""
+        def is_newer():
+            latest = self._latest_jpeg.get(source_id)
+            return latest is not None and latest[0] != after_frame_count
+
+        with self._jpeg_cond:
+            self._jpeg_cond.wait_for(is_newer, timeout=timeout)
+            return self._latest_jpeg.get(source_id)
+
+    @staticmethod
+    def _ack_callback(client, frame_count):
+        def on_ack(*args):
+            client.on_ack(frame_count, time.monotonic())
+        return on_ack
+
+    def to_dict(self):
+        return {
+            'frames_published': self.frames_published,
+            'frames_replaced': self.frames_replaced,
+            'clients': {source_id: [client.to_dict() for client in self.viewers.clients(source_id)]
+                        for source_id in self.viewers.to_dict()}
+        }
@@ -0,0 +1,244 @@
+"""
+Content-addressed, crop-first storage for feedback images
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from .metrics import METRICS
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash; near-identical images differ in only a few bits"""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def content_hash(image):
+    """Exact content hash of an image array"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class RecentHashes:
+    """Bounded map of recently stored perceptual hashes to their file paths"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+
+    def find(self, phash, max_distance):
+        for known, path in reversed(self._entries.items()):
+            if bin(known ^ phash).count('1') <= max_distance:
+                return path
+        return None
+
+    def discard(self, path):
+        for known, known_path in list(self._entries.items()):
+            if known_path == path:
+                del self._entries[known]
+
+    def add(self, phash, path):
+        self._entries[phash] = path
+        self._entries.move_to_end(phash)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+class ImageStore:
+    """Stores feedback images as padded detection crops plus a downscaled context frame.
+
+    `save` runs on the processing thread but only slices crops and downscales the
+    frame; JPEG encoding and disk writes happen on a background worker. Files are
+    named by content hash. Context frames are deduplicated on that exact hash
+    only: each carries its own YOLO label file, so a merely similar frame (with
+    boxes in other places) must get its own file. Crops whose perceptual hash is
+    within `crop_dedupe_distance` bits of a recently stored one reuse its file.
+    The `db/YYYYMMDD/frame_*.jpg` layout is kept, so YOLO labels (normalized
+    coordinates) written next to a context frame stay valid.
+    """
+
+    def __init__(self, root='db', context_max_side=960, crop_padding=0.15, jpeg_quality=90,
+                 crop_dedupe_distance=2, recent_hashes=512, max_pending=64):
+        self.root = root
+        self.context_max_side = context_max_side
+        self.crop_padding = crop_padding
+        self.jpeg_quality = jpeg_quality
+        self.crop_dedupe_distance = crop_dedupe_distance
+        self.recent_hashes = recent_hashes
+        self.queue = queue.Queue(maxsize=max_pending)
+
+        self._lock = threading.Lock()
+        # Paths of recently queued frames, so an identical frame is not queued
+        # twice before the first copy reaches the disk
+        self._recent_frames = OrderedDict()
+        self._recent_crops = RecentHashes(recent_hashes)
+
+        self.frames_saved = 0
+        self.frames_deduped = 0
+        self.crops_saved = 0
+        self.crops_deduped = 0
+        self.bytes_written = 0
+        self.jobs_dropped = 0
+
+        self.logger = logging.getLogger('ImageStore')
+        self._closed = False
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name='ImageStore', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, frame, bboxes, timestamp=None):
+        """Queue a context frame and one crop per (x1, y1, x2, y2) box.
+
+        Returns the paths the images will be written to, without waiting.
+        """
+        timestamp = timestamp or datetime.now()
+        db_dir = os.path.join(self.root, timestamp.strftime('%Y%m%d'))
+        jobs = []
+
+        context = self._downscale(frame)
+        frame_path, frame_is_new = self._resolve_frame(context, db_dir)
+        if frame_is_new:
+            jobs.append((frame_path, context))
+            self.frames_saved += 1
+        else:
+            self.frames_deduped += 1
+
+        crop_paths = []
+        for bbox in bboxes:
+            crop = self._crop(frame, bbox)
+            if crop is None:
+                crop_paths.append(None)
+                continue
+            crop_path, is_new = self._resolve_crop(crop, os.path.join(db_dir, 'crops'))
+            if is_new:
+                jobs.append((crop_path, crop))
+                self.crops_saved += 1
+            else:
+                self.crops_deduped += 1
+            crop_paths.append(crop_path)
+
+        if jobs:
+            try:
+                self.queue.put_nowait(jobs)
+            except queue.Full:
+                self.jobs_dropped += 1
+                self.logger.warning("Image queue full, dropping %d images", len(jobs))
+                with self._lock:
+                    for path, _ in jobs:
+                        self._recent_frames.pop(path, None)
+                        self._recent_crops.discard(path)
+
+        return {
+            'frame_path': frame_path,
+            'frame_filename': os.path.basename(frame_path),
+            'db_dir': os.path.dirname(frame_path),
+            'crop_paths': crop_paths,
+            'duplicate': not frame_is_new
+        }
+
+    def _downscale(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.context_max_side / max(h, w)
+        if scale >= 1.0:
+            # The frame is reused by the pipeline; the worker needs its own copy
+            return frame.copy()
+        return cv2.resize(frame, (int(round(w * scale)), int(round(h * scale))), interpolation=cv2.INTER_AREA)
+
+    def _crop(self, frame, bbox):
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = bbox
+        pad_x = (x2 - x1) * self.crop_padding
+        pad_y = (y2 - y1) * self.crop_padding
+        x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        x2, y2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return frame[y1:y2, x1:x2].copy()
+
+    def _resolve_frame(self, image, directory):
+        """Return (path, is_new) for a context frame, reusing only an identical one"""
+        path = os.path.join(directory, f'frame_{content_hash(image)[:20]}.jpg')
+        with self._lock:
+            if path in self._recent_frames:
+                self._recent_frames.move_to_end(path)
+                return path, False
+            self._recent_frames[path] = None
+            while len(self._recent_frames) > self.recent_hashes:
+                self._recent_frames.popitem(last=False)
+        return path, not os.path.exists(path)
+
+    def _resolve_crop(self, image, directory):
+        """Return (path, is_new) for a crop, reusing an existing near-duplicate"""
+        phash = dhash(image)
+        with self._lock:
+            existing = self._recent_crops.find(phash, self.crop_dedupe_distance)
+            if existing is not None:
+                return existing, False
+            path = os.path.join(directory, f'crop_{content_hash(image)[:20]}.jpg')
+            self._recent_crops.add(phash, path)
+        return path, not os.path.exists(path)
+
+    def _run(self):
+        while True:
+            jobs = self.queue.get()
+            try:
+                if jobs is self._stop:
+                    return
+                for path, image in jobs:
+                    with METRICS.time('image_write'):
+                        self._write(path, image)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, path, image):
+        try:
+            ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded.tobytes())
+            os.replace(tmp_path, path)
+            self.bytes_written += len(encoded)
+        except Exception as e:
+            self.logger.error("Error writing image %s: %s", path, e)
+
+    def flush(self, timeout=None):
+        """Wait until every queued image has been written"""
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def close(self, timeout=10.0):
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(self._stop)
+        self._thread.join(timeout=timeout)
+
+    def to_dict(self):
+        return {
+            'pending': self.queue.qsize(),
+            'frames_saved': self.frames_saved,
+            'frames_deduped': self.frames_deduped,
+            'crops_saved': self.crops_saved,
+            'crops_deduped': self.crops_deduped,
+            'bytes_written': self.bytes_written,
+            'jobs_dropped': self.jobs_dropped
+        }
@@ -107,6 +107,56 @@ def get_model_config():
     except Exception as e:
         raise ImportError(f"Failed to import model configuration: {str(e)}")
 
+def get_storage_config():
+    """
+    Dynamically import storage configuration based on execution context.
+    
+    Returns:
+        dict: STORAGE_CONFIG
+    """
+    try:
+        try:
+            from ..config.storage_config import STORAGE_CONFIG
+            return STORAGE_CONFIG
+        except (ImportError, ValueError):
+            pass
+        
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        backend_dir = os.path.dirname(current_dir)
+        if backend_dir not in sys.path:
+            sys.path.insert(0, backend_dir)
+        
+        from config.storage_config import STORAGE_CONFIG
+        return STORAGE_CONFIG
+        
+    except Exception as e:
+        raise ImportError(f"Failed to import storage configuration: {str(e)}")
+
+def get_memory_config():
+    """
+    Dynamically import memory configuration based on execution context.
+    
+    Returns:
+        dict: MEMORY_CONFIG
+    """
+    try:
+        try:
+            from ..config.memory_config import MEMORY_CONFIG
+            return MEMORY_CONFIG
+        except (ImportError, ValueError):
+            pass
+        
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        backend_dir = os.path.dirname(current_dir)
+        if backend_dir not in sys.path:
+            sys.path.insert(0, backend_dir)
+        
+        from config.memory_config import MEMORY_CONFIG
+        return MEMORY_CONFIG
+        
+    except Exception as e:
+        raise ImportError(f"Failed to import memory configuration: {str(e)}")
+
 # Convenience functions for direct access
 def get_mongodb_uri():
     """Get MongoDB URI using the dynamic import helper"""
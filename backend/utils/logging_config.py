@@ -0,0 +1,147 @@
+"""
+Asynchronous logging setup shared by the backend and the GUI
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Default log levels per logger; override with LOG_LEVEL / LOG_LEVELS env vars,
+# e.g. LOG_LEVELS="BoxTracker=DEBUG,FeedbackStorage=WARNING"
+LOGGING_CONFIG = {
+    'log_dir': 'logs',
+    'log_file': 'backend.log',
+    'max_bytes': 10 * 1024 * 1024,
+    'backup_count': 5,
+    'level': 'INFO',
+    'module_levels': {
+        'BoxTracker': 'INFO',
+        'DetectionHandler': 'INFO',
+        'FeedbackCollector': 'INFO',
+        'FeedbackStorage': 'INFO',
+        'werkzeug': 'WARNING',
+        'engineio': 'WARNING',
+        'socketio': 'WARNING',
+        'ultralytics': 'WARNING'
+    }
+}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats the record in the calling thread. Here the
+    record only gets a shallow copy, so %-style arguments are rendered on the
+    listener thread.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        if record.exc_info and not record.exc_text:
+            # Tracebacks must be captured while the frames still exist
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def _parse_module_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_dir=None, level=None, module_levels=None, log_file=None):
+    """Route all logging through one queue and a background listener thread.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        config = LOGGING_CONFIG
+        log_dir = log_dir or config['log_dir']
+        os.makedirs(log_dir, exist_ok=True)
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        file_handler = RotatingFileHandler(
+            os.path.join(log_dir, log_file or config['log_file']),
+            maxBytes=config['max_bytes'],
+            backupCount=config['backup_count'],
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DeferredQueueHandler(log_queue))
+        root.setLevel((level or os.environ.get('LOG_LEVEL') or config['level']).upper())
+
+        levels = dict(config['module_levels'])
+        levels.update(module_levels or {})
+        levels.update(_parse_module_levels(os.environ.get('LOG_LEVELS', '')))
+        for name, module_level in levels.items():
+            logging.getLogger(name).setLevel(module_level.upper())
+
+        _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class LogThrottle:
+    """Time-based rate limiter for log lines emitted on the per-frame path.
+
+    Messages sharing a key are logged at most once per `interval` seconds; the
+    next one that gets through reports how many were suppressed in between.
+    """
+
+    def __init__(self, interval=5.0, max_keys=1024):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._last = {}
+        self._suppressed = {}
+
+    def log(self, logger, level, key, msg, *args):
+        if not logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        if len(self._last) >= self.max_keys and key not in self._last:
+            self._last.clear()
+            self._suppressed.clear()
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            logger.log(level, msg + ' (%d similar suppressed)', *args, suppressed)
+        else:
+            logger.log(level, msg, *args)
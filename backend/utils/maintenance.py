@@ -0,0 +1,382 @@
+"""
+Background disk-quota enforcement and compaction for locally stored data
+"""
+
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import cv2
+
+from .feedback_log import SEGMENT_PATTERN
+
+DAY_DIR_PATTERN = re.compile(r'^\d{8}$')
+RECOMPRESSED_MARKER = '.recompressed'
+
+
+def _tree_size(path):
+    """(bytes, files) under a file or directory"""
+    if os.path.isfile(path):
+        return os.path.getsize(path), 1
+    total, files = 0, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                pass
+    return total, files
+
+
+def _parse_day(name):
+    try:
+        return datetime.strptime(name, '%Y%m%d')
+    except ValueError:
+        return None
+
+
+def _lower_thread_priority():
+    """Lower the scheduling priority of the calling thread where the OS allows it.
+
+    On Linux threads are scheduled individually, so this only affects the
+    maintenance thread. Elsewhere it is a no-op and `io_pause` does the pacing.
+    """
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+class MaintenanceService:
+    """Keeps feedback images, logs, uploads and SQLite within a disk budget.
+
+    Each cycle deletes data past its per-class retention, then deletes the
+    oldest deletable data across all classes while total usage is over the
+    quota. It also re-encodes older feedback frames at a lower quality and size,
+    and VACUUMs SQLite when `is_idle()` reports no stream is processing. Feedback
+    rows are only pruned once synced to MongoDB; the daily aggregates are kept.
+    The thread runs at the lowest priority and pauses between file operations.
+    """
+
+    def __init__(self, config, feedback_storage=None, image_root='db', log_dir='logs',
+                 upload_dir='uploads', is_idle=None, start=True):
+        self.config = config
+        self.feedback_storage = feedback_storage
+        self.image_root = image_root
+        self.log_dir = log_dir
+        self.upload_dir = upload_dir
+        self.is_idle = is_idle or (lambda: True)
+
+        self.logger = logging.getLogger('MaintenanceService')
+        self._run_lock = threading.Lock()
+        self._trigger = threading.Event()
+        self._stop_event = threading.Event()
+        self._usage = None
+        self._last_vacuum = None
+
+        self.stats = {
+            'runs': 0,
+            'last_run': None,
+            'last_duration_seconds': 0.0,
+            'files_deleted': 0,
+            'bytes_freed': 0,
+            'images_recompressed': 0,
+            'bytes_saved_recompressing': 0,
+            'feedback_rows_pruned': 0,
+            'last_vacuum': None,
+            'low_priority': False,
+            'last_error': None
+        }
+
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name='MaintenanceService', daemon=True)
+            self._thread.start()
+
+    def trigger(self):
+        """Run a maintenance cycle as soon as possible"""
+        self._trigger.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._trigger.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        self.stats['low_priority'] = _lower_thread_priority()
+        # Give start-up (model load, first streams) the disk to itself
+        self._trigger.wait(timeout=60)
+        while not self._stop_event.is_set():
+            self._trigger.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                self.stats['last_error'] = str(e)
+                self.logger.error("Maintenance cycle failed: %s", e)
+            self._trigger.wait(timeout=self.config['check_interval'])
+
+    def run_once(self):
+        """Run one full maintenance cycle"""
+        with self._run_lock:
+            start = time.monotonic()
+            now = datetime.now()
+            self._apply_retention(now)
+            self._recompress_images(now)
+            self._prune_feedback_rows(now)
+            self._enforce_quota()
+            self._compact_sqlite(now)
+            self._usage = self._measure_usage()
+
+            self.stats['runs'] += 1
+            self.stats['last_run'] = now.isoformat()
+            self.stats['last_duration_seconds'] = round(time.monotonic() - start, 3)
+            self.stats['last_error'] = None
+
+    def _pause(self):
+        time.sleep(self.config.get('io_pause', 0.005))
+        return not self._stop_event.is_set()
+
+    def _delete(self, path, reason):
+        size, files = _tree_size(path)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            # Files held open (e.g. a video being processed) are retried next cycle
+            self.logger.warning("Could not delete %s: %s", path, e)
+            return 0
+        self.stats['files_deleted'] += files
+        self.stats['bytes_freed'] += size
+        self.logger.info("Deleted %s (%s, %.1f MB)", path, reason, size / 1e6)
+        return size
+
+    # Deletable data, as (age reference, data class, path)
+
+    def _image_days(self):
+        if not os.path.isdir(self.image_root):
+            return []
+        days = []
+        for name in sorted(os.listdir(self.image_root)):
+            day = _parse_day(name) if DAY_DIR_PATTERN.match(name) else None
+            path = os.path.join(self.image_root, name)
+            if day is not None and os.path.isdir(path):
+                days.append((day, path))
+        return days
+
+    def _candidates(self):
+        candidates = []
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        for day, path in self._image_days():
+            if day >= today:
+                continue
+            crops = os.path.join(path, 'crops')
+            if os.path.isdir(crops):
+                candidates.append((day, 'crops', crops))
+            candidates.append((day, 'images', path))
+
+        feedback_log = getattr(self.feedback_storage, 'feedback_log', None)
+        if feedback_log is not None:
+            for path in feedback_log.segments():
+                match = SEGMENT_PATTERN.match(os.path.basename(path))
+                day = _parse_day(match.group(1))
+                if day is not None and day < today:
+                    candidates.append((day, 'feedback_log', path))
+
+        if os.path.isdir(self.log_dir):
+            for name in os.listdir(self.log_dir):
+                # Only rotated backups (backend.log.1 ...); the active file rotates itself
+                if re.match(r'.+\.log\.\d+$', name):
+                    path = os.path.join(self.log_dir, name)
+                    candidates.append((datetime.fromtimestamp(os.path.getmtime(path)), 'logs', path))
+
+        if os.path.isdir(self.upload_dir):
+            for name in os.listdir(self.upload_dir):
+                path = os.path.join(self.upload_dir, name)
+                if os.path.isfile(path):
+                    candidates.append((datetime.fromtimestamp(os.path.getmtime(path)), 'uploads', path))
+
+        candidates.sort(key=lambda candidate: (candidate[0], candidate[1] != 'crops'))
+        return candidates
+
+    def _apply_retention(self, now):
+        retention = self.config['retention_days']
+        for when, data_class, path in self._candidates():
+            days = retention.get(data_class)
+            if days is not None and when < now - timedelta(days=days) and os.path.exists(path):
+                self._delete(path, f'{data_class} older than {days} days')
+                if not self._pause():
+                    return
+
+    def _enforce_quota(self):
+        quota = self.config['quota_bytes']
+        usage = self._measure_usage()
+        if usage['total_bytes'] <= quota:
+            return
+        target = quota * self.config.get('quota_low_watermark', 0.9)
+        excess = usage['total_bytes'] - target
+        self.logger.warning("Storage over quota (%.1f / %.1f GB), freeing %.1f MB",
+                            usage['total_bytes'] / 1e9, quota / 1e9, excess / 1e6)
+        for _, data_class, path in self._candidates():
+            if excess <= 0:
+                return
+            if os.path.exists(path):
+                excess -= self._delete(path, 'over disk quota')
+                if not self._pause():
+                    return
+        if excess > 0:
+            self.logger.warning("Still %.1f MB over quota after deleting all eligible data", excess / 1e6)
+
+    def _recompress_images(self, now):
+        cutoff = now - timedelta(days=self.config['recompress_after_days'])
+        quality = self.config['recompress_quality']
+        max_side = self.config['recompress_max_side']
+        for day, path in self._image_days():
+            marker = os.path.join(path, RECOMPRESSED_MARKER)
+            if day >= cutoff or os.path.exists(marker):
+                continue
+            for directory, limit in ((path, max_side), (os.path.join(path, 'crops'), None)):
+                if not os.path.isdir(directory):
+                    continue
+                for name in sorted(os.listdir(directory)):
+                    if name.lower().endswith(('.jpg', '.jpeg')):
+                        self._recompress(os.path.join(directory, name), quality, limit)
+                        if not self._pause():
+                            return
+            with open(marker, 'w') as f:
+                f.write(now.isoformat())
+
+    def _recompress(self, path, quality, max_side):
+        try:
+            original_size = os.path.getsize(path)
+            image = cv2.imread(path)
+            if image is None:
+                return
+            h, w = image.shape[:2]
+            if max_side and max(h, w) > max_side:
+                scale = max_side / max(h, w)
+                image = cv2.resize(image, (int(round(w * scale)), int(round(h * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok or len(encoded) >= original_size:
+                return
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded.tobytes())
+            os.replace(tmp_path, path)
+            self.stats['images_recompressed'] += 1
+            self.stats['bytes_saved_recompressing'] += original_size - len(encoded)
+        except Exception as e:
+            self.logger.warning("Could not recompress %s: %s", path, e)
+
+    def _prune_feedback_rows(self, now, batch_size=5000):
+        days = self.config['retention_days'].get('feedback_rows')
+        if days is None or self.feedback_storage is None:
+            return
+        cutoff = (now - timedelta(days=days)).isoformat()
+        conn = sqlite3.connect(self.feedback_storage.db_path, timeout=5)
+        try:
+            # Reviewed items have already produced their feedback rows
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'review_queue'").fetchone():
+                with conn:
+                    conn.execute('''
+                        DELETE FROM review_queue WHERE status != 'pending' AND reviewed_at < ?
+                    ''', (cutoff,))
+            while not self._stop_event.is_set():
+                # Unsynced rows are still waiting in the MongoDB outbox
+                with conn:
+                    deleted = conn.execute('''
+                        DELETE FROM feedback WHERE id IN (
+                            SELECT id FROM feedback
+                            WHERE timestamp < ? AND synced_at IS NOT NULL
+                            LIMIT ?
+                        )
+                    ''', (cutoff, batch_size)).rowcount
+                self.stats['feedback_rows_pruned'] += deleted
+                if deleted < batch_size:
+                    return
+                self._pause()
+        finally:
+            conn.close()
+
+    def _compact_sqlite(self, now):
+        if self.feedback_storage is None or not self.is_idle():
+            return
+        interval = timedelta(hours=self.config['vacuum_interval_hours'])
+        if self._last_vacuum is not None and now - self._last_vacuum < interval:
+            return
+        conn = sqlite3.connect(self.feedback_storage.db_path, timeout=1)
+        try:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if page_count and free_pages / page_count >= self.config['vacuum_min_free_ratio']:
+                self.logger.info("Vacuuming %s (%d of %d pages free)",
+                                 self.feedback_storage.db_path, free_pages, page_count)
+                conn.execute('VACUUM')
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self._last_vacuum = now
+            self.stats['last_vacuum'] = now.isoformat()
+        except sqlite3.OperationalError as e:
+            # Busy: another connection is writing; try again next cycle
+            self.logger.info("Skipping SQLite compaction: %s", e)
+        finally:
+            conn.close()
+
+    def _measure_usage(self):
+        classes = {name: {'bytes': 0, 'files': 0}
+                   for name in ('images', 'crops', 'feedback_db', 'feedback_log', 'logs', 'uploads')}
+
+        def add(data_class, size_files):
+            classes[data_class]['bytes'] += size_files[0]
+            classes[data_class]['files'] += size_files[1]
+
+        for _, path in self._image_days():
+            crops = os.path.join(path, 'crops')
+            day_size = _tree_size(path)
+            crop_size = _tree_size(crops) if os.path.isdir(crops) else (0, 0)
+            add('crops', crop_size)
+            add('images', (day_size[0] - crop_size[0], day_size[1] - crop_size[1]))
+
+        if self.feedback_storage is not None:
+            for suffix in ('', '-wal', '-shm'):
+                path = self.feedback_storage.db_path + suffix
+                if os.path.exists(path):
+                    add('feedback_db', _tree_size(path))
+            if os.path.exists(self.feedback_storage.json_path):
+                add('feedback_log', _tree_size(self.feedback_storage.json_path))
+            if os.path.isdir(self.feedback_storage.log_dir):
+                add('feedback_log', _tree_size(self.feedback_storage.log_dir))
+
+        for data_class, directory in (('logs', self.log_dir), ('uploads', self.upload_dir)):
+            if os.path.isdir(directory):
+                add(data_class, _tree_size(directory))
+
+        total = sum(entry['bytes'] for entry in classes.values())
+        disk = shutil.disk_usage(self.image_root if os.path.isdir(self.image_root) else '.')
+        return {
+            'classes': classes,
+            'total_bytes': total,
+            'quota_bytes': self.config['quota_bytes'],
+            'quota_used': round(total / self.config['quota_bytes'], 4),
+            'disk': {'total': disk.total, 'used': disk.used, 'free': disk.free},
+            'measured_at': datetime.now().isoformat()
+        }
+
+    def usage(self, refresh=False):
+        """Current disk usage per data class (cached from the last cycle)"""
+        if refresh or self._usage is None:
+            self._usage = self._measure_usage()
+        return self._usage
+
+    def to_dict(self):
+        return dict(self.stats)
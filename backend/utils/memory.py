@@ -0,0 +1,219 @@
+"""
+Memory accounting, hard caps and tracemalloc diffs for long-running state
+"""
+
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from itertools import islice
+
+import numpy as np
+
+from .logging_config import LogThrottle
+from .metrics import resident_memory_bytes
+
+MAX_DEPTH = 8
+
+
+def estimate_bytes(obj, sample_items=100, _depth=0, _seen=None):
+    """Approximate deep size of an object graph.
+
+    NumPy arrays count their buffers. Containers with more than `sample_items`
+    entries are extrapolated from the first `sample_items`, so the cost stays
+    bounded no matter how large a structure has grown.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen or _depth > MAX_DEPTH:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # getsizeof already includes the buffer of an array that owns its data
+        return sys.getsizeof(obj) if obj.flags.owndata else sys.getsizeof(obj) + obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+
+    if isinstance(obj, dict):
+        children = obj.items()
+    elif isinstance(obj, (list, tuple, set, frozenset)) or hasattr(obj, 'maxlen'):
+        children = obj
+    elif hasattr(obj, 'queue') and hasattr(obj, 'qsize'):
+        # queue.Queue: the items live in its internal deque
+        return size + estimate_bytes(obj.queue, sample_items, _depth + 1, seen)
+    elif hasattr(obj, '__dict__'):
+        return size + estimate_bytes(vars(obj), sample_items, _depth + 1, seen)
+    elif hasattr(obj, '__slots__'):
+        children = [getattr(obj, name, None) for name in obj.__slots__]
+    else:
+        return size
+
+    total = len(children)
+    if not total:
+        return size
+    sample = list(islice(children, sample_items))
+    if isinstance(obj, dict):
+        # Size keys and values directly; the temporary item tuples would recycle ids in `seen`
+        sampled = sum(estimate_bytes(key, sample_items, _depth + 1, seen) +
+                      estimate_bytes(value, sample_items, _depth + 1, seen) for key, value in sample)
+    else:
+        sampled = sum(estimate_bytes(child, sample_items, _depth + 1, seen) for child in sample)
+    return size + int(sampled * total / len(sample))
+
+
+def evict_oldest(items, count, key):
+    """Remove the `count` items of a list with the smallest `key`; returns how many went"""
+    victims = sorted(items, key=key)[:count]
+    for victim in victims:
+        items.remove(victim)
+    return len(victims)
+
+
+class _Structure:
+    __slots__ = ('name', 'getter', 'evict', 'evicted', 'last_count')
+
+    def __init__(self, name, getter, evict):
+        self.name = name
+        self.getter = getter
+        self.evict = evict
+        self.evicted = 0
+        self.last_count = 0
+
+
+class MemoryAccountant:
+    """Tracks the size of registered in-memory structures and enforces caps.
+
+    Each structure is registered with a getter returning the live container
+    and, optionally, an `evict(count)` callback that drops its `count` oldest or
+    stalest items. `maybe_enforce()` is cheap (one `len()` per structure) and is
+    called from the thread that owns the structures, so evictions never race
+    the code iterating them. Byte estimates are computed only when a report is
+    requested. tracemalloc is off unless started, and diffs compare against the
+    baseline taken when it was started.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.caps = dict(config.get('caps', {}))
+        self.check_interval = config.get('check_interval', 10)
+        self.warn_ratio = config.get('warn_ratio', 0.8)
+        self.rss_warning_bytes = config.get('rss_warning_bytes')
+        self.sample_items = config.get('sample_items', 100)
+        self._structures = {}
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._baseline = None
+        self.warnings = 0
+        self.logger = logging.getLogger('MemoryAccountant')
+        self._throttle = LogThrottle(interval=300.0)
+
+    def register(self, name, getter, evict=None):
+        self._structures[name] = _Structure(name, getter, evict)
+
+    def maybe_enforce(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        self.enforce()
+
+    def enforce(self):
+        """Evict items above each cap and warn when a cap or the RSS limit gets close"""
+        with self._lock:
+            for structure in list(self._structures.values()):
+                try:
+                    count = structure.last_count = len(structure.getter())
+                except Exception as e:
+                    self.logger.error("Error sizing %s: %s", structure.name, e)
+                    continue
+                cap = self.caps.get(structure.name)
+                if not cap:
+                    continue
+                if count > cap and structure.evict is not None:
+                    evicted = structure.evict(count - cap)
+                    structure.evicted += evicted
+                    structure.last_count = count - evicted
+                    self._warn('cap', structure.name, "%s exceeded its cap of %d items; evicted %d",
+                               structure.name, cap, evicted)
+                elif count > cap * self.warn_ratio:
+                    self._warn('near', structure.name, "%s holds %d items (cap %d)", structure.name, count, cap)
+
+            rss = resident_memory_bytes()
+            if self.rss_warning_bytes and rss and rss > self.rss_warning_bytes:
+                self._warn('rss', None, "Resident memory %.1f MB is above the %.1f MB warning level",
+                           rss / 1e6, self.rss_warning_bytes / 1e6)
+
+    def _warn(self, kind, name, msg, *args):
+        self.warnings += 1
+        self._throttle.log(self.logger, logging.WARNING, (kind, name), msg, *args)
+
+    def report(self, include_bytes=True):
+        """Items, estimated bytes, cap and evictions per structure, plus process memory"""
+        structures = {}
+        for structure in list(self._structures.values()):
+            entry = {'cap': self.caps.get(structure.name), 'evicted': structure.evicted}
+            try:
+                container = structure.getter()
+                entry['items'] = len(container)
+                if include_bytes:
+                    entry['bytes'] = estimate_bytes(container, self.sample_items)
+            except RuntimeError:
+                # Resized by its owner while being measured; the next report will catch it
+                entry['items'] = structure.last_count
+            structures[structure.name] = entry
+        return {
+            'structures': structures,
+            'rss_bytes': resident_memory_bytes(),
+            'rss_warning_bytes': self.rss_warning_bytes,
+            'warnings': self.warnings,
+            'tracemalloc': {
+                'tracing': tracemalloc.is_tracing(),
+                'traced_bytes': tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+                'has_baseline': self._baseline is not None
+            }
+        }
+
+    def start_tracemalloc(self, frames=None):
+        """Start tracing allocations and take the baseline for later diffs"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames or self.config.get('tracemalloc_frames', 10))
+        self._baseline = self._snapshot()
+        self.logger.info("tracemalloc baseline taken")
+
+    def stop_tracemalloc(self):
+        self._baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def tracemalloc_diff(self, top=25, group_by='lineno'):
+        """Largest allocation growth since the baseline"""
+        if self._baseline is None or not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        stats = self._snapshot().compare_to(self._baseline, group_by)
+        return [{
+            'size_diff': stat.size_diff,
+            'size': stat.size,
+            'count_diff': stat.count_diff,
+            'count': stat.count,
+            'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+        } for stat in stats[:top]]
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+
+    def metric_samples(self):
+        """Item counts and evictions for /api/metrics, from the last enforcement pass"""
+        samples = []
+        for structure in list(self._structures.values()):
+            labels = {'structure': structure.name}
+            samples.append(('memory_structure_items', 'gauge', 'Items held by an in-memory structure',
+                            labels, structure.last_count))
+            samples.append(('memory_evictions_total', 'counter', 'Items evicted to keep a structure under its cap',
+                            labels, structure.evicted))
+        return samples
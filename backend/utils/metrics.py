@@ -0,0 +1,285 @@
+"""
+Per-stream pipeline metrics exported in the Prometheus text format
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from .tracing import TRACER
+
+METRIC_PREFIX = 'pizza_tracker'
+
+# Upper bounds (seconds) of the stage latency buckets
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+COUNTER_HELP = {
+    'frames_processed_total': 'Frames that went through the detection pipeline',
+    'frames_failed_total': 'Frames whose processing raised an error'
+}
+
+# How often the achieved frame rate of a stream is recomputed
+FPS_WINDOW = 1.0
+
+
+class Histogram:
+    """Fixed-bucket latency histogram.
+
+    `observe` takes no lock: each (stage, source) histogram is written by a
+    single thread (the stream's processing thread, the delivery thread or the
+    writer thread), and a scrape that races a write is off by one sample at most.
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), list(self.counts)):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Bucket upper bound below which a fraction `q` of the samples fall"""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return None
+
+
+class _StageTimer:
+    __slots__ = ('histogram', 'stage', 'source', 'start')
+
+    def __init__(self, histogram, stage, source):
+        self.histogram = histogram
+        self.stage = stage
+        self.source = source
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        self.histogram.observe(end - self.start)
+        if TRACER.enabled:
+            TRACER.record(self.stage, self.start, end, {'source': self.source})
+        return False
+
+
+class _FpsMeter:
+    __slots__ = ('window_start', 'frames', 'fps')
+
+    def __init__(self, now):
+        self.window_start = now
+        self.frames = 0
+        self.fps = 0.0
+
+
+class MetricsRegistry:
+    """Stage histograms, counters, frame rates and scrape-time collectors.
+
+    The hot path only touches plain dicts: a histogram, counter or FPS meter is
+    created under a lock the first time its key is seen, and every later update
+    is a lock-free increment. Queue depths and drop counts that components
+    already track are read by collectors registered with `add_collector`, so
+    they cost nothing until `/api/metrics` is scraped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._fps = {}
+        self._collectors = []
+        self.started_at = time.time()
+
+    def histogram(self, stage, source=None):
+        key = (stage, source)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds, source=None):
+        self.histogram(stage, source).observe(seconds)
+
+    def observe_since(self, stage, start, source=None):
+        """Record a stage that began at `start` (time.perf_counter()) and ends now"""
+        end = time.perf_counter()
+        self.histogram(stage, source).observe(end - start)
+        if TRACER.enabled:
+            TRACER.record(stage, start, end, {'source': source})
+
+    def time(self, stage, source=None):
+        """Context manager recording the duration of a pipeline stage (and a trace span)"""
+        return _StageTimer(self.histogram(stage, source), stage, source)
+
+    def inc(self, name, amount=1, source=None):
+        key = (name, source)
+        if key not in self._counters:
+            with self._lock:
+                self._counters.setdefault(key, 0)
+        self._counters[key] += amount
+
+    def counter(self, name, source=None):
+        return self._counters.get((name, source), 0)
+
+    def frame_processed(self, source):
+        """Count a processed frame and refresh the stream's achieved frame rate"""
+        now = time.monotonic()
+        meter = self._fps.get(source)
+        if meter is None:
+            with self._lock:
+                meter = self._fps.setdefault(source, _FpsMeter(now))
+        meter.frames += 1
+        elapsed = now - meter.window_start
+        if elapsed >= FPS_WINDOW:
+            meter.fps = meter.frames / elapsed
+            meter.frames = 0
+            meter.window_start = now
+        self.inc('frames_processed_total', source=source)
+
+    def stream_stopped(self, source):
+        """Forget the frame rate of a stopped stream; its histograms are kept"""
+        with self._lock:
+            self._fps.pop(source, None)
+
+    def fps(self, source):
+        meter = self._fps.get(source)
+        return meter.fps if meter is not None else 0.0
+
+    def add_collector(self, collector):
+        """Register `collector()` returning (name, type, help, labels, value) samples"""
+        self._collectors.append(collector)
+
+    def stage_summary(self, source=None):
+        """Count, mean and p50/p95/p99 bucket bounds (ms) per stage of one source"""
+        summary = {}
+        for (stage, stage_source), histogram in list(self._histograms.items()):
+            if stage_source != source or not histogram.count:
+                continue
+            entry = summary[stage] = {
+                'count': histogram.count,
+                'mean_ms': round(histogram.sum / histogram.count * 1000, 3)
+            }
+            for q in (0.5, 0.95, 0.99):
+                bound = histogram.quantile(q)
+                entry[f'p{int(q * 100)}_ms'] = None if bound == float('inf') else round(bound * 1000, 3)
+        return summary
+
+    @staticmethod
+    def process_samples():
+        """CPU time, resident memory and thread count of this process"""
+        cpu = os.times()
+        samples = [
+            ('process_cpu_seconds_total', 'counter', 'User and system CPU time of the process',
+             {}, cpu.user + cpu.system),
+            ('process_threads', 'gauge', 'Live Python threads', {}, threading.active_count())
+        ]
+        rss = resident_memory_bytes()
+        if rss is not None:
+            samples.append(('process_resident_memory_bytes', 'gauge', 'Resident memory size', {}, rss))
+        return samples
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        families = {}
+
+        def add(name, metric_type, help_text, lines):
+            family = families.setdefault(name, (metric_type, help_text, []))
+            family[2].extend(lines)
+
+        for (stage, source), histogram in sorted(list(self._histograms.items()), key=lambda item: (item[0][0], str(item[0][1]))):
+            labels = {'stage': stage}
+            if source is not None:
+                labels['source'] = source
+            name = f'{METRIC_PREFIX}_stage_duration_seconds'
+            lines = [_sample(f'{name}_bucket', dict(labels, le=_format_value(bound)), total)
+                     for bound, total in histogram.cumulative()]
+            lines.append(_sample(f'{name}_sum', labels, histogram.sum))
+            lines.append(_sample(f'{name}_count', labels, histogram.count))
+            add(name, 'histogram', 'Time spent in each pipeline stage', lines)
+
+        for (counter, source), value in sorted(list(self._counters.items()), key=lambda item: (item[0][0], str(item[0][1]))):
+            labels = {} if source is None else {'source': source}
+            name = f'{METRIC_PREFIX}_{counter}'
+            add(name, 'counter', COUNTER_HELP.get(counter, counter), [_sample(name, labels, value)])
+
+        name = f'{METRIC_PREFIX}_stream_fps'
+        for source in sorted(list(self._fps), key=str):
+            add(name, 'gauge', 'Achieved processing frame rate', [_sample(name, {'source': source}, self.fps(source))])
+
+        samples = list(self.process_samples())
+        for collector in list(self._collectors):
+            try:
+                samples.extend(collector())
+            except Exception:
+                # A failing collector must not break the scrape for the others
+                continue
+        for sample_name, metric_type, help_text, labels, value in samples:
+            name = sample_name if sample_name.startswith('process_') else f'{METRIC_PREFIX}_{sample_name}'
+            add(name, metric_type, help_text, [_sample(name, labels, value)])
+
+        out = []
+        for name, (metric_type, help_text, lines) in families.items():
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {metric_type}')
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+def resident_memory_bytes():
+    """Current resident set size, or the peak where procfs is unavailable, or None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f'{name}{{{label_text}}} {_format_value(value)}'
+    return f'{name} {_format_value(value)}'
+
+
+# Process-wide registry shared by the pipeline, the delivery thread and the writers
+METRICS = MetricsRegistry()
@@ -0,0 +1,177 @@
+"""
+Background synchronisation of the SQLite feedback outbox into MongoDB
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .tracing import TRACER
+
+
+class MongoSyncer:
+    """Ships unsent feedback rows from SQLite to MongoDB on a background thread.
+
+    The MongoDB connection is created lazily on the syncer thread with short
+    timeouts, so a slow or missing MongoDB never blocks start-up or frame
+    processing. Rows are bulk-upserted with `ordered=False`, keyed by their uid,
+    so retries after partial failures never create duplicates. Failures back off
+    exponentially up to `max_backoff` seconds.
+
+    Pass `client_factory` (e.g. `mongomock.MongoClient`) to run against an
+    in-process stand-in, and `start=False` to drive `sync_once()` by hand.
+    """
+
+    def __init__(self, storage, uri, mongodb_config, client_factory=None, batch_size=500,
+                 interval=5.0, max_backoff=300.0, timeout_ms=2000, start=True):
+        self.storage = storage
+        self.uri = uri
+        self.mongodb_config = mongodb_config
+        self.client_factory = client_factory or self._default_client
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.timeout_ms = timeout_ms
+
+        self.client = None
+        self.feedback_collection = None
+        self.model_metrics_collection = None
+
+        self.synced_total = 0
+        self.failed_attempts = 0
+        self.last_error = None
+        self.last_sync = None
+
+        self.logger = logging.getLogger('MongoSyncer')
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name='MongoSyncer', daemon=True)
+            self._thread.start()
+
+    def _default_client(self, uri):
+        return MongoClient(uri, connect=False,
+                           serverSelectionTimeoutMS=self.timeout_ms,
+                           connectTimeoutMS=self.timeout_ms,
+                           socketTimeoutMS=self.timeout_ms * 5)
+
+    def notify(self):
+        """Wake the syncer after new rows were written to the outbox"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._disconnect()
+
+    @property
+    def connected(self):
+        return self.feedback_collection is not None
+
+    def _connect(self):
+        """Connect to MongoDB and initialize collections"""
+        self.client = self.client_factory(self.uri)
+        self.client.admin.command('ping')
+
+        db = self.client[self.mongodb_config['database']]
+        self.feedback_collection = db[self.mongodb_config['collections']['feedback']]
+        self.model_metrics_collection = db[self.mongodb_config['collections']['metrics']]
+
+        self.feedback_collection.create_index([('timestamp', 1)])
+        self.feedback_collection.create_index([('processed', 1)])
+        self.model_metrics_collection.create_index([('timestamp', 1)])
+        self.logger.info("Connected to MongoDB at %s", self.uri)
+
+    def _disconnect(self):
+        if self.client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+        self.client = None
+        self.feedback_collection = None
+        self.model_metrics_collection = None
+
+    def sync_once(self):
+        """Push one batch of unsent rows; returns the number of rows synced"""
+        if not self.connected:
+            with TRACER.span('mongo_connect'):
+                self._connect()
+
+        rows = self.storage.fetch_unsynced(self.batch_size)
+        if not rows:
+            return 0
+
+        operations = [UpdateOne({'_id': row['uid']}, {'$setOnInsert': self._to_document(row)}, upsert=True)
+                      for row in rows]
+        failed = set()
+        try:
+            with TRACER.span('mongo_bulk_write', rows=len(operations)):
+                self.feedback_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            self.logger.warning("%d of %d feedback rows failed to sync", len(failed), len(rows))
+
+        synced_ids = [row['id'] for index, row in enumerate(rows) if index not in failed]
+        self.storage.mark_synced(synced_ids)
+        self.synced_total += len(synced_ids)
+        self.last_sync = datetime.now()
+        return len(synced_ids)
+
+    @staticmethod
+    def _to_document(row):
+        return {
+            'timestamp': datetime.fromisoformat(row['timestamp']),
+            'detection': {
+                'bbox': json.loads(row['bbox']) if row['bbox'] else None,
+                'class': row['class_id'],
+                'confidence': float(row['confidence']) if row['confidence'] is not None else None,
+                'track_id': row['track_id']
+            },
+            'is_correct': bool(row['is_correct']),
+            'issues': json.loads(row['issues']) if row['issues'] else [],
+            'tracking_info': json.loads(row['tracking_info']) if row['tracking_info'] else None,
+            'user_feedback': bool(row['user_feedback']),
+            'processed': False,
+            'sqlite_id': row['id']
+        }
+
+    def _run(self):
+        backoff = self.interval
+        while not self._stop_event.is_set():
+            try:
+                synced = self.sync_once()
+                self.last_error = None
+                backoff = self.interval
+                if synced >= self.batch_size:
+                    # More rows are waiting; keep draining
+                    continue
+            except Exception as e:
+                self.failed_attempts += 1
+                if self.last_error != str(e):
+                    self.logger.warning("MongoDB sync failed, retrying in %.0fs: %s", backoff, e)
+                self.last_error = str(e)
+                self._disconnect()
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def to_dict(self):
+        return {
+            'connected': self.connected,
+            'pending': self.storage.count_unsynced(),
+            'synced_total': self.synced_total,
+            'failed_attempts': self.failed_attempts,
+            'last_error': self.last_error,
+            'last_sync': self.last_sync.isoformat() if self.last_sync else None
+        }
@@ -0,0 +1,168 @@
+"""
+On-demand sampling profiler for the running server
+"""
+
+import logging
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+# Limits applied to every profile request
+MAX_DURATION = 60.0
+MAX_HZ = 250
+DEFAULT_DURATION = 10.0
+DEFAULT_HZ = 100
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+class StackSampler:
+    """Samples the Python stack of every thread from a background thread.
+
+    Every 1/hz seconds the sampler reads `sys._current_frames()` and counts
+    each thread's stack in collapsed form ("thread;outer;...;inner"). The
+    profiled threads are never paused or instrumented; the cost is one stack
+    walk per thread per sample, paid by the sampler thread while it holds the
+    GIL. Duration and rate are capped, and only one profile runs at a time.
+    """
+
+    def __init__(self, max_duration=MAX_DURATION, max_hz=MAX_HZ):
+        self.max_duration = max_duration
+        self.max_hz = max_hz
+        self._busy = threading.Lock()
+        self._labels = {}
+        self.last_profile = None
+        self.logger = logging.getLogger('StackSampler')
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            # Same frame naming as py-spy; semicolons separate frames in the collapsed format
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            label = self._labels[code] = label.replace(';', ':')
+        return label
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+    def profile(self, duration=DEFAULT_DURATION, hz=DEFAULT_HZ, include_idle=False):
+        """Sample all threads for `duration` seconds and return the profile.
+
+        Blocks the caller until the profile is done. Threads parked in a
+        condition wait, thread join, socket accept or selector poll are left out
+        unless `include_idle` is set, so the output shows where time is spent
+        working.
+        """
+        duration = min(max(float(duration), 0.1), self.max_duration)
+        hz = min(max(int(hz), 1), self.max_hz)
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            result = {}
+            sampler = threading.Thread(target=self._sample, name='StackSampler',
+                                       args=(duration, hz, include_idle, threading.get_ident(), result),
+                                       daemon=True)
+            sampler.start()
+            sampler.join()
+            self.last_profile = {key: value for key, value in result.items() if key != 'stacks'}
+            return result
+        finally:
+            self._busy.release()
+
+    def _sample(self, duration, hz, include_idle, requester, result):
+        interval = 1.0 / hz
+        stacks = Counter()
+        own = threading.get_ident()
+        samples = 0
+        cpu_start = time.process_time()
+        started = time.perf_counter()
+        deadline = started + duration
+        next_sample = started
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident in (own, requester):
+                    continue
+                if not include_idle and frame.f_code in _IDLE_CODES:
+                    continue
+                labels = self._collapse(frame)
+                stacks[';'.join([names.get(ident, f'thread-{ident}')] + labels)] += 1
+            # Holding frames keeps their locals alive; drop them before sleeping
+            frames = frame = None
+            samples += 1
+            # Fixed schedule so slow stack walks lower the rate instead of drifting
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+
+        elapsed = time.perf_counter() - started
+        result.update(
+            stacks=stacks,
+            samples=samples,
+            requested_hz=hz,
+            achieved_hz=round(samples / elapsed, 1) if elapsed else 0.0,
+            duration=round(elapsed, 3),
+            process_cpu_seconds=round(time.process_time() - cpu_start, 3),
+            finished_at=time.time()
+        )
+        self.logger.info("Profile finished: %d samples over %.1fs", samples, elapsed)
+
+    @staticmethod
+    def to_collapsed(result):
+        """Collapsed stacks, one "stack count" line each, for flamegraph.pl or speedscope"""
+        return ''.join(f'{stack} {count}\n' for stack, count in result['stacks'].most_common())
+
+    @staticmethod
+    def summary(result, top=25):
+        """Hottest functions by self and total samples, plus per-thread sample counts"""
+        self_counts, total_counts, threads = Counter(), Counter(), Counter()
+        for stack, count in result['stacks'].items():
+            thread, *frames = stack.split(';')
+            threads[thread] += count
+            if frames:
+                self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return {
+            **{key: value for key, value in result.items() if key != 'stacks'},
+            'threads': dict(threads.most_common()),
+            'top_self': self_counts.most_common(top),
+            'top_total': total_counts.most_common(top)
+        }
+
+    def to_dict(self):
+        return {
+            'running': self._busy.locked(),
+            'max_duration': self.max_duration,
+            'max_hz': self.max_hz,
+            'last_profile': self.last_profile
+        }
+
+
+def _idle_codes():
+    """Code objects of the Python-level functions a thread blocks in while idle"""
+    functions = [threading.Condition.wait, threading.Thread._wait_for_tstate_lock, socket.socket.accept]
+    functions += [cls.select for cls in vars(selectors).values()
+                  if isinstance(cls, type) and issubclass(cls, selectors.BaseSelector) and 'select' in vars(cls)]
+    return frozenset(function.__code__ for function in functions if hasattr(function, '__code__'))
+
+
+# Queue.get, Event.wait and Thread.join all end up in one of these
+_IDLE_CODES = _idle_codes()
@@ -0,0 +1,261 @@
+"""
+Persistent queue of detections waiting for human review
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from .feedback_storage import to_python_type
+
+STATUS_PENDING = 'pending'
+STATUS_LABELED = 'labeled'
+STATUS_SKIPPED = 'skipped'
+
+# Correct detections above this confidence add nothing new to the training set
+TRAINING_CONFIDENCE_LIMIT = 0.7
+
+
+class ReviewQueue:
+    """Review candidates stored in SQLite and labeled asynchronously over the API.
+
+    Detection only ever inserts rows; reviewers page through pending items and
+    submit labels in batches. Labeling writes the same YOLO `.txt` files next
+    to the stored frame as the old tkinter dialog, and returns feedback entries
+    in the format the FeedbackWriter expects.
+    """
+
+    def __init__(self, db_path='backend/db/feedback.db', max_pending=1000):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._local = threading.local()
+        self._listeners = []
+        # Labels of one frame share a file; API threads rewrite it one at a time
+        self._label_lock = threading.Lock()
+        self.logger = logging.getLogger('ReviewQueue')
+        self.initialize_storage()
+
+    def initialize_storage(self):
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._get_connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS review_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT,
+                    status TEXT DEFAULT 'pending',
+                    source_id TEXT,
+                    frame_path TEXT,
+                    crop_path TEXT,
+                    frame_width INTEGER,
+                    frame_height INTEGER,
+                    bbox TEXT,
+                    class_id INTEGER,
+                    confidence REAL,
+                    track_id TEXT,
+                    tracking_info TEXT,
+                    reviewed_at TEXT,
+                    is_correct BOOLEAN,
+                    label_class_id INTEGER,
+                    issues TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_review_status ON review_queue (status, id)')
+
+    def _get_connection(self):
+        """Get a thread-local SQLite connection"""
+        if not hasattr(self._local, 'conn'):
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return self._local.conn
+
+    def add_listener(self, callback):
+        """Call `callback(pending_count)` whenever items are added or reviewed"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        if not self._listeners:
+            return
+        pending = self.pending_count()
+        for callback in self._listeners:
+            try:
+                callback(pending)
+            except Exception as e:
+                self.logger.error(f"Error notifying review listener: {str(e)}")
+
+    def add(self, candidates, source_id=None):
+        """Queue detections for review; returns the number queued"""
+        room = self.max_pending - self.pending_count()
+        if room < len(candidates):
+            self.dropped += len(candidates) - max(room, 0)
+            self.logger.warning("Review queue full, dropping %d candidates", len(candidates) - max(room, 0))
+            candidates = candidates[:max(room, 0)]
+        if not candidates:
+            return 0
+
+        now = datetime.now().isoformat()
+        rows = []
+        for candidate in candidates:
+            height, width = candidate['frame_shape'][:2]
+            rows.append((
+                now, STATUS_PENDING, source_id,
+                candidate['frame_path'], candidate.get('crop_path'), int(width), int(height),
+                json.dumps(to_python_type(list(candidate['bbox']))),
+                to_python_type(candidate['class']),
+                to_python_type(candidate['confidence']),
+                None if candidate.get('track_id') is None else str(candidate['track_id']),
+                json.dumps(to_python_type(candidate.get('tracking_info')), default=str)
+            ))
+        with self._get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO review_queue (
+                    created_at, status, source_id, frame_path, crop_path, frame_width,
+                    frame_height, bbox, class_id, confidence, track_id, tracking_info
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        self._notify()
+        return len(rows)
+
+    def _fetch(self, query, params):
+        with self._get_connection() as conn:
+            cursor = conn.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            items = []
+            for row in cursor.fetchall():
+                item = dict(zip(columns, row))
+                for key in ('bbox', 'tracking_info', 'issues'):
+                    if item.get(key):
+                        item[key] = json.loads(item[key])
+                items.append(item)
+            return items
+
+    def pending(self, limit=50, after_id=None):
+        """Get pending items, oldest first, starting after `after_id`"""
+        return self._fetch('''
+            SELECT * FROM review_queue
+            WHERE status = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (STATUS_PENDING, after_id or 0, limit))
+
+    def get(self, item_id):
+        items = self._fetch('SELECT * FROM review_queue WHERE id = ?', (item_id,))
+        return items[0] if items else None
+
+    def pending_count(self):
+        with self._get_connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM review_queue WHERE status = ?',
+                                (STATUS_PENDING,)).fetchone()[0]
+
+    def label(self, labels, class_names=None):
+        """Apply a batch of labels.
+
+        Each label is {'id', 'is_correct', 'class_id' (optional correction),
+        'issues' (optional list)}. Returns (feedback_entries, errors).
+        """
+        feedback_entries, errors, updates = [], [], []
+        seen = set()
+        now = datetime.now()
+        for label in labels:
+            item = self.get(label.get('id'))
+            if item is None:
+                errors.append({'id': label.get('id'), 'error': 'Unknown review item'})
+                continue
+            if item['id'] in seen:
+                errors.append({'id': item['id'], 'error': 'Duplicate label in batch'})
+                continue
+            seen.add(item['id'])
+            if item['status'] != STATUS_PENDING:
+                errors.append({'id': item['id'], 'error': f"Item already {item['status']}"})
+                continue
+
+            is_correct = bool(label.get('is_correct'))
+            class_id = label.get('class_id')
+            class_id = item['class_id'] if class_id is None or is_correct else int(class_id)
+            if class_names is not None and class_id not in class_names:
+                errors.append({'id': item['id'], 'error': f"Invalid class id: {class_id}"})
+                continue
+            issues = [] if is_correct else list(label.get('issues') or [])
+
+            try:
+                if not is_correct or item['confidence'] < TRAINING_CONFIDENCE_LIMIT:
+                    self._write_yolo_label(item, class_id)
+            except OSError as e:
+                errors.append({'id': item['id'], 'error': str(e)})
+                continue
+
+            updates.append((STATUS_LABELED, now.isoformat(), is_correct, class_id, json.dumps(issues), item['id']))
+            feedback_entries.append({
+                'timestamp': now,
+                'detection': {
+                    'bbox': item['bbox'],
+                    'class': item['class_id'],
+                    'confidence': item['confidence'],
+                    'track_id': item['track_id']
+                },
+                'is_correct': is_correct,
+                'issues': issues,
+                'tracking_info': item['tracking_info'],
+                'user_feedback': True
+            })
+
+        if updates:
+            with self._get_connection() as conn:
+                conn.executemany('''
+                    UPDATE review_queue
+                    SET status = ?, reviewed_at = ?, is_correct = ?, label_class_id = ?, issues = ?
+                    WHERE id = ?
+                ''', updates)
+            self._notify()
+        return feedback_entries, errors
+
+    def skip(self, ids):
+        """Mark items as reviewed without producing feedback"""
+        with self._get_connection() as conn:
+            skipped = conn.executemany('''
+                UPDATE review_queue SET status = ?, reviewed_at = ?
+                WHERE id = ? AND status = ?
+            ''', [(STATUS_SKIPPED, datetime.now().isoformat(), item_id, STATUS_PENDING) for item_id in ids]).rowcount
+        self._notify()
+        return skipped
+
+    def _write_yolo_label(self, item, class_id):
+        """Write this detection's line into the label file of its own frame.
+
+        Frame files are named by their exact content, so a label file only
+        holds detections of that image. A line with the same box is replaced,
+        so relabeling a detection (or a duplicate of it) never stacks lines.
+        """
+        x1, y1, x2, y2 = item['bbox']
+        w, h = item['frame_width'], item['frame_height']
+        box = (f"{((x1 + x2) / 2) / w:.6f} {((y1 + y2) / 2) / h:.6f} "
+               f"{(x2 - x1) / w:.6f} {(y2 - y1) / h:.6f}")
+
+        label_path = os.path.splitext(item['frame_path'])[0] + '.txt'
+        os.makedirs(os.path.dirname(label_path) or '.', exist_ok=True)
+        with self._label_lock:
+            lines = []
+            if os.path.exists(label_path):
+                with open(label_path, 'r') as f:
+                    lines = [line for line in f.read().splitlines()
+                             if line.strip() and line.split(' ', 1)[-1] != box]
+            lines.append(f"{class_id} {box}")
+            tmp_path = label_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, label_path)
+
+    def to_dict(self):
+        with self._get_connection() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM review_queue GROUP BY status').fetchall())
+        return {
+            'pending': counts.get(STATUS_PENDING, 0),
+            'labeled': counts.get(STATUS_LABELED, 0),
+            'skipped': counts.get(STATUS_SKIPPED, 0),
+            'dropped': self.dropped
+        }
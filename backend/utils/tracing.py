@@ -0,0 +1,152 @@
+"""
+Opt-in per-frame span tracer exported as Chrome trace-event JSON
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+
+class _NullSpan:
+    """Shared no-op span handed out while tracing is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class FrameTracer:
+    """Records nested timing spans into a bounded ring while enabled.
+
+    Spans are stored as Chrome "complete" events (name, start, duration, thread)
+    in a deque, so the oldest ones fall off once `capacity` is reached. Nesting
+    is implied by time containment on the same thread, which is how
+    chrome://tracing and Perfetto draw it. While tracing is off, `span()` returns
+    one shared no-op context manager and `record()` returns after a single
+    attribute check.
+    """
+
+    def __init__(self, capacity=50000):
+        self.capacity = capacity
+        self.enabled = False
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._deadline = None
+        self.started_at = None
+        self.stopped_at = None
+        self._origin = time.perf_counter()
+        self.logger = logging.getLogger('FrameTracer')
+
+    def start(self, capacity=None, duration=None):
+        """Clear the ring and start recording, for at most `duration` seconds if given"""
+        with self._lock:
+            if capacity and capacity != self.capacity:
+                self.capacity = capacity
+            self._events = deque(maxlen=self.capacity)
+            self._deadline = time.monotonic() + duration if duration else None
+            self.started_at = time.time()
+            self.stopped_at = None
+            self.enabled = True
+        self.logger.info("Frame tracing started (capacity %d, duration %s)", self.capacity, duration)
+
+    def stop(self):
+        with self._lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+            self._deadline = None
+            self.stopped_at = time.time()
+        self.logger.info("Frame tracing stopped with %d spans recorded", len(self._events))
+
+    def span(self, name, **args):
+        """Context manager timing one span; free when tracing is off"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name, start, end, args=None):
+        """Add a finished span measured with time.perf_counter()"""
+        if not self.enabled:
+            return
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            self.stop()
+            return
+        thread = threading.current_thread()
+        # deque.append is atomic, so producers never take the lock
+        self._events.append((name, start, end, thread.native_id, thread.name, args))
+
+    def to_chrome_trace(self):
+        """The recorded spans as a Chrome trace-event document"""
+        events = list(self._events)
+        # Read now, not at import: forked server workers share this module's state
+        pid = os.getpid()
+        trace_events = []
+        thread_names = {}
+        for name, start, end, tid, thread_name, args in events:
+            thread_names[tid] = thread_name
+            event = {
+                'name': name,
+                'ph': 'X',
+                'ts': round((start - self._origin) * 1e6, 3),
+                'dur': round((end - start) * 1e6, 3),
+                'pid': pid,
+                'tid': tid
+            }
+            if args:
+                event['args'] = {key: value if isinstance(value, (int, float, str, bool)) or value is None
+                                 else str(value) for key, value in args.items()}
+            trace_events.append(event)
+        for tid, thread_name in thread_names.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+        return {
+            'traceEvents': trace_events,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'started_at': self.started_at,
+                'stopped_at': self.stopped_at,
+                'spans': len(events),
+                'capacity': self.capacity
+            }
+        }
+
+    def to_dict(self):
+        return {
+            'enabled': self.enabled,
+            'spans': len(self._events),
+            'capacity': self.capacity,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at
+        }
+
+
+# Process-wide tracer; off until started through the API
+TRACER = FrameTracer()
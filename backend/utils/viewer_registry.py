@@ -0,0 +1,103 @@
+"""
+Tracks which Socket.IO clients are watching each video stream
+"""
+
+import threading
+from collections import defaultdict
+
+from .frame_delivery import ClientDeliveryState, TRANSPORT_BASE64, OVERLAY_SERVER
+
+
+class ViewerRegistry:
+    """Thread-safe map of video sources to the client sessions that joined them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._viewers = defaultdict(dict)
+        # HTTP consumers (MJPEG streams, snapshot requests) per source
+        self._http_viewers = defaultdict(int)
+
+    def join(self, source_id, sid, transport=TRANSPORT_BASE64, ack=False,
+             overlay=OVERLAY_SERVER, frame_fps=None):
+        """Register a client session as a viewer of a source"""
+        with self._lock:
+            self._viewers[source_id][sid] = ClientDeliveryState(sid, source_id, transport, ack,
+                                                                overlay, frame_fps)
+            return len(self._viewers[source_id])
+
+    def leave(self, source_id, sid):
+        """Remove a client session from a source"""
+        with self._lock:
+            viewers = self._viewers.get(source_id)
+            if viewers is None:
+                return 0
+            viewers.pop(sid, None)
+            if not viewers:
+                del self._viewers[source_id]
+                return 0
+            return len(viewers)
+
+    def leave_all(self, sid):
+        """Remove a client session from every source, returning the sources it left"""
+        with self._lock:
+            left = [source_id for source_id, viewers in self._viewers.items() if sid in viewers]
+            for source_id in left:
+                self._viewers[source_id].pop(sid, None)
+                if not self._viewers[source_id]:
+                    del self._viewers[source_id]
+            return left
+
+    def add_http_viewer(self, source_id):
+        """Register an HTTP consumer of a source's latest encoded frame"""
+        with self._lock:
+            self._http_viewers[source_id] += 1
+            return self._http_viewers[source_id]
+
+    def remove_http_viewer(self, source_id):
+        """Unregister an HTTP consumer"""
+        with self._lock:
+            count = self._http_viewers.get(source_id, 0) - 1
+            if count <= 0:
+                self._http_viewers.pop(source_id, None)
+                return 0
+            self._http_viewers[source_id] = count
+            return count
+
+    def http_viewer_count(self, source_id):
+        return self._http_viewers.get(source_id, 0)
+
+    def viewer_count(self, source_id):
+        """Number of client sessions watching a source"""
+        with self._lock:
+            return len(self._viewers.get(source_id, ())) + self._http_viewers.get(source_id, 0)
+
+    def has_viewers(self, source_id):
+        """Cheap check used on the per-frame path"""
+        return bool(self._viewers.get(source_id)) or self._http_viewers.get(source_id, 0) > 0
+
+    def clients(self, source_id):
+        """Snapshot of the delivery state of every viewer of a source"""
+        with self._lock:
+            return list(self._viewers.get(source_id, {}).values())
+
+    def transports(self, source_id):
+        """Set of frame transports requested by the viewers of a source"""
+        with self._lock:
+            return {client.transport for client in self._viewers.get(source_id, {}).values()}
+
+    def overlay_modes(self, source_id):
+        """Set of overlay modes requested by the viewers of a source"""
+        with self._lock:
+            modes = {client.overlay for client in self._viewers.get(source_id, {}).values()}
+            if self._http_viewers.get(source_id, 0) > 0:
+                # HTTP consumers always get overlays burned in
+                modes.add(OVERLAY_SERVER)
+            return modes
+
+    def to_dict(self):
+        """Viewer counts per source"""
+        with self._lock:
+            counts = {source_id: len(viewers) for source_id, viewers in self._viewers.items()}
+            for source_id, count in self._http_viewers.items():
+                counts[source_id] = counts.get(source_id, 0) + count
+            return counts
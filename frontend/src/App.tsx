@@ -6,6 +6,7 @@ import VideoDisplay from './components/VideoDisplay';
 import DetectionLog from './components/DetectionLog';
 import DispatchZoneInfo from './components/DispatchZoneInfo';
 import BoxStatistics from './components/BoxStatistics';
+import ReviewQueue from './components/ReviewQueue';
 import { socket } from './socket';
 
 function App() {
@@ -16,9 +17,13 @@ function App() {
   const [processingStatus, setProcessingStatus] = useState<string>('idle'); // 'idle', 'processing', 'completed', 'error'
 
   const handleVideoSelect = (videoSource: string) => {
+    // Leave the previous stream so the backend can stop rendering it
+    if (selectedVideo && selectedVideo !== videoSource) {
+      socket.emit('leave_video', { source: selectedVideo });
+    }
     setSelectedVideo(videoSource);
     setProcessingStatus('idle');
-    socket.emit('join_video', { source: videoSource });
+    socket.emit('join_video', { source: videoSource, binary: true, ack: true, overlay: 'client' });
   };
 
   const handleProcessChange = (processing: boolean) => {
@@ -76,6 +81,7 @@ function App() {
             selectedZone={selectedZone}
             onZoneSelect={handleZoneSelect}
           />
+          <ReviewQueue />
         </div>
       </div>
     </div>
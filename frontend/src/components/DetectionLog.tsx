@@ -49,6 +49,15 @@ const DetectionLog: React.FC = () => {
             addEvent('log', data.message);
         };
 
+        // Batched log messages from backend
+        const handleLogBatch = (data: { messages: LogMessage[]; dropped: number }) => {
+            setLogMessages(prev => [...prev, ...data.messages].slice(-50)); // Keep last 50 messages
+            data.messages.forEach(message => addEvent('log', message.message));
+            if (data.dropped > 0) {
+                addEvent('system', `${data.dropped} log messages dropped`);
+            }
+        };
+
         // Counts updates
         const handleCountsUpdate = (data: CountsUpdate) => {
             setCounts(data);
@@ -80,6 +89,7 @@ const DetectionLog: React.FC = () => {
         socket.on('disconnect', handleDisconnect);
         socket.on('detection', handleDetection);
         socket.on('log_message', handleLogMessage);
+        socket.on('log_batch', handleLogBatch);
         socket.on('counts_update', handleCountsUpdate);
         socket.on('processing_status', handleProcessingStatus);
         socket.on('processing_error', handleProcessingError);
@@ -92,6 +102,7 @@ const DetectionLog: React.FC = () => {
             socket.off('disconnect', handleDisconnect);
             socket.off('detection', handleDetection);
             socket.off('log_message', handleLogMessage);
+            socket.off('log_batch', handleLogBatch);
             socket.off('counts_update', handleCountsUpdate);
             socket.off('processing_status', handleProcessingStatus);
             socket.off('processing_error', handleProcessingError);
@@ -0,0 +1,179 @@
+import React, { useCallback, useEffect, useState } from 'react';
+import { socket } from '../socket';
+
+const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
+
+const CLASS_NAMES: { [id: number]: string } = {
+    0: 'pizza',
+    1: 'box_open',
+    2: 'box_close',
+    3: 'box_nilon'
+};
+
+interface ReviewItem {
+    id: number;
+    class_id: number;
+    confidence: number;
+    track_id: string | null;
+    created_at: string;
+}
+
+interface PendingLabel {
+    is_correct: boolean;
+    class_id: number;
+}
+
+const ReviewQueue: React.FC = () => {
+    const [items, setItems] = useState<ReviewItem[]>([]);
+    const [pending, setPending] = useState<number>(0);
+    const [labels, setLabels] = useState<{ [id: number]: PendingLabel }>({});
+    const [submitting, setSubmitting] = useState<boolean>(false);
+
+    const fetchPending = useCallback(async () => {
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/review/pending?limit=20`);
+            if (response.ok) {
+                const data = await response.json();
+                if (data.status === 'success') {
+                    setItems(data.items);
+                    setPending(data.pending);
+                }
+            }
+        } catch (error) {
+            console.error('Error fetching review queue:', error);
+        }
+    }, []);
+
+    useEffect(() => {
+        fetchPending();
+
+        // The backend announces when items are added or reviewed
+        const handleQueueUpdate = (data: { pending: number }) => {
+            setPending(data.pending);
+            fetchPending();
+        };
+
+        socket.on('review_queue_update', handleQueueUpdate);
+        return () => {
+            socket.off('review_queue_update', handleQueueUpdate);
+        };
+    }, [fetchPending]);
+
+    const setLabel = (item: ReviewItem, label: Partial<PendingLabel>) => {
+        setLabels(prev => ({
+            ...prev,
+            [item.id]: { is_correct: true, class_id: item.class_id, ...prev[item.id], ...label }
+        }));
+    };
+
+    const submitLabels = async () => {
+        const batch = Object.entries(labels).map(([id, label]) => ({ id: Number(id), ...label }));
+        if (batch.length === 0) return;
+        setSubmitting(true);
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/review/labels`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ labels: batch })
+            });
+            const data = await response.json();
+            if (data.errors && data.errors.length > 0) {
+                console.warn('Some labels were rejected:', data.errors);
+            }
+            setLabels({});
+            fetchPending();
+        } catch (error) {
+            console.error('Error submitting labels:', error);
+        } finally {
+            setSubmitting(false);
+        }
+    };
+
+    const skipItem = async (id: number) => {
+        try {
+            await fetch(`${API_BASE_URL}/api/review/skip`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ ids: [id] })
+            });
+            setLabels(prev => {
+                const { [id]: _, ...rest } = prev;
+                return rest;
+            });
+            fetchPending();
+        } catch (error) {
+            console.error('Error skipping review item:', error);
+        }
+    };
+
+    const labeledCount = Object.keys(labels).length;
+
+    return (
+        <div className="bg-white rounded-lg shadow-md p-4">
+            <div className="flex justify-between items-center mb-4">
+                <h3 className="text-lg font-semibold text-gray-800">Review Queue ({pending})</h3>
+                <button
+                    onClick={submitLabels}
+                    disabled={labeledCount === 0 || submitting}
+                    className="px-3 py-1 text-sm bg-blue-500 text-white rounded hover:bg-blue-600 transition-colors disabled:opacity-50"
+                >
+                    Submit {labeledCount} label{labeledCount === 1 ? '' : 's'}
+                </button>
+            </div>
+
+            {items.length === 0 ? (
+                <p className="text-sm text-gray-500">No detections waiting for review</p>
+            ) : (
+                <div className="space-y-3 max-h-96 overflow-y-auto">
+                    {items.map(item => {
+                        const label = labels[item.id];
+                        return (
+                            <div key={item.id} className="flex items-center gap-3 border rounded p-2">
+                                <img
+                                    src={`${API_BASE_URL}/api/review/${item.id}/crop.jpg`}
+                                    alt={`Detection ${item.id}`}
+                                    className="w-16 h-16 object-cover rounded"
+                                />
+                                <div className="flex-1 text-sm">
+                                    <p className="font-medium text-gray-800">
+                                        {CLASS_NAMES[item.class_id] || 'Unknown'} ({item.confidence.toFixed(2)})
+                                    </p>
+                                    <div className="flex gap-2 mt-1">
+                                        <button
+                                            onClick={() => setLabel(item, { is_correct: true, class_id: item.class_id })}
+                                            className={`px-2 py-0.5 rounded border ${label?.is_correct ? 'bg-green-500 text-white' : ''}`}
+                                        >
+                                            Correct
+                                        </button>
+                                        <button
+                                            onClick={() => setLabel(item, { is_correct: false })}
+                                            className={`px-2 py-0.5 rounded border ${label && !label.is_correct ? 'bg-red-500 text-white' : ''}`}
+                                        >
+                                            Wrong
+                                        </button>
+                                        {label && !label.is_correct && (
+                                            <select
+                                                value={label.class_id}
+                                                onChange={e => setLabel(item, { class_id: Number(e.target.value) })}
+                                                className="border rounded px-1"
+                                            >
+                                                {Object.entries(CLASS_NAMES).map(([id, name]) => (
+                                                    <option key={id} value={id}>{name}</option>
+                                                ))}
+                                            </select>
+                                        )}
+                                        <button onClick={() => skipItem(item.id)} className="px-2 py-0.5 text-gray-500">
+                                            Skip
+                                        </button>
+                                    </div>
+                                </div>
+                            </div>
+                        );
+                    })}
+                </div>
+            )}
+        </div>
+    );
+};
+
+export default ReviewQueue;
@@ -7,10 +7,144 @@ interface VideoDisplayProps {
     processingStatus?: string; // 'idle', 'processing', 'completed', 'error'
 }
 
+interface BinaryFrameMessage {
+    source: string;
+    frame_count: number;
+    timestamp: number;
+    tier: string;
+    frame: ArrayBuffer;
+}
+
+interface TrackMetadata {
+    id: number | string;
+    bbox: [number, number, number, number];
+    status: 'open' | 'close' | 'unknown';
+    in_zone: boolean;
+    pattern_matched: boolean;
+}
+
+interface FrameMetadata {
+    source: string;
+    frame_count: number;
+    timestamp: number;
+    width: number;
+    height: number;
+    tracks: TrackMetadata[];
+    zone: { name: string; coordinates: [number, number][] };
+    stats: {
+        boxes_sold: number;
+        pending_boxes: number;
+        open_boxes_in_zone: number;
+        closed_boxes_in_zone: number;
+    };
+}
+
+interface OverlayLayers {
+    tracks: boolean;
+    zone: boolean;
+    stats: boolean;
+}
+
+// Same colours the backend uses when it burns overlays into the frame
+const STATUS_COLORS: Record<TrackMetadata['status'], string> = {
+    open: '#00ff00',
+    close: '#ff0000',
+    unknown: '#ff0000'
+};
+const PATTERN_MATCHED_COLOR = '#00ffff';
+const ZONE_COLOR = '#ff00ff';
+
+// Decode a base64 string from the legacy `video_frame` event into raw bytes
+const base64ToBytes = (data: string): Uint8Array => {
+    const binary = atob(data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    return bytes;
+};
+
+const drawOverlays = (ctx: CanvasRenderingContext2D, metadata: FrameMetadata, layers: OverlayLayers) => {
+    if (layers.zone && metadata.zone.coordinates.length) {
+        ctx.strokeStyle = ZONE_COLOR;
+        ctx.lineWidth = 2;
+        ctx.beginPath();
+        metadata.zone.coordinates.forEach(([x, y], i) => (i === 0 ? ctx.moveTo(x, y) : ctx.lineTo(x, y)));
+        ctx.closePath();
+        ctx.stroke();
+
+        const xs = metadata.zone.coordinates.map(([x]) => x);
+        const ys = metadata.zone.coordinates.map(([, y]) => y);
+        ctx.fillStyle = '#ffffff';
+        ctx.font = '20px sans-serif';
+        ctx.textAlign = 'center';
+        ctx.fillText(metadata.zone.name, xs.reduce((a, b) => a + b, 0) / xs.length, Math.min(...ys) - 10);
+        ctx.textAlign = 'start';
+    }
+
+    if (layers.tracks) {
+        ctx.lineWidth = 2;
+        ctx.font = '14px sans-serif';
+        metadata.tracks.forEach((track) => {
+            const [x1, y1, x2, y2] = track.bbox;
+            const color = track.pattern_matched ? PATTERN_MATCHED_COLOR : STATUS_COLORS[track.status];
+            const status = track.status === 'unknown' ? 'Unknown' : track.status === 'open' ? 'Open' : 'Close';
+            let label = `ID: ${track.id} - ${status}`;
+            if (track.pattern_matched) label += ' (Pattern Matched)';
+            ctx.strokeStyle = color;
+            ctx.fillStyle = color;
+            ctx.strokeRect(x1, y1, x2 - x1, y2 - y1);
+            ctx.fillText(label, x1, y1 - 10);
+        });
+    }
+
+    if (layers.stats) {
+        const lines = [
+            `Boxes Sold: ${metadata.stats.boxes_sold}`,
+            `Pending Boxes: ${metadata.stats.pending_boxes}`,
+            `Open in Zone: ${metadata.stats.open_boxes_in_zone}`,
+            `Closed in Zone: ${metadata.stats.closed_boxes_in_zone}`
+        ];
+        ctx.fillStyle = '#00ff00';
+        ctx.font = '26px sans-serif';
+        lines.forEach((line, i) => ctx.fillText(line, 10, 30 + i * 30));
+    }
+};
+
 const VideoDisplay: React.FC<VideoDisplayProps> = ({ videoSource, isProcessing, processingStatus = 'idle' }) => {
     const canvasRef = useRef<HTMLCanvasElement>(null);
     const [isConnected, setIsConnected] = useState<boolean>(false);
-    const [currentFrame, setCurrentFrame] = useState<string | null>(null);
+    const [hasFrame, setHasFrame] = useState<boolean>(false);
+    const [layers, setLayers] = useState<OverlayLayers>({ tracks: true, zone: true, stats: true });
+    // Latest decoded frame, latest overlay metadata and the newest frame number seen
+    const frameRef = useRef<ImageBitmap | null>(null);
+    const metadataRef = useRef<FrameMetadata | null>(null);
+    const layersRef = useRef<OverlayLayers>(layers);
+    const latestFrameCountRef = useRef<number>(-1);
+
+    const redraw = () => {
+        const bitmap = frameRef.current;
+        const canvas = canvasRef.current;
+        if (!bitmap || !canvas) return;
+
+        const ctx = canvas.getContext('2d');
+        if (!ctx) return;
+
+        // Work in source-frame coordinates so overlays stay sharp even when
+        // the server sends a downscaled picture
+        const metadata = metadataRef.current;
+        const width = metadata?.width ?? bitmap.width;
+        const height = metadata?.height ?? bitmap.height;
+        if (canvas.width !== width || canvas.height !== height) {
+            canvas.width = width;
+            canvas.height = height;
+        }
+
+        ctx.drawImage(bitmap, 0, 0, width, height);
+        if (metadata) {
+            drawOverlays(ctx, metadata, layersRef.current);
+        }
+    };
 
     // Socket event handlers
     useEffect(() => {
@@ -22,45 +156,87 @@ const VideoDisplay: React.FC<VideoDisplayProps> = ({ videoSource, isProcessing,
             setIsConnected(false);
         };
 
-        const handleVideoFrame = (data: { source: string; frame: string; frame_count: number }) => {
-            setCurrentFrame(data.frame);
-            // Detections are now drawn directly on the frame by the backend
+        const showFrame = async (bytes: BlobPart, frameCount: number) => {
+            const bitmap = await createImageBitmap(new Blob([bytes], { type: 'image/jpeg' }));
+            // Decodes can finish out of order; never paint an older frame over a newer one
+            if (frameCount < latestFrameCountRef.current) {
+                bitmap.close();
+                return;
+            }
+            latestFrameCountRef.current = frameCount;
+            frameRef.current?.close();
+            frameRef.current = bitmap;
+            redraw();
+            setHasFrame(true);
+        };
+
+        // Acknowledge once the frame is on screen so the server can adapt
+        // frame rate and quality to how fast this client really is
+        const handleBinaryFrame = (data: BinaryFrameMessage, ack?: (frameCount: number) => void) => {
+            showFrame(data.frame, data.frame_count)
+                .catch((error) => {
+                    console.error('Failed to decode video frame:', error);
+                })
+                .finally(() => ack?.(data.frame_count));
+        };
+
+        const handleVideoFrame = (
+            data: { source: string; frame: string; frame_count: number },
+            ack?: (frameCount: number) => void
+        ) => {
+            showFrame(base64ToBytes(data.frame), data.frame_count)
+                .catch((error) => {
+                    console.error('Failed to decode video frame:', error);
+                })
+                .finally(() => ack?.(data.frame_count));
+        };
+
+        // Overlays arrive separately and may update faster than the picture
+        const handleFrameMetadata = (data: FrameMetadata) => {
+            metadataRef.current = data;
+            redraw();
         };
 
         // Add event listeners
         socket.on('connect', handleConnect);
         socket.on('disconnect', handleDisconnect);
+        socket.on('video_frame_binary', handleBinaryFrame);
         socket.on('video_frame', handleVideoFrame);
+        socket.on('frame_metadata', handleFrameMetadata);
 
         // Cleanup function
         return () => {
             socket.off('connect', handleConnect);
             socket.off('disconnect', handleDisconnect);
+            socket.off('video_frame_binary', handleBinaryFrame);
             socket.off('video_frame', handleVideoFrame);
+            socket.off('frame_metadata', handleFrameMetadata);
+            frameRef.current?.close();
+            frameRef.current = null;
         };
     }, []); // Empty dependency array - only run once on mount
 
-    // Canvas rendering effect
+    // Frame numbering restarts with each source
     useEffect(() => {
-        if (!canvasRef.current || !currentFrame) return;
-
-        const canvas = canvasRef.current;
-        const ctx = canvas.getContext('2d');
-        if (!ctx) return;
+        latestFrameCountRef.current = -1;
+        metadataRef.current = null;
+        setHasFrame(false);
+    }, [videoSource]);
 
-        const img = new Image();
-        img.onload = () => {
-            // Set canvas size to match image
-            canvas.width = img.width;
-            canvas.height = img.height;
+    // Layer toggles repaint locally without asking the server for anything
+    useEffect(() => {
+        layersRef.current = layers;
+        redraw();
+    }, [layers]);
 
-            // Draw the frame (detections are already drawn by the backend)
-            ctx.drawImage(img, 0, 0);
-        };
+    // The canvas only mounts once the first frame has arrived
+    useEffect(() => {
+        if (hasFrame) redraw();
+    }, [hasFrame]);
 
-        // The currentFrame is already base64 encoded from the backend
-        img.src = `data:image/jpeg;base64,${currentFrame}`;
-    }, [currentFrame]); // Only depend on currentFrame
+    const toggleLayer = (layer: keyof OverlayLayers) => {
+        setLayers((current) => ({ ...current, [layer]: !current[layer] }));
+    };
 
     // Show processing completed message
     if (processingStatus === 'completed') {
@@ -110,7 +286,7 @@ const VideoDisplay: React.FC<VideoDisplayProps> = ({ videoSource, isProcessing,
         );
     }
 
-    if (isProcessing && !currentFrame) {
+    if (isProcessing && !hasFrame) {
         return (
             <div className="video-display">
                 <div className="processing-message">
@@ -125,6 +301,14 @@ const VideoDisplay: React.FC<VideoDisplayProps> = ({ videoSource, isProcessing,
     return (
         <div className="video-display">
             <canvas ref={canvasRef} />
+            <div className="overlay-toggles">
+                {(Object.keys(layers) as (keyof OverlayLayers)[]).map((layer) => (
+                    <label key={layer}>
+                        <input type="checkbox" checked={layers[layer]} onChange={() => toggleLayer(layer)} />
+                        {layer}
+                    </label>
+                ))}
+            </div>
             {isProcessing && (
                 <div className="processing-overlay">
                     <div className="processing-indicator">
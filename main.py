@@ -1,8 +1,10 @@
 import tkinter as tk
 from backend.utils.gui_handler import VideoProcessorGUI
 from backend.utils.detection_handler import DetectionHandler
+from backend.utils.logging_config import setup_logging
 
 def main():
+    setup_logging()
   
     root = tk.Tk()
     